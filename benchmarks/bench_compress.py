@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Compression benchmark: single-threaded saves vs the parallel gzip writer.
+
+Builds synthetic banks (see bench_save.build_bank) and times a config.json
+swap with the legacy tarfile "w:gz" loop, with rewrite_archive on one thread
+(the GzipFile path) and with rewrite_archive on a thread pool of each size
+given. Also reports the output size, so the cost of the per-block sync
+flushes is visible.
+
+Usage:
+  python benchmarks/bench_compress.py [--sizes 64,256] [--threads 2,4,8] [--level 9] [--repeat 3]
+
+Sizes are total asset megabytes per bank.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import tarfile
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dimehead_bank as db  # noqa: E402
+from bench_save import _best_of, build_bank, legacy_rewrite  # noqa: E402
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', default='64,256', help='comma separated total asset sizes in MB')
+    ap.add_argument('--threads', default=','.join(str(n) for n in sorted({2, 4, os.cpu_count() or 1}) if n > 1),
+                    help='comma separated thread counts for the parallel writer')
+    ap.add_argument('--level', type=int, default=db.DEFAULT_COMPRESSLEVEL)
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--skip-legacy', action='store_true', help='do not time the tarfile baseline')
+    args = ap.parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    threads = [int(t) for t in args.threads.split(',') if t]
+
+    variants = [] if args.skip_legacy else [('legacy L9', None)]
+    variants += [('1 thread', 1)] + [(f'{n} threads', n) for n in threads]
+    print(f"level {args.level}, {os.cpu_count()} CPU(s)")
+    print(f"{'assets':>8}  " + '  '.join(f'{name:>20}' for name, _ in variants))
+    with tempfile.TemporaryDirectory() as tmp:
+        for mb in sizes:
+            src = os.path.join(tmp, f'bank_{mb}.npb')
+            dest = os.path.join(tmp, 'out.npb')
+            build_bank(src, mb)
+            with tarfile.open(src, 'r:gz') as tf:
+                config = json.loads(tf.extractfile(tf.getmember('./config.json')).read())
+            config['presets'][0]['name'] = 'BENCH'
+            data = db.encode_config(config)
+            cells = []
+            for _name, n in variants:
+                if n is None:
+                    t = _best_of(args.repeat, lambda: legacy_rewrite(src, dest, data))
+                else:
+                    t = _best_of(args.repeat, lambda: db.rewrite_archive(src, dest, data, args.level, threads=n))
+                cells.append(f'{t * 1000:7.0f} ms {os.path.getsize(dest) / 2**20:6.1f} MiB')
+            print(f'{mb:>5} MB  ' + '  '.join(f'{c:>20}' for c in cells))
+
+
+if __name__ == '__main__':
+    main()
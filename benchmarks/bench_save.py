@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Save-time benchmark: legacy tarfile rewrite vs dimehead_bank.rewrite_archive.
+
+Builds synthetic banks whose assets add up to a range of total sizes, then times
+swapping config.json with the legacy getmembers()/addfile() loop (always gzip
+level 9) and with the stream-copy engine at several compression levels.
+
+Usage:
+  python benchmarks/bench_save.py [--sizes 4,16,64] [--repeat 3]
+
+Sizes are total asset megabytes per bank.
+"""
+from __future__ import annotations
+import argparse
+import io
+import json
+import os
+import random
+import struct
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dimehead_bank as db  # noqa: E402
+
+FACTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'namplayer-factory-defaults.npb')
+
+
+def _fake_nam(size: int, rng: random.Random) -> bytes:
+    """JSON text with float weights, roughly what a .nam capture looks like."""
+    head = b'{"version": "0.5.2", "architecture": "WaveNet", "weights": ['
+    parts = [head]
+    total = len(head)
+    while total < size:
+        s = f"{rng.uniform(-1, 1):.8f}, ".encode()
+        parts.append(s)
+        total += len(s)
+    return b''.join(parts)[:size]
+
+
+def _fake_ir(size: int, rng: random.Random) -> bytes:
+    n = size // 4
+    return struct.pack(f'<{n}f', *(rng.gauss(0, 0.1) * (0.999 ** i) for i in range(n)))
+
+
+def build_bank(path: str, asset_mb: int, seed: int = 1):
+    rng = random.Random(seed)
+    with tarfile.open(FACTORY, 'r:gz') as tf:
+        config = tf.extractfile(tf.getmember('./config.json')).read()
+    total = asset_mb * 1024 * 1024
+    with tarfile.open(path, 'w:gz') as tf:
+        def add(name, data):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+        add('./config.json', config)
+        add('./state.bin', bytes(rng.getrandbits(8) for _ in range(4096)))
+        i = 0
+        while total > 0:
+            if i % 4 == 3:
+                chunk = min(total, 192 * 1024)
+                add(f'./Cab {i}.ir', _fake_ir(chunk, rng))
+            else:
+                chunk = min(total, 4 * 1024 * 1024)
+                add(f'./Amp {i}.nam', _fake_nam(chunk, rng))
+            total -= chunk
+            i += 1
+
+
+def legacy_rewrite(src_path: str, dest_path: str, config_data: bytes):
+    """The pre-stream-copy save loop, kept here as the baseline."""
+    with tarfile.open(src_path, 'r:gz') as tf_in, tarfile.open(dest_path, 'w:gz') as tf_out:
+        for member in tf_in.getmembers():
+            if member.name.lstrip('./') == db.CONFIG_NAME:
+                continue
+            extracted = tf_in.extractfile(member) if member.isfile() else None
+            tf_out.addfile(member, extracted)
+        info = tarfile.TarInfo(name=f'./{db.CONFIG_NAME}')
+        info.size = len(config_data)
+        tf_out.addfile(info, io.BytesIO(config_data))
+
+
+def _best_of(repeat: int, fn) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', default='4,16,64', help='comma separated total asset sizes in MB')
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+
+    variants = [('legacy L9', None)] + [(f'stream L{lvl}', lvl) for lvl in
+                                        (db.DEFAULT_COMPRESSLEVEL, 6, db.FAST_COMPRESSLEVEL, db.STORE_COMPRESSLEVEL)]
+    print(f"{'assets':>8}  " + '  '.join(f'{name:>12}' for name, _ in variants))
+    with tempfile.TemporaryDirectory() as tmp:
+        for mb in sizes:
+            src = os.path.join(tmp, f'bank_{mb}.npb')
+            dest = os.path.join(tmp, 'out.npb')
+            build_bank(src, mb)
+            with tarfile.open(src, 'r:gz') as tf:
+                config = json.loads(tf.extractfile(tf.getmember('./config.json')).read())
+            config['presets'][0]['name'] = 'BENCH'
+            data = db.encode_config(config)
+            cells = []
+            for _name, level in variants:
+                if level is None:
+                    t = _best_of(args.repeat, lambda: legacy_rewrite(src, dest, data))
+                else:
+                    t = _best_of(args.repeat, lambda: db.rewrite_archive(src, dest, data, level))
+                cells.append(f'{t * 1000:9.0f} ms')
+            print(f'{mb:>5} MB  ' + '  '.join(f'{c:>12}' for c in cells))
+
+
+if __name__ == '__main__':
+    main()
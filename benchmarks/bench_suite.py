@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Scale benchmark suite: load, parse, save, diff and pointer-op latency and
+peak memory over synthetic banks of several sizes.
+
+Each size is PRESETSxASSETS; the bank is made by synth_bank.write_bank. Every
+case runs --rounds times (fewer if --max-time seconds pass first), untimed
+setup excluded, and reports min / mean / stddev in the style of
+pytest-benchmark. Peak memory is measured on one extra round under
+tracemalloc (Python allocations only, so zlib's buffers are not counted).
+
+--save FILE stores the results as JSON; --compare FILE prints the change
+against such a file and exits with status 1 if any case's min time grew by
+more than --threshold percent, so the suite can gate a change.
+
+Usage:
+  python benchmarks/bench_suite.py [--sizes 128x8,1024x32,8192x64] [--asset-kb 64]
+                                   [--rounds 5] [--max-time 10] [-k PATTERN]
+                                   [--save FILE] [--compare FILE] [--threshold 10]
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dimehead_bank as db  # noqa: E402
+import nam_config_tool as tool  # noqa: E402
+from synth_bank import write_bank  # noqa: E402
+
+
+class Fixture:
+    """Banks of one size: bank.npb as the device writes it, work.npb in the
+    layout saves produce (saved over by the save cases)."""
+
+    def __init__(self, tmp: str, presets: int, assets: int, asset_kb: int):
+        self.label = f'{presets}x{assets}'
+        self.dir = os.path.join(tmp, self.label)
+        os.makedirs(self.dir)
+        self.path = os.path.join(self.dir, 'bank.npb')
+        self.work = os.path.join(self.dir, 'work.npb')
+        self.cache = os.path.join(self.dir, 'cache')
+        os.environ['DIMEHEAD_CACHE_DIR'] = self.cache
+        write_bank(self.path, presets, assets, asset_kb)
+        db.rewrite_archive(self.path, self.work)
+        self.raw = db.BankArchive(self.path).read_config_text()
+        self.n = presets
+
+    def bank(self, path: Optional[str] = None) -> db.Bank:
+        """Fresh Bank over a private copy of the config (no disk I/O)."""
+        return db.Bank(path=path or self.path, config=json.loads(self.raw), original_config_json=self.raw)
+
+    def clear_cache(self):
+        shutil.rmtree(self.cache, ignore_errors=True)
+
+
+# name -> (setup(fx) -> state, run(fx, state)); setup is not timed
+CASES: Dict[str, tuple] = {}
+
+
+def case(name: str, setup: Callable[[Fixture], Any] = lambda fx: None):
+    def register(fn):
+        CASES[name] = (setup, fn)
+        return fn
+    return register
+
+
+def _warm(fx: Fixture):
+    db.load_bank(fx.path)
+
+
+@case('load_cold', setup=Fixture.clear_cache)
+def _load_cold(fx, _):
+    db.load_bank(fx.path)
+
+
+@case('load_cached', setup=_warm)
+def _load_cached(fx, _):
+    db.load_bank(fx.path)
+
+
+@case('open_fast', setup=Fixture.clear_cache)
+def _open_fast(fx, _):
+    db.open_bank_fast(fx.path)
+
+
+@case('parse')
+def _parse(fx, _):
+    json.loads(fx.raw)
+
+
+@case('columns', setup=lambda fx: json.loads(fx.raw)['presets'])
+def _columns(fx, presets):
+    db.PresetColumns.from_presets(presets)
+
+
+@case('validate', setup=Fixture.bank)
+def _validate(fx, bank):
+    db.validate(bank)
+
+
+def _edited(fx: Fixture) -> db.Bank:
+    """Bank with ~1% of the presets retuned and renamed and one preset moved."""
+    bank = fx.bank()
+    presets = bank.config['presets']
+    for row in range(0, fx.n, 100):
+        presets[row]['potiGain'] = 0.25
+        presets[row]['name'] = f'EDIT {row}'
+    presets.insert(fx.n // 2, presets.pop(1))
+    return bank
+
+
+@case('diff', setup=_edited)
+def _diff(fx, bank):
+    bank.diff_config()
+
+
+def _pointers(fx: Fixture) -> tuple:
+    config = json.loads(fx.raw)
+    return config, [f'/presets/{row}/{f}' for row in range(fx.n) for f in ('name', 'nam', 'potiGain')]
+
+
+@case('pointer_get', setup=_pointers)
+def _pointer_get(fx, state):
+    config, pointers = state
+    for p in pointers:
+        tool.json_pointer_get(config, p)
+
+
+@case('pointer_get_many', setup=lambda fx: json.loads(fx.raw))
+def _pointer_get_many(fx, config):
+    tool.json_pointer_get_many(config, ['/presets/*/name', '/presets/*/nam', '/presets/*/potiGain'])
+
+
+@case('patch', setup=lambda fx: (json.loads(fx.raw), [{'op': 'replace', 'path': f'/presets/{row}/potiVol',
+                                                      'value': 0.5} for row in range(fx.n)]))
+def _patch(fx, state):
+    config, ops = state
+    tool.apply_patch(config, ops)
+
+
+def _save_setup(fx: Fixture) -> db.Bank:
+    bank = fx.bank(fx.work)
+    bank.config['presets'][0]['name'] = f'SAVE {time.perf_counter_ns()}'
+    return bank
+
+
+@case('save_rewrite', setup=_save_setup)
+def _save_rewrite(fx, bank):
+    db.save_bank(bank, backup=False, mode='rewrite')
+
+
+@case('save_append', setup=_save_setup)
+def _save_append(fx, bank):
+    db.save_bank(bank, backup=False, mode='append')
+
+
+def _gui_model(fx: Fixture):
+    from dimehead_gui.main import PresetTableModel
+    from PySide6.QtCore import Qt
+    model = PresetTableModel(fx.bank())
+    return model, Qt.DisplayRole
+
+
+@case('gui_model', setup=_gui_model)
+def _gui_paint(fx, state):
+    model, role = state
+    for row in range(model.rowCount()):
+        for col in range(model.columnCount()):
+            model.data(model.index(row, col), role)
+
+
+def _gui_available() -> bool:
+    try:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PySide6.QtWidgets import QApplication
+    except ImportError:
+        return False
+    global _qt_app
+    _qt_app = QApplication.instance() or QApplication([])
+    return True
+
+
+def run_case(fx: Fixture, name: str, rounds: int, max_time: float) -> Dict[str, Any]:
+    setup, fn = CASES[name]
+    times: List[float] = []
+    started = time.perf_counter()
+    while len(times) < rounds and (not times or time.perf_counter() - started < max_time):
+        state = setup(fx)
+        gc.collect()
+        t0 = time.perf_counter()
+        fn(fx, state)
+        times.append(time.perf_counter() - t0)
+    state = setup(fx)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(fx, state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'case': name, 'size': fx.label, 'min': min(times), 'mean': statistics.fmean(times),
+            'stddev': statistics.stdev(times) if len(times) > 1 else 0.0, 'rounds': len(times),
+            'peak_bytes': peak}
+
+
+def _ms(seconds: float) -> str:
+    return f'{seconds * 1000:10.2f}'
+
+
+def _mem(n: int) -> str:
+    return f'{n / 2**20:8.1f} MiB' if n >= 2**20 else f'{n / 1024:8.1f} KiB'
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', default='128x8,1024x32,8192x64', help='comma separated PRESETSxASSETS')
+    ap.add_argument('--asset-kb', type=int, default=64, help='mean asset size in KiB')
+    ap.add_argument('--rounds', type=int, default=5)
+    ap.add_argument('--max-time', type=float, default=10.0, help='stop adding rounds to a case after this many seconds')
+    ap.add_argument('-k', dest='pattern', help='only cases whose name contains PATTERN')
+    ap.add_argument('--save', metavar='FILE', help='write the results as JSON')
+    ap.add_argument('--compare', metavar='FILE', help='compare against results saved with --save')
+    ap.add_argument('--threshold', type=float, default=10.0, help='min-time regression (%%) that fails --compare')
+    args = ap.parse_args(argv)
+
+    names = [n for n in CASES if not args.pattern or args.pattern in n]
+    if 'gui_model' in names and not _gui_available():
+        print("gui_model: skipped (PySide6 not installed)", file=sys.stderr)
+        names.remove('gui_model')
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = {(r['case'], r['size']): r for r in json.load(f)['results']}
+
+    results = []
+    regressions = []
+    header = f"{'case':<18}{'min (ms)':>10}{'mean (ms)':>11}{'stddev':>11}{'rounds':>7}{'peak mem':>13}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    with tempfile.TemporaryDirectory() as tmp:
+        for spec in args.sizes.split(','):
+            presets, assets = (int(x) for x in spec.lower().split('x'))
+            fx = Fixture(tmp, presets, assets, args.asset_kb)
+            print(f"\n{fx.label}: {presets} presets, {assets} assets, "
+                  f"{os.path.getsize(fx.path) / 2**20:.1f} MiB, config.json {len(fx.raw) / 1024:.0f} KiB")
+            print(header)
+            for name in names:
+                r = run_case(fx, name, args.rounds, args.max_time)
+                results.append(r)
+                line = (f"{name:<18}{_ms(r['min'])}{_ms(r['mean']):>11}{_ms(r['stddev']):>11}"
+                        f"{r['rounds']:>7}{_mem(r['peak_bytes']):>13}")
+                base = baseline.get((name, fx.label))
+                if base:
+                    change = (r['min'] / base['min'] - 1) * 100 if base['min'] else 0.0
+                    line += f"{change:+9.1f}%"
+                    if change > args.threshold:
+                        line += '  REGRESSION'
+                        regressions.append(f"{name} {fx.label}: {change:+.1f}%")
+                print(line, flush=True)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                                   'cpus': os.cpu_count()},
+                       'asset_kb': args.asset_kb, 'results': results}, f, indent=1)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:g}%: " + ', '.join(regressions),
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Synthetic bank generator for scale testing.
+
+Writes a valid .npb with N presets and M assets: Linear .nam models (real
+JSON, loadable by dimehead_analysis), boost models, float32 cabinet IRs and
+.reverb impulses, each around --asset-kb in size. Preset fields are
+randomized within the FORMAT_SPEC §2 / §6 ranges, reference the generated
+assets the way device banks do (no './' prefix), and always pass
+dimehead_bank.validate. The same seed gives the same bank.
+
+Usage:
+  python benchmarks/synth_bank.py OUT.npb [--presets 512] [--assets 32] [--asset-kb 256]
+                                          [--seed 1] [--layout device|tool]
+
+--layout device (default) writes one gzip stream like the device does;
+--layout tool rewrites it into the layout save_bank produces (separate gzip
+members, appendable).
+"""
+from __future__ import annotations
+import argparse
+import io
+import json
+import os
+import random
+import struct
+import sys
+import tarfile
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dimehead_bank as db  # noqa: E402
+
+GLOBALS = {
+    'configVersion': 1, 'footswitchLongpress': 1, 'footswitchModeIndex': 0, 'lcdBrightness': 7,
+    'ledBrightness': 10, 'lineoutPosition': 4, 'lineoutVolume': 1.0, 'midiChannelIndex': 0,
+    'recallLastPreset': True, 'tunerReferencePitch': 440.0,
+}
+_WORDS = ('CLEAN', 'CRUNCH', 'LEAD', 'RHYTHM', 'FUZZ', 'DRIVE', 'JAZZ', 'BLUES', 'METAL', 'AMBIENT',
+          'PLEXI', 'BRIT', 'TWEED', 'RECTO', 'SOLO', 'BASS', 'GLASS', 'DOOM', 'SPANK', 'CHIME')
+# Share of the generated assets per kind (the rest are amp models)
+_CABS, _BOOSTS, _REVERBS = 0.35, 0.1, 0.05
+
+
+def _f32(x: float) -> float:
+    """Round to float32 as device banks store pot values."""
+    return struct.unpack('<f', struct.pack('<f', x))[0]
+
+
+def _nam(size: int, rng: random.Random, name: str) -> bytes:
+    """Linear model JSON of about size bytes (~12 bytes per weight): a
+    decaying random impulse response, so its loudness is in a plausible range."""
+    taps = max(1, size // 12)
+    weights = ', '.join(f'{rng.gauss(0, 0.2) * 0.99 ** i:.8f}' for i in range(taps))
+    weights += ', 0.0'  # bias
+    return (f'{{"version": "0.5.2", "architecture": "Linear", '
+            f'"config": {{"receptive_field": {taps}, "bias": true}}, '
+            f'"metadata": {{"name": {json.dumps(name)}, "modeled_by": "synth_bank"}}, '
+            f'"sample_rate": 48000, "weights": [{weights}]}}').encode()
+
+
+def _impulse(size: int, rng: random.Random, decay: float) -> bytes:
+    n = max(1, size // 4)
+    return struct.pack(f'<{n}f', *(rng.gauss(0, 0.3) * decay ** i for i in range(n)))
+
+
+def make_assets(count: int, asset_kb: int, rng: random.Random) -> Dict[str, List[Tuple[str, bytes]]]:
+    """count assets by kind ('nam', 'boost', 'ir', 'reverb'), sizes asset_kb +-50%."""
+    kinds = {'nam': [], 'boost': [], 'ir': [], 'reverb': []}
+    n_ir = round(count * _CABS)
+    n_boost = round(count * _BOOSTS)
+    n_reverb = round(count * _REVERBS)
+    n_nam = max(1, count - n_ir - n_boost - n_reverb) if count else 0
+
+    def size():
+        return int(asset_kb * 1024 * rng.uniform(0.5, 1.5))
+
+    for i in range(n_nam):
+        name = f'Synth/Amp {i:04d}.nam'
+        kinds['nam'].append((name, _nam(size(), rng, name)))
+    for i in range(n_boost):
+        name = f'Synth/EffectPedals/Boost {i:03d}.nam'
+        kinds['boost'].append((name, _nam(size(), rng, name)))
+    for i in range(n_ir):
+        kinds['ir'].append((f'Synth/Cab {i:04d}.ir', _impulse(size(), rng, 0.999)))
+    for i in range(n_reverb):
+        kinds['reverb'].append((f'Synth/Room {i:03d}.reverb', _impulse(size(), rng, 0.99995)))
+    return kinds
+
+
+def make_preset(rng: random.Random, refs: Dict[str, List[str]]) -> Dict[str, Any]:
+    """One preset with every field of FORMAT_SPEC §2.1, in the factory bank's key order."""
+    u = rng.uniform
+    pot = lambda: _f32(rng.random())  # noqa: E731
+
+    def pick(kind: str, chance: float = 1.0) -> str:
+        return rng.choice(refs[kind]) if refs[kind] and rng.random() < chance else ''
+
+    boost = pick('boost', 0.3)
+    reverb = pick('reverb', 0.3)
+    name = ' '.join(rng.sample(_WORDS, rng.randint(1, 2)))[:16]
+    return {
+        'boostEnable': bool(boost) and rng.random() < 0.7,
+        'boostNam': boost,
+        'eqBassFreq': _f32(u(60, 250)), 'eqBassQ': _f32(u(0.3, 2.0)),
+        'eqMidsFreq': _f32(u(300, 2000)), 'eqMidsQ': _f32(u(0.3, 2.0)),
+        'eqTrebleFreq': _f32(u(2000, 8000)), 'eqTrebleQ': _f32(u(0.3, 2.0)),
+        'fxEnable': rng.random() < 0.2,
+        'hpFreq': 0.0 if rng.random() < 0.2 else _f32(u(20, 200)),
+        'ir': pick('ir', 0.9),
+        'ledColor': rng.randrange(0x1000000),
+        'lpFreq': 0.0 if rng.random() < 0.2 else _f32(u(4000, 20000)),
+        'nam': pick('nam'),
+        'name': name,
+        'ngThreshold': -1000.0 if rng.random() < 0.5 else _f32(u(-90, -30)),
+        'potiBass': pot(), 'potiBoostBass': pot(), 'potiBoostGain': pot(), 'potiBoostMids': pot(),
+        'potiBoostTreble': pot(), 'potiGain': pot(), 'potiMids': pot(), 'potiTreble': pot(), 'potiVol': pot(),
+        'roomBind': 0,
+        'roomConvolutionEnable': bool(reverb),
+        'roomConvolutionFile': reverb,
+        'roomConvolutionMix': pot(),
+        'roomDelayEnable': rng.random() < 0.3,
+        'roomDelayFeedback': pot(),
+        'roomDelayHP': _f32(u(20, 500)),
+        'roomDelayLFODepth': pot(),
+        'roomDelayLFOSpeed': _f32(u(0, 10)),
+        'roomDelayLP': _f32(u(2000, 20000)),
+        'roomDelayMix': pot(),
+        'roomDelayTime': _f32(u(20, 2000)),
+        'roomTremoloDepth': pot(),
+        'roomTremoloEnable': rng.random() < 0.1,
+        'roomTremoloSpeed': _f32(u(0, 10)),
+        'volNormalizeEnabled': rng.random() < 0.8,
+    }
+
+
+def make_config(presets: int, refs: Dict[str, List[str]], rng: random.Random) -> Dict[str, Any]:
+    config = dict(GLOBALS)
+    config['presets'] = [make_preset(rng, refs) for _ in range(presets)]
+    return config
+
+
+def write_bank(path: str, presets: int = 512, assets: int = 32, asset_kb: int = 256,
+               seed: int = 1, layout: str = 'device') -> Dict[str, Any]:
+    """Write a synthetic bank to path; returns its config."""
+    if layout not in ('device', 'tool'):
+        raise ValueError(f"Unknown layout: {layout}")
+    rng = random.Random(seed)
+    kinds = make_assets(assets, asset_kb, rng)
+    config = make_config(presets, {k: [n for n, _ in v] for k, v in kinds.items()}, rng)
+    with tarfile.open(path, 'w:gz') as tf:
+        def add(name, data, type=tarfile.REGTYPE):
+            info = tarfile.TarInfo(name)
+            info.type = type
+            info.size = len(data)
+            info.mtime = 0
+            tf.addfile(info, io.BytesIO(data) if data else None)
+        add('.', b'', tarfile.DIRTYPE)
+        add(f'./{db.CONFIG_NAME}', db.encode_config(config))
+        add('./state.bin', bytes(rng.getrandbits(8) for _ in range(4096)))
+        for kind in ('nam', 'boost', 'ir', 'reverb'):
+            for name, data in kinds[kind]:
+                add(f'./{name}', data)
+    if layout == 'tool':
+        tmp = path + '.tmp'
+        db.rewrite_archive(path, tmp)
+        os.replace(tmp, path)
+    return config
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('out', help='bank to write (.npb)')
+    ap.add_argument('--presets', type=int, default=512)
+    ap.add_argument('--assets', type=int, default=32, help='number of .nam / .ir / .reverb members')
+    ap.add_argument('--asset-kb', type=int, default=256, help='mean asset size in KiB (+-50%%)')
+    ap.add_argument('--seed', type=int, default=1)
+    ap.add_argument('--layout', choices=('device', 'tool'), default='device')
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    config = write_bank(args.out, args.presets, args.assets, args.asset_kb, args.seed, args.layout)
+    diags = db.validate(config)
+    print(f"{args.out}: {args.presets} presets, {args.assets} assets, "
+          f"{os.path.getsize(args.out) / 2**20:.1f} MiB in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+    for d in diags:
+        print(d, file=sys.stderr)
+    return 2 if diags else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,661 @@
+"""Offline analysis of bank assets.
+
+Loudness of .nam captures: every model referenced by a bank is run on a fixed
+test signal with a NumPy forward pass on the CPU (WaveNet and Linear models
+process the whole signal per layer; LSTMs step through time with the input
+projections precomputed) and the RMS level of its output is the loudness.
+Results are cached per asset content digest (dimehead_bank.content_digest)
+under cache_dir('analysis'), so analysing a bank again only runs the models
+that have not been seen before, whichever bank they came from. The digests of
+a .npb's members are remembered per bank file, so a repeat run on an unchanged
+bank reads no member data at all.
+
+normalize_volume() turns the per-model loudness into potiVol values and
+writes them for a whole bank in one column update.
+
+Impulse responses (.ir cabinets, .reverb room files): parse_ir() maps the
+member bytes to a NumPy view without copying (RIFF/WAVE or raw float32) and
+ir_summary() reduces it to length, peak, low/high rolloff and spectral
+centroid, cached the same way. set_filters_from_ir() turns the rolloffs into
+hpFreq/lpFreq for every preset in one pass.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import dimehead_bank as db
+
+
+class AnalysisError(db.BankError):
+    pass
+
+
+DEFAULT_SAMPLE_RATE = 48000
+TEST_SIGNAL_SECONDS = 1.0
+TEST_SIGNAL_DB = -18.0                 # RMS level of the test signal, dBFS
+TEST_SIGNAL_BAND = (80.0, 5000.0)      # Hz, roughly a guitar's fundamental + harmonic range
+_TEST_SIGNAL_SEED = 0x4E414D           # fixed: results must be comparable across runs
+
+LOUDNESS_TARGET_DB = -18.0
+REFERENCE_VOL = 0.5   # potiVol that leaves a model at LOUDNESS_TARGET_DB unchanged
+
+LOUDNESS_VERSION = 1  # bump when the signal or the measurement changes (invalidates the cache)
+
+IR_SUFFIXES = ('.ir', '.reverb', '.wav')
+IR_DEFAULT_SAMPLE_RATE = 48000  # raw (headerless) IR files
+IR_ROLLOFF_DB = 12.0            # rolloffs: where the smoothed response falls this far below its peak
+IR_BANDS_PER_OCTAVE = 6
+IR_ENERGY_FRACTION = 0.99       # effective_ms: time holding this share of the energy
+IR_VERSION = 1
+
+
+# ---------------------------------------------------------------------------
+# Test signal
+# ---------------------------------------------------------------------------
+
+def probe_signal(sample_rate: int = DEFAULT_SAMPLE_RATE, seconds: float = TEST_SIGNAL_SECONDS):
+    """Deterministic pink noise, band-limited to TEST_SIGNAL_BAND, at TEST_SIGNAL_DB RMS."""
+    import numpy as np
+    n = int(round(seconds * sample_rate))
+    rng = np.random.default_rng(_TEST_SIGNAL_SEED)
+    spectrum = np.fft.rfft(rng.standard_normal(n))
+    freqs = np.fft.rfftfreq(n, 1.0 / sample_rate)
+    band = (freqs >= TEST_SIGNAL_BAND[0]) & (freqs <= TEST_SIGNAL_BAND[1])
+    shape = np.zeros_like(freqs)
+    shape[band] = 1.0 / np.sqrt(freqs[band])
+    x = np.fft.irfft(spectrum * shape, n)
+    x *= 10 ** (TEST_SIGNAL_DB / 20) / np.sqrt(np.mean(x * x))
+    return x.astype(np.float32)
+
+
+# ---------------------------------------------------------------------------
+# .nam models
+#
+# Weight layouts follow the NAM exporter (neural-amp-modeler / NeuralAmpModelerCore):
+# one flat list, consumed in module order, Conv1d weights as (out, in, kernel).
+# ---------------------------------------------------------------------------
+
+class _Weights:
+    def __init__(self, values):
+        self._values = values
+        self._pos = 0
+
+    def take(self, *shape: int):
+        import numpy as np
+        n = int(np.prod(shape))
+        if self._pos + n > len(self._values):
+            raise AnalysisError("weights list is shorter than the architecture needs")
+        out = self._values[self._pos:self._pos + n].reshape(shape)
+        self._pos += n
+        return out
+
+    def finish(self):
+        if self._pos != len(self._values):
+            raise AnalysisError(f"{len(self._values) - self._pos} unused weights")
+
+
+def _activation(name: str) -> Callable:
+    import numpy as np
+    acts = {
+        'Tanh': np.tanh,
+        'Fasttanh': np.tanh,
+        'Hardtanh': lambda z: np.clip(z, -1.0, 1.0),
+        'ReLU': lambda z: np.maximum(z, 0.0),
+        'LeakyReLU': lambda z: np.where(z > 0, z, 0.01 * z),
+        'Sigmoid': _sigmoid,
+        'SiLU': lambda z: z * _sigmoid(z),
+    }
+    try:
+        return acts[name]
+    except KeyError:
+        raise AnalysisError(f"unsupported activation {name!r}")
+
+
+def _sigmoid(z):
+    import numpy as np
+    return 0.5 * (np.tanh(0.5 * z) + 1.0)  # overflow-free
+
+
+def _causal_conv(w, x, dilation: int):
+    """Dilated causal Conv1d (zero history): w is (out, in, kernel), x is (in, T)."""
+    kernel = w.shape[2]
+    T = x.shape[1]
+    out = w[:, :, kernel - 1] @ x
+    for k in range(kernel - 1):
+        shift = (kernel - 1 - k) * dilation
+        if shift < T:
+            out[:, shift:] += w[:, :, k] @ x[:, :T - shift]
+    return out
+
+
+def _linear(config: Dict[str, Any], w: _Weights) -> Callable:
+    import numpy as np
+    taps = w.take(int(config['receptive_field']))
+    bias = w.take(1)[0] if config.get('bias') else 0.0
+
+    def forward(x):
+        return np.convolve(x, taps[::-1])[:len(x)] + bias
+    return forward
+
+
+def _wavenet(config: Dict[str, Any], w: _Weights) -> Callable:
+    if config.get('head') is not None:
+        raise AnalysisError("WaveNet models with a head network are not supported")
+    arrays = []
+    for spec in config['layers']:
+        ch, cin, cond = spec['channels'], spec['input_size'], spec['condition_size']
+        kernel, gated = spec['kernel_size'], bool(spec.get('gated'))
+        mid = 2 * ch if gated else ch
+        rechannel = w.take(ch, cin)
+        layers = []
+        for d in spec['dilations']:
+            conv, conv_b = w.take(mid, ch, kernel), w.take(mid, 1)
+            mixin = w.take(mid, cond)
+            one, one_b = w.take(ch, ch), w.take(ch, 1)
+            layers.append((d, conv, conv_b, mixin, one, one_b))
+        head = w.take(spec['head_size'], ch)
+        head_b = w.take(spec['head_size'], 1) if spec.get('head_bias') else None
+        arrays.append((ch, gated, _activation(spec['activation']), rechannel, layers, head, head_b))
+    head_scale = float(w.take(1)[0])
+
+    def forward(x):
+        cond = x[None, :]
+        layer_in, head_in = cond, None
+        for ch, gated, act, rechannel, layers, head, head_b in arrays:
+            h = rechannel @ layer_in
+            for d, conv, conv_b, mixin, one, one_b in layers:
+                z = _causal_conv(conv, h, d)
+                z += conv_b
+                z += mixin @ cond
+                a = act(z[:ch]) * _sigmoid(z[ch:]) if gated else act(z)
+                head_in = a if head_in is None else head_in + a
+                h = h + one @ a + one_b
+            head_in = head @ head_in
+            if head_b is not None:
+                head_in += head_b
+            layer_in = h
+        return head_scale * head_in[0]
+    return forward
+
+
+def _lstm(config: Dict[str, Any], w: _Weights) -> Callable:
+    import numpy as np
+    hidden, inputs = config['hidden_size'], config['input_size']
+    H = hidden
+    # PyTorch gate order is i, f, g, o; regroup to i, f, o, g so the three
+    # sigmoid gates are one contiguous slice. sigmoid(z) = (tanh(z / 2) + 1) / 2,
+    # so with the sigmoid rows halved up front one tanh covers all four gates.
+    order = np.r_[0:2 * H, 3 * H:4 * H, 2 * H:3 * H]
+    scale = np.r_[np.full(3 * H, 0.5), np.ones(H)]
+    layers = []
+    for i in range(config['num_layers']):
+        n_in = inputs if i == 0 else hidden
+        wxh = w.take(4 * H, n_in + H)[order] * scale[:, None]
+        b = w.take(4 * H)[order] * scale
+        h0, c0 = w.take(H), w.take(H)
+        layers.append((wxh[:, :n_in], wxh[:, n_in:], b, h0, c0))
+    head_w, head_b = w.take(1, H), w.take(1)
+
+    def forward(x):
+        seq = x[None, :].astype(np.float64)
+        for wx, wh, b, h0, c0 in layers:
+            # Input projection for every sample in one matmul; only the
+            # recurrent term is left for the time loop
+            pre = (wx @ seq).T + b
+            c = c0.astype(np.float64)
+            out = np.empty((len(x), H))
+            h = h0.astype(np.float64)
+            for t in range(len(x)):
+                g = wh @ h
+                g += pre[t]
+                np.tanh(g, out=g)
+                s = g[:3 * H]
+                s += 1.0
+                s *= 0.5
+                c *= s[H:2 * H]
+                c += s[:H] * g[3 * H:]
+                h = out[t]
+                np.tanh(c, out=h)
+                h *= s[2 * H:]
+            seq = out.T
+        return (head_w @ seq)[0] + head_b[0]
+    return forward
+
+
+_ARCHITECTURES = {'Linear': _linear, 'WaveNet': _wavenet, 'LSTM': _lstm}
+
+
+def _weights_array(data: bytes):
+    """The "weights" list of a .nam file as float32, parsed straight from the bytes."""
+    import numpy as np
+    key = data.find(b'"weights"')
+    start = data.find(b'[', key) if key >= 0 else -1
+    end = data.find(b']', start) if start >= 0 else -1
+    if end < 0:
+        raise AnalysisError("no weights list")
+    body = data[start + 1:end]
+    if not body.strip():
+        return np.zeros(0, dtype=np.float32)
+    return np.array(body.split(b','), dtype=np.float32)  # parsed by NumPy, no Python float list
+
+
+class NamModel:
+    """A .nam capture ready to run: header fields + forward(x) -> y."""
+
+    def __init__(self, data: bytes):
+        self.info = db.nam_model_info(data)
+        arch = self.info.get('architecture')
+        builder = _ARCHITECTURES.get(arch)
+        if builder is None:
+            raise AnalysisError(f"unsupported architecture {arch!r}")
+        try:
+            weights = _Weights(_weights_array(data))
+            self._forward = builder(self.info.get('config') or {}, weights)
+            weights.finish()
+        except (KeyError, TypeError, ValueError) as e:
+            raise AnalysisError(f"bad {arch} model: {e}")
+        self.architecture = arch
+        self.sample_rate = int(self.info.get('sample_rate') or DEFAULT_SAMPLE_RATE)
+
+    def forward(self, x):
+        import numpy as np
+        return np.asarray(self._forward(np.asarray(x, dtype=np.float32)))
+
+
+def model_loudness(data: bytes) -> Dict[str, Any]:
+    """Run the test signal through a .nam model: output RMS / peak in dBFS."""
+    import numpy as np
+    model = NamModel(data)
+    y = model.forward(probe_signal(model.sample_rate)).astype(np.float64)
+    if not np.all(np.isfinite(y)):
+        raise AnalysisError("model output is not finite")
+    rms = float(np.sqrt(np.mean(y * y)))
+    peak = float(np.max(np.abs(y)))
+    floor = 1e-12
+    result = {
+        'loudness_db': float(20 * np.log10(max(rms, floor))),
+        'peak_db': float(20 * np.log10(max(peak, floor))),
+        'architecture': model.architecture,
+        'sample_rate': model.sample_rate,
+    }
+    meta = model.info.get('metadata')
+    if isinstance(meta, dict) and isinstance(meta.get('loudness'), (int, float)):
+        result['metadata_loudness_db'] = float(meta['loudness'])  # trainer's own measurement
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Impulse responses
+# ---------------------------------------------------------------------------
+
+class IRData:
+    """Samples of an impulse response as a view over the member bytes.
+
+    samples is (frames, channels) in the file's own dtype and shares memory
+    with the source buffer (24-bit PCM, which has no NumPy dtype, is the one
+    format that is converted). scale maps integer samples to [-1, 1).
+    """
+
+    def __init__(self, samples, sample_rate: int, format: str, scale: float = 1.0):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.format = format
+        self.scale = scale
+
+    @property
+    def frames(self) -> int:
+        return self.samples.shape[0]
+
+    @property
+    def channels(self) -> int:
+        return self.samples.shape[1]
+
+    def channel(self, index: int = 0):
+        """One channel as float64 (the only copy made for analysis)."""
+        import numpy as np
+        x = self.samples[:, index]
+        if self.format == 'pcm8':
+            return (x.astype(np.float64) - 128.0) * self.scale
+        return x.astype(np.float64) * self.scale if self.scale != 1.0 else x.astype(np.float64)
+
+
+_WAVE_FORMAT_PCM, _WAVE_FORMAT_FLOAT, _WAVE_FORMAT_EXTENSIBLE = 1, 3, 0xFFFE
+
+
+def _parse_wav(buf: memoryview) -> IRData:
+    import numpy as np
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(buf):
+        chunk_id = bytes(buf[pos:pos + 4])
+        size = int.from_bytes(buf[pos + 4:pos + 8], 'little')
+        body = pos + 8
+        if chunk_id == b'fmt ':
+            tag, channels, rate = (int.from_bytes(buf[body:body + 2], 'little'),
+                                   int.from_bytes(buf[body + 2:body + 4], 'little'),
+                                   int.from_bytes(buf[body + 4:body + 8], 'little'))
+            bits = int.from_bytes(buf[body + 14:body + 16], 'little')
+            if tag == _WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                tag = int.from_bytes(buf[body + 24:body + 26], 'little')  # sub-format GUID prefix
+            fmt = (tag, channels, rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise AnalysisError("WAV data chunk before fmt chunk")
+            tag, channels, rate, bits = fmt
+            if channels < 1:
+                raise AnalysisError("WAV file without channels")
+            width = bits // 8
+            size = min(size, len(buf) - body)
+            frames = size // (width * channels)
+            count = frames * channels
+            if tag == _WAVE_FORMAT_FLOAT and bits in (32, 64):
+                data, kind, scale = np.frombuffer(buf, f'<f{width}', count, body), f'float{bits}', 1.0
+            elif tag == _WAVE_FORMAT_PCM and bits in (16, 32):
+                data, kind, scale = np.frombuffer(buf, f'<i{width}', count, body), f'pcm{bits}', 2.0 ** (1 - bits)
+            elif tag == _WAVE_FORMAT_PCM and bits == 8:
+                data, kind, scale = np.frombuffer(buf, np.uint8, count, body), 'pcm8', 1 / 128
+            elif tag == _WAVE_FORMAT_PCM and bits == 24:
+                raw = np.frombuffer(buf, np.uint8, count * 3, body).reshape(-1, 3).astype(np.int32)
+                data = (raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)) << 8 >> 8  # sign-extend
+                kind, scale = 'pcm24', 2.0 ** -23
+            else:
+                raise AnalysisError(f"unsupported WAV encoding (format {tag}, {bits} bit)")
+            return IRData(data.reshape(frames, channels), rate, kind, scale)
+        pos = body + size + (size & 1)  # chunks are word aligned
+    raise AnalysisError("WAV file without a data chunk")
+
+
+def parse_ir(data) -> IRData:
+    """Map an IR member (bytes / memoryview) to an IRData view without copying.
+
+    RIFF/WAVE files are read from their header; anything else is taken as
+    raw little-endian float32 mono at IR_DEFAULT_SAMPLE_RATE.
+    """
+    import numpy as np
+    buf = memoryview(data).cast('B')
+    if len(buf) >= 12 and bytes(buf[:4]) == b'RIFF' and bytes(buf[8:12]) == b'WAVE':
+        return _parse_wav(buf)
+    if len(buf) % 4:
+        raise AnalysisError("not a WAV file and not raw float32 samples")
+    return IRData(np.frombuffer(buf, '<f4').reshape(-1, 1), IR_DEFAULT_SAMPLE_RATE, 'float32')
+
+
+def ir_summary(data) -> Dict[str, Any]:
+    """Length, peak, low/high rolloff and spectral centroid of an impulse response.
+
+    Rolloffs come from the power response averaged in 1/6-octave bands
+    (20 Hz - Nyquist): the lowest and highest band within IR_ROLLOFF_DB of
+    the loudest one.
+    """
+    import numpy as np
+    ir = parse_ir(data)
+    if ir.frames == 0:
+        raise AnalysisError("empty impulse response")
+    x = ir.channel(0)
+    rate = ir.sample_rate
+    energy = np.cumsum(x * x)
+    if energy[-1] <= 0:
+        raise AnalysisError("silent impulse response")
+    peak_at = int(np.argmax(np.abs(x)))
+    effective = int(np.searchsorted(energy, IR_ENERGY_FRACTION * energy[-1])) + 1
+
+    nfft = max(4096, 1 << (ir.frames - 1).bit_length())
+    power = np.abs(np.fft.rfft(x, nfft)) ** 2
+    freqs = np.fft.rfftfreq(nfft, 1.0 / rate)
+    centroid = float(np.sum(freqs * power) / np.sum(power))
+
+    nyquist = rate / 2
+    n_bands = int(np.floor(np.log2(nyquist / 20.0) * IR_BANDS_PER_OCTAVE))
+    centres = 20.0 * 2.0 ** (np.arange(max(n_bands, 1)) / IR_BANDS_PER_OCTAVE)
+    half = 2.0 ** (0.5 / IR_BANDS_PER_OCTAVE)
+    lo_bin = np.searchsorted(freqs, centres / half)
+    hi_bin = np.maximum(np.searchsorted(freqs, np.minimum(centres * half, nyquist)), lo_bin + 1)
+    csum = np.concatenate(([0.0], np.cumsum(power)))
+    band_power = (csum[hi_bin] - csum[lo_bin]) / (hi_bin - lo_bin)
+    band_db = 10 * np.log10(np.maximum(band_power, 1e-30))
+    within = np.nonzero(band_db >= band_db.max() - IR_ROLLOFF_DB)[0]
+    return {
+        'format': ir.format,
+        'sample_rate': rate,
+        'channels': ir.channels,
+        'samples': ir.frames,
+        'length_ms': 1000.0 * ir.frames / rate,
+        'effective_ms': 1000.0 * effective / rate,
+        'peak_db': float(20 * np.log10(max(float(np.max(np.abs(x))), 1e-12))),
+        'peak_ms': 1000.0 * peak_at / rate,
+        'low_rolloff_hz': float(centres[within[0]]),
+        'high_rolloff_hz': float(centres[within[-1]]),
+        'centroid_hz': centroid,
+    }
+
+
+def suggested_filters(summary: Dict[str, Any]) -> Tuple[float, float]:
+    """(hpFreq, lpFreq) matching an IR's passband: its rolloffs, kept in the valid range."""
+    hp = min(max(summary['low_rolloff_hz'], db.FREQ_MIN), db.FREQ_MAX)
+    lp = min(max(summary['high_rolloff_hz'], db.FREQ_MIN), db.FREQ_MAX)
+    return float(round(hp)), float(round(lp))
+
+
+# ---------------------------------------------------------------------------
+# Result cache (keyed by asset content digest)
+# ---------------------------------------------------------------------------
+
+class AnalysisCache:
+    """One small JSON file per (analysis, version, digest) in cache_dir('analysis').
+
+    A .npb member's digest costs a full read and inflate, so the digests of
+    a bank's members are kept too, keyed by their (offset, size) in the tar
+    stream and valid only while the bank has the same size, mtime and inode.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or db.cache_dir('analysis')
+
+    def _path(self, kind: str, version: int, digest: str) -> str:
+        return os.path.join(self.directory, f"{kind}-v{version}-{digest}.json")
+
+    def _digests_path(self, bank_path: str) -> str:
+        key = hashlib.sha1(os.path.abspath(bank_path).encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.directory, f"digests-{key}.json")
+
+    def _load(self, path: str) -> Optional[Any]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, path: str, doc: Any):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(doc, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the cache is an optimisation only
+
+    def get(self, kind: str, version: int, digest: str) -> Optional[Dict[str, Any]]:
+        return self._load(self._path(kind, version, digest))
+
+    def put(self, kind: str, version: int, digest: str, result: Dict[str, Any]):
+        self._store(self._path(kind, version, digest), result)
+
+    def member_digests(self, bank_path: str, st: os.stat_result) -> Dict[str, str]:
+        """{'offset:size': digest} recorded for the bank at bank_path as of st."""
+        doc = self._load(self._digests_path(bank_path))
+        if (not isinstance(doc, dict) or doc.get('path') != os.path.abspath(bank_path)
+                or doc.get('stat') != [st.st_size, st.st_mtime_ns, st.st_ino]):
+            return {}
+        return doc.get('members') or {}
+
+    def put_member_digests(self, bank_path: str, st: os.stat_result, digests: Dict[str, str]):
+        self._store(self._digests_path(bank_path), {
+            'path': os.path.abspath(bank_path),
+            'stat': [st.st_size, st.st_mtime_ns, st.st_ino],
+            'members': digests,
+        })
+
+
+# ---------------------------------------------------------------------------
+# Bank level
+# ---------------------------------------------------------------------------
+
+def _bank_assets(path: str, suffix) -> Iterator[Tuple[str, Optional[str], Callable[[], bytes], Optional[str]]]:
+    """(name, digest or None, load, member key) for members of bank path ending
+    in suffix (str or tuple).
+
+    Manifests know each digest up front, so a cache hit never touches the
+    store. .npb members come with 'offset:size' instead, the key of
+    AnalysisCache.member_digests.
+    """
+    import gzip
+    if db.is_manifest(path):
+        manifest = db.BankManifest(path)
+        for m in manifest.members:
+            if m.get('object') and m['name'].lower().endswith(suffix):
+                def load(m=m):
+                    with gzip.open(manifest.store.object_path(m['object']), 'rb') as f:
+                        return f.read(m['size'])
+                yield m['name'].lstrip('./'), m['object'], load, None
+        return
+    archive = db.BankArchive(path)
+    for e in archive.entries:
+        if e.type == 'file' and e.name.lower().endswith(suffix):
+            yield e.name.lstrip('./'), None, (lambda name=e.name: archive.read(name)), f"{e.offset}:{e.size}"
+
+
+def _analyse_assets(path: str, suffix, kind: str, version: int, analyse: Callable[[bytes], Dict[str, Any]],
+                    names=None, cache: Optional[AnalysisCache] = None,
+                    progress: Optional[db.ProgressCallback] = None) -> Dict[str, Dict[str, Any]]:
+    wanted = None if names is None else {n.lstrip('./') for n in names}
+    st = os.stat(path)
+    known = cache.member_digests(path, st) if cache and not db.is_manifest(path) else {}
+    learned = {}
+    todo = [a for a in _bank_assets(path, suffix) if wanted is None or a[0] in wanted]
+    results: Dict[str, Dict[str, Any]] = {}
+    for done, (name, digest, load, key) in enumerate(todo):
+        if progress:
+            progress(done, len(todo))
+        data = None
+        if digest is None:
+            digest = known.get(key)
+        if digest is None:
+            data = load()
+            digest = db.content_digest(data)
+            if key is not None:
+                learned[key] = digest
+        result = cache.get(kind, version, digest) if cache else None
+        if result is None:
+            try:
+                result = analyse(data if data is not None else load())
+            except AnalysisError as e:
+                result = {'error': str(e)}
+            if cache:
+                cache.put(kind, version, digest, result)
+        results[name] = dict(result, digest=digest)
+    if cache is not None and learned and _same_file(os.stat(path), st):
+        cache.put_member_digests(path, st, {**known, **learned})
+    if progress:
+        progress(len(todo), len(todo))
+    return results
+
+
+def _same_file(a: os.stat_result, b: os.stat_result) -> bool:
+    return (a.st_size, a.st_mtime_ns, a.st_ino) == (b.st_size, b.st_mtime_ns, b.st_ino)
+
+
+def bank_loudness(path: str, names=None, use_cache: bool = True,
+                  progress: Optional[db.ProgressCallback] = None) -> Dict[str, Dict[str, Any]]:
+    """Loudness of every .nam model in bank path (or just names), keyed by member name.
+
+    A model that cannot be analysed gets {'error': message} instead of failing
+    the whole bank. progress(done, total) counts models and may raise
+    db.OperationCancelled.
+    """
+    return _analyse_assets(path, '.nam', 'loudness', LOUDNESS_VERSION, model_loudness, names,
+                           AnalysisCache() if use_cache else None, progress)
+
+
+def normalized_volume(loudness_db, target_db: float = LOUDNESS_TARGET_DB, reference_vol: float = REFERENCE_VOL):
+    """potiVol bringing a model of loudness_db (scalar or array) to target_db.
+
+    potiVol is taken as a linear output gain, reference_vol being the setting
+    at which a model that already measures target_db plays; results are
+    clipped to the pot range.
+    """
+    import numpy as np
+    vol = reference_vol * 10 ** ((target_db - np.asarray(loudness_db, dtype=float)) / 20)
+    return np.round(np.clip(vol, db.POT_MIN, db.POT_MAX), 4)
+
+
+def normalize_volume(bank_or_config: Union[db.Bank, Dict[str, Any]], loudness: Dict[str, Dict[str, Any]],
+                     target_db: float = LOUDNESS_TARGET_DB, reference_vol: float = REFERENCE_VOL,
+                     rows=None) -> List[int]:
+    """Set potiVol of every preset (or just rows) whose model has a loudness result.
+
+    All values are written with one PresetColumns.set_column call. Returns
+    the rows that were set.
+    """
+    import numpy as np
+    if isinstance(bank_or_config, db.Bank):
+        cols = bank_or_config.preset_columns()
+    else:
+        cols = db.PresetColumns.from_presets(bank_or_config.get('presets', []))
+    candidates = np.nonzero(cols.objects() & cols.present('nam'))[0].tolist()
+    if rows is not None:
+        keep = set(rows)
+        candidates = [r for r in candidates if r in keep]
+    refs = cols.column('nam')
+    hit_rows, levels = [], []
+    for r in candidates:
+        ref = refs[r]
+        result = loudness.get(ref.lstrip('./')) if isinstance(ref, str) else None
+        if result and 'loudness_db' in result:
+            hit_rows.append(r)
+            levels.append(result['loudness_db'])
+    if hit_rows:
+        cols.set_column('potiVol', normalized_volume(levels, target_db, reference_vol), hit_rows)
+    return hit_rows
+
+
+def bank_ir_summaries(path: str, names=None, use_cache: bool = True,
+                      progress: Optional[db.ProgressCallback] = None) -> Dict[str, Dict[str, Any]]:
+    """ir_summary of every IR member of bank path (or just names), keyed by member name."""
+    return _analyse_assets(path, IR_SUFFIXES, 'ir', IR_VERSION, ir_summary, names,
+                           AnalysisCache() if use_cache else None, progress)
+
+
+def set_filters_from_ir(bank_or_config: Union[db.Bank, Dict[str, Any]], summaries: Dict[str, Dict[str, Any]],
+                        rows=None) -> List[int]:
+    """Set hpFreq / lpFreq of every preset (or just rows) from its cabinet IR's rolloffs.
+
+    Both columns are written with one set_column call each. Returns the rows
+    that were set.
+    """
+    import numpy as np
+    if isinstance(bank_or_config, db.Bank):
+        cols = bank_or_config.preset_columns()
+    else:
+        cols = db.PresetColumns.from_presets(bank_or_config.get('presets', []))
+    candidates = np.nonzero(cols.objects() & cols.present('ir'))[0].tolist()
+    if rows is not None:
+        keep = set(rows)
+        candidates = [r for r in candidates if r in keep]
+    refs = cols.column('ir')
+    hit_rows, hp, lp = [], [], []
+    for r in candidates:
+        ref = refs[r]
+        summary = summaries.get(ref.lstrip('./')) if isinstance(ref, str) else None
+        if summary and 'low_rolloff_hz' in summary:
+            h, l = suggested_filters(summary)
+            hit_rows.append(r)
+            hp.append(h)
+            lp.append(l)
+    if hit_rows:
+        cols.set_column('hpFreq', hp, hit_rows)
+        cols.set_column('lpFreq', lp, hit_rows)
+    return hit_rows
@@ -10,23 +10,87 @@ Design goals:
 from __future__ import annotations
 import tarfile
 import json
-import os
+import base64
 import io
+import os
+import gzip
+import zlib
+import time
+import bisect
+import hashlib
+import marshal
+import importlib.util
 import tempfile
+import struct
+import sys
+import contextlib
 import shutil
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, List, Dict, Optional
+from typing import Any, BinaryIO, Callable, Iterable, List, Dict, Optional, Set, Tuple, Union
+
+import platformdirs
+
+import dimehead_profile as profile
+from dimehead_txn import BACKUP_SUFFIX, FileTransaction, backup_file, fsync_dir
 
 CONFIG_NAME = "config.json"
 
+# gzip levels for rewritten banks. 9 matches what tarfile's "w:gz" always used;
+# 1 trades a slightly larger file for a much faster save, 0 stores uncompressed
+# deflate blocks (still a valid .npb, just no compression work at all).
+DEFAULT_COMPRESSLEVEL = 9
+FAST_COMPRESSLEVEL = 1
+STORE_COMPRESSLEVEL = 0
+
+
+def _env_int(name: str, default: int, minimum: int = 0) -> int:
+    """Integer setting from the environment; default when unset or malformed."""
+    raw = os.environ.get(name)
+    if not raw:
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        warnings.warn(f"ignoring {name}={raw!r} (not an integer)", RuntimeWarning, stacklevel=2)
+        return default
+
+
+# Threads compressing rewritten banks (see _GzipMemberWriter). The default, 1,
+# is the plain single-threaded GzipFile path; more threads are opt-in via
+# $DIMEHEAD_COMPRESS_THREADS or nam_config_tool.py --threads.
+compress_threads = _env_int('DIMEHEAD_COMPRESS_THREADS', 1, minimum=1)
+
 class BankError(Exception):
     pass
 
+
+class OperationCancelled(BankError):
+    """Raised from a callback to abort a long-running operation."""
+
+
+class SaveCancelled(OperationCancelled):
+    """Raised from a progress callback to abort a save; temp files are removed."""
+
+
+# Progress callbacks get (bytes done, bytes total) and may raise SaveCancelled.
+ProgressCallback = Callable[[int, int], None]
+
+
+def cache_dir(*parts: str) -> str:
+    """Per-user cache directory (override with $DIMEHEAD_CACHE_DIR)."""
+    base = os.environ.get('DIMEHEAD_CACHE_DIR') or platformdirs.user_cache_dir('dimehead-configurator', appauthor=False)
+    return os.path.join(base, *parts)
+
 @dataclass
 class Asset:
     name: str
     size: int
     type: str  # 'file', 'dir', 'other'
+    digest: Optional[str] = None          # content_digest of the data (see scan_bank)
+    info: Optional[Dict[str, Any]] = None  # model header for .nam files
 
 @dataclass
 class Bank:
@@ -34,125 +98,2739 @@ class Bank:
     config: Dict[str, Any]
     assets: List[Asset] = field(default_factory=list)
     original_config_json: str = ""  # for diffing
+    _columns: Optional["PresetColumns"] = field(default=None, repr=False, compare=False)
+    _snapshot: Optional["ConfigSnapshot"] = field(default=None, repr=False, compare=False)
+
+    def preset_columns(self) -> "PresetColumns":
+        """Columnar view of config['presets'] (rebuilt if the list was replaced).
+
+        Edits made through it are written through to the preset dicts; code
+        that mutates the dicts directly must call invalidate_columns().
+        """
+        presets = self.config.setdefault('presets', [])
+        if self._columns is None or self._columns.rows is not presets:
+            self._columns = PresetColumns.from_presets(presets)
+        return self._columns
+
+    def invalidate_columns(self):
+        self._columns = None
+
+    def asset_refs(self) -> "AssetRefs":
+        """Preset <-> asset reference index over preset_columns() and assets.
+
+        Built on first use and kept current by the PresetColumns edit methods;
+        a replaced or extended assets list is picked up on the next query.
+        """
+        cols = self.preset_columns()
+        if cols.refs is None:
+            cols.refs = AssetRefs.build(cols)
+        cols.refs.use_assets(self.assets)
+        return cols.refs
 
     def diff_config(self) -> Dict[str, Any]:
-        """Return a naive diff structure {changed: {pointer: (old, new)}}."""
-        try:
-            old = json.loads(self.original_config_json)
-        except Exception:
-            return {"changed": {}, "added": {}, "removed": {}}
-        new = self.config
-        changed = {}
-        added = {}
-        removed = {}
-        # Shallow pointer diff (top-level + presets list length + preset names). Extend later.
-        for k in set(old.keys()) | set(new.keys()):
+        """Structural diff of config against the config as loaded / last saved.
+
+        See diff_configs for the result shape. The original is parsed and its
+        presets hashed once per original_config_json, not on every call.
+        """
+        snap = self._snapshot
+        if snap is None or snap.source is not self.original_config_json:
+            snap = self._snapshot = ConfigSnapshot(self.original_config_json)
+        if snap.config is None:
+            return {"changed": {}, "added": {}, "removed": {}, "moved": {}}
+        return diff_configs(snap.config, self.config, snap)
+
+
+# ---------------------------------------------------------------------------
+# Structural diff
+#
+# Values are compared recursively and every difference is reported under its
+# RFC 6901 pointer. Presets get special handling: unchanged slots are skipped
+# with a plain == (done in C), the rest are matched to original presets by a
+# content hash, and of the matched presets only those outside the longest run
+# that kept its relative order are reported as moves - so dragging one preset
+# from slot 2 to 5 is one move, not four changes. Presets with no identical
+# original are paired with a leftover original of the same name, or the one
+# in the same slot, and diffed field by field; the rest are added / removed.
+# ---------------------------------------------------------------------------
+
+def _content_hash(value: Any) -> bytes:
+    data = json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class ConfigSnapshot:
+    """Parsed original config plus per-preset content hashes (built once)."""
+
+    def __init__(self, source: str):
+        self.source = source
+        try:
+            self.config = json.loads(source) if source else None
+        except ValueError:
+            self.config = None
+        self.preset_hashes: List[bytes] = []
+        self.by_hash: Dict[bytes, List[int]] = {}
+        presets = self.config.get('presets') if isinstance(self.config, dict) else None
+        if isinstance(presets, list):
+            for i, p in enumerate(presets):
+                h = _content_hash(p)
+                self.preset_hashes.append(h)
+                self.by_hash.setdefault(h, []).append(i)
+
+
+def _escape(token: Any) -> str:
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def _same(a: Any, b: Any) -> bool:
+    # JSON-level equality: 1, 1.0 and true are different values
+    if type(a) is not type(b):
+        return False
+    return a == b if not isinstance(a, (dict, list)) else _deep_same(a, b)
+
+
+def _deep_same(a: Any, b: Any) -> bool:
+    if a != b:
+        return False
+    # a == b already holds, so only the value types are left to compare
+    if isinstance(a, dict):
+        types = list(map(type, a.values()))
+        if types != list(map(type, map(b.__getitem__, a))):
+            return False
+        pairs = zip(a.values(), map(b.__getitem__, a))
+    elif isinstance(a, list):
+        types = list(map(type, a))
+        if types != list(map(type, b)):
+            return False
+        pairs = zip(a, b)
+    else:
+        return True
+    if dict in types or list in types:
+        return all(_deep_same(x, y) for x, y in pairs if isinstance(x, (dict, list)))
+    return True
+
+
+def _diff_values(old: Any, new: Any, ptr: str, out: Dict[str, Dict[str, Any]]):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for k, v in old.items():
+            p = f"{ptr}/{_escape(k)}"
+            if k not in new:
+                out["removed"][p] = v
+            else:
+                _diff_values(v, new[k], p, out)
+        for k, v in new.items():
             if k not in old:
-                added[f"/{k}"] = new[k]
-            elif k not in new:
-                removed[f"/{k}"] = old[k]
+                out["added"][f"{ptr}/{_escape(k)}"] = v
+    elif isinstance(old, list) and isinstance(new, list):
+        for i in range(min(len(old), len(new))):
+            _diff_values(old[i], new[i], f"{ptr}/{i}", out)
+        for i in range(len(new), len(old)):
+            out["removed"][f"{ptr}/{i}"] = old[i]
+        for i in range(len(old), len(new)):
+            out["added"][f"{ptr}/{i}"] = new[i]
+    elif not _same(old, new):
+        out["changed"][ptr] = (old, new)
+
+
+def _stable_positions(seq: List[int]) -> set:
+    """Indexes into seq of one longest strictly increasing subsequence."""
+    tails: List[int] = []     # seq value ending the best run of each length
+    tail_pos: List[int] = []  # position in seq of that value
+    prev = [-1] * len(seq)
+    for pos, v in enumerate(seq):
+        k = bisect.bisect_left(tails, v)
+        if k == len(tails):
+            tails.append(v)
+            tail_pos.append(pos)
+        else:
+            tails[k] = v
+            tail_pos[k] = pos
+        prev[pos] = tail_pos[k - 1] if k else -1
+    keep = set()
+    pos = tail_pos[-1] if tail_pos else -1
+    while pos >= 0:
+        keep.add(pos)
+        pos = prev[pos]
+    return keep
+
+
+def _diff_presets(old: List[Any], new: List[Any], snap: Optional[ConfigSnapshot],
+                  out: Dict[str, Dict[str, Any]]):
+    if old == new and _deep_same(old, new):
+        return
+    if snap is None:
+        snap = ConfigSnapshot("")
+        snap.preset_hashes = [_content_hash(p) for p in old]
+        for i, h in enumerate(snap.preset_hashes):
+            snap.by_hash.setdefault(h, []).append(i)
+    n_old = len(old)
+    match: List[Optional[int]] = [None] * len(new)  # new index -> old index
+    used = [False] * n_old
+    pending = []
+    for i, p in enumerate(new):
+        if i < n_old and p == old[i] and _same(p, old[i]):
+            match[i] = i
+            used[i] = True
+        else:
+            pending.append(i)
+    leftover = []
+    for i in pending:
+        for j in snap.by_hash.get(_content_hash(new[i]), ()):
+            if not used[j]:
+                match[i] = j
+                used[j] = True
+                break
+        else:
+            leftover.append(i)
+    # Edited presets: pair with a leftover original of the same name (edited
+    # and moved), else with the original in the same slot (edited in place)
+    by_name: Dict[Any, List[int]] = {}
+    for j in range(n_old):
+        if not used[j] and isinstance(old[j], dict):
+            by_name.setdefault(old[j].get('name'), []).append(j)
+    edited = []
+    for i in leftover:
+        cands = by_name.get(new[i].get('name'), []) if isinstance(new[i], dict) else []
+        j = next((j for j in cands if not used[j]), None)
+        if j is None and i < n_old and not used[i]:
+            j = i
+        if j is not None:
+            match[i] = j
+            used[j] = True
+            edited.append(i)
+    paired = [(i, j) for i, j in enumerate(match) if j is not None]
+    keep = _stable_positions([j for _, j in paired])
+    for pos, (i, j) in enumerate(paired):
+        if pos not in keep:
+            out["moved"][f"/presets/{j}"] = f"/presets/{i}"
+    for i in edited:
+        _diff_values(old[match[i]], new[i], f"/presets/{i}", out)
+    for i, j in enumerate(match):
+        if j is None:
+            out["added"][f"/presets/{i}"] = new[i]
+    for j in range(n_old):
+        if not used[j]:
+            out["removed"][f"/presets/{j}"] = old[j]
+
+
+@profile.timed()
+def diff_configs(old: Dict[str, Any], new: Dict[str, Any],
+                 snapshot: Optional[ConfigSnapshot] = None) -> Dict[str, Dict[str, Any]]:
+    """Recursive diff of two configs.
+
+    Returns {"changed": {pointer: (old, new)}, "added": {pointer: new},
+    "removed": {pointer: old}, "moved": {old pointer: new pointer}}. Pointers
+    under /presets use the new index, except removed presets and the "from"
+    side of moves, which use the original index. snapshot (hashes of old's
+    presets) is built on the fly when not supplied.
+    """
+    out: Dict[str, Dict[str, Any]] = {"changed": {}, "added": {}, "removed": {}, "moved": {}}
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        _diff_values(old, new, "", out)
+        return out
+    for k, v in old.items():
+        p = f"/{_escape(k)}"
+        if k not in new:
+            out["removed"][p] = v
+        elif k == 'presets' and isinstance(v, list) and isinstance(new[k], list):
+            _diff_presets(v, new[k], snapshot, out)
+        else:
+            _diff_values(v, new[k], p, out)
+    for k, v in new.items():
+        if k not in old:
+            out["added"][f"/{_escape(k)}"] = v
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Columnar presets
+#
+# Bulk questions ("every potiGain", "which presets have boost on") and the GUI
+# table read the same few fields across all presets. PresetColumns keeps one
+# NumPy array per field - float64 / int64 / bool for numeric and flag fields,
+# an object array of interned strings for text - plus a presence mask, so such
+# reads are vectorized. Values are stored exactly (a column only gets a typed
+# dtype when every present value has that Python type; anything else stays an
+# object column) and each preset's key order is kept, so to_presets()
+# reproduces config['presets'] losslessly. Edits are written through to the
+# bound preset dicts, which stay the source of truth for saving.
+# ---------------------------------------------------------------------------
+
+_COLUMN_FILL = {'float': float('nan'), 'int': 0, 'bool': False, 'str': '', 'object': None}
+
+
+def _column_kind(values: List[Any]) -> str:
+    if not values:
+        return 'object'
+    t = type(values[0])
+    if any(type(v) is not t for v in values):
+        return 'object'
+    if t is bool: return 'bool'
+    if t is float: return 'float'
+    if t is str: return 'str'
+    if t is int and all(-2**63 <= v < 2**63 for v in values): return 'int'
+    return 'object'
+
+
+def _fits(kind: str, value: Any) -> bool:
+    if kind == 'object': return True
+    if kind == 'bool': return type(value) is bool
+    if kind == 'float': return type(value) is float
+    if kind == 'str': return type(value) is str
+    return type(value) is int and -2**63 <= value < 2**63
+
+
+@dataclass
+class _Column:
+    kind: str
+    values: Any   # numpy array
+    present: Any  # numpy bool array
+
+
+class PresetColumns:
+    def __init__(self, rows: List[Any], columns: Dict[str, _Column], layouts: List[Tuple[str, ...]],
+                 layout_idx: Any):
+        self.rows = rows                # bound preset list (edits write through)
+        self._cols = columns
+        self._layouts = layouts         # distinct key orders
+        self._layout_pos = {l: i for i, l in enumerate(layouts)}
+        self._layout_idx = layout_idx   # int32 per row; -1 = not a dict (kept as-is)
+        self.refs: Optional[AssetRefs] = None  # attached reference index, kept in step with edits
+
+    @classmethod
+    def from_presets(cls, presets: List[Any]) -> "PresetColumns":
+        import numpy as np
+        n = len(presets)
+        layouts: List[Tuple[str, ...]] = []
+        layout_pos: Dict[Tuple[str, ...], int] = {}
+        layout_idx = np.full(n, -1, dtype=np.int32)
+        by_field: Dict[str, List[Tuple[int, Any]]] = {}
+        for i, p in enumerate(presets):
+            if not isinstance(p, dict):
+                continue
+            keys = tuple(p)
+            li = layout_pos.get(keys)
+            if li is None:
+                li = layout_pos[keys] = len(layouts)
+                layouts.append(keys)
+            layout_idx[i] = li
+            for k, v in p.items():
+                by_field.setdefault(k, []).append((i, v))
+        columns = {}
+        for k, cells in by_field.items():
+            columns[k] = cls._build_column(n, cells)
+        return cls(presets, columns, layouts, layout_idx)
+
+    @staticmethod
+    def _build_column(n: int, cells: List[Tuple[int, Any]]) -> _Column:
+        import numpy as np
+        idx = np.fromiter((i for i, _ in cells), dtype=np.intp, count=len(cells))
+        vals = [v for _, v in cells]
+        kind = _column_kind(vals)
+        present = np.zeros(n, dtype=bool)
+        present[idx] = True
+        if kind == 'float':
+            arr = np.full(n, np.nan)
+            arr[idx] = vals
+        elif kind == 'int':
+            arr = np.zeros(n, dtype=np.int64)
+            arr[idx] = vals
+        elif kind == 'bool':
+            arr = np.zeros(n, dtype=bool)
+            arr[idx] = vals
+        else:
+            arr = np.full(n, _COLUMN_FILL[kind], dtype=object)
+            if kind == 'str':
+                vals = [sys.intern(v) for v in vals]
+            # element-wise so list/dict values are stored as objects, not broadcast
+            for i, v in zip(idx.tolist(), vals):
+                arr[i] = v
+        return _Column(kind, arr, present)
+
+    # -- reading ------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._layout_idx)
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._cols)
+
+    def kind(self, field: str) -> Optional[str]:
+        col = self._cols.get(field)
+        return col.kind if col else None
+
+    def column(self, field: str):
+        """The value array for field (fill values where absent; see present())."""
+        import numpy as np
+        col = self._cols.get(field)
+        if col is None:
+            return np.full(len(self), None, dtype=object)
+        return col.values
+
+    def present(self, field: str):
+        import numpy as np
+        col = self._cols.get(field)
+        return col.present if col else np.zeros(len(self), dtype=bool)
+
+    def objects(self):
+        """Bool mask of rows that are JSON objects (anything else is kept as-is)."""
+        return self._layout_idx >= 0
+
+    def get(self, row: int, field: str, default: Any = None) -> Any:
+        col = self._cols.get(field)
+        if col is None or not col.present[row]:
+            return default
+        v = col.values[row]
+        return v.item() if hasattr(v, 'item') else v
+
+    def to_presets(self) -> List[Any]:
+        """Rebuild the preset list from the columns (lossless, fresh dicts)."""
+        lists = {k: c.values.tolist() for k, c in self._cols.items()}
+        out = []
+        for i, li in enumerate(self._layout_idx.tolist()):
+            if li < 0:
+                out.append(self.rows[i])
+                continue
+            out.append({k: lists[k][i] for k in self._layouts[li]})
+        return out
+
+    # -- editing (write-through) ---------------------------------------------
+    def _ensure_column(self, field: str, sample: Any) -> _Column:
+        import numpy as np
+        col = self._cols.get(field)
+        n = len(self)
+        if col is None:
+            kind = _column_kind([sample])
+            if kind in ('str', 'object'):
+                values = np.full(n, _COLUMN_FILL[kind], dtype=object)
             else:
-                if old[k] != new[k]:
-                    # Special-case presets for name changes
-                    if k == 'presets' and isinstance(old[k], list) and isinstance(new[k], list):
-                        if len(old[k]) != len(new[k]):
-                            changed['/presets'] = (len(old[k]), len(new[k]))
-                        for i, (po, pn) in enumerate(zip(old[k], new[k])):
-                            if isinstance(po, dict) and isinstance(pn, dict) and po.get('name') != pn.get('name'):
-                                changed[f"/presets/{i}/name"] = (po.get('name'), pn.get('name'))
-                    else:
-                        changed[f"/{k}"] = (old[k], new[k])
-        return {"changed": changed, "added": added, "removed": removed}
+                values = np.full(n, _COLUMN_FILL[kind],
+                                 dtype={'float': np.float64, 'int': np.int64, 'bool': bool}[kind])
+            col = self._cols[field] = _Column(kind, values, np.zeros(n, dtype=bool))
+        elif not _fits(col.kind, sample):
+            # Promote to a generic object column so no value changes type
+            values = np.empty(n, dtype=object)
+            for i, v in enumerate(col.values.tolist()):
+                values[i] = v if col.present[i] else None
+            col.kind, col.values = 'object', values
+        return col
 
+    def _add_key(self, row: int, field: str):
+        li = int(self._layout_idx[row])
+        self._set_layout(row, self._layouts[li] + (field,))
 
-def _tar_members(path: str):
-    with tarfile.open(path, "r:gz") as tf:
-        for m in tf.getmembers():
+    def _set_layout(self, row: int, keys: Tuple[str, ...]):
+        pos = self._layout_pos.get(keys)
+        if pos is None:
+            pos = self._layout_pos[keys] = len(self._layouts)
+            self._layouts.append(keys)
+        self._layout_idx[row] = pos
+
+    def set(self, row: int, field: str, value: Any):
+        if self._layout_idx[row] < 0:
+            raise BankError(f"Preset {row} is not an object")
+        col = self._ensure_column(field, value)
+        col.values[row] = sys.intern(value) if type(value) is str else value
+        if not col.present[row]:
+            col.present[row] = True
+            self._add_key(row, field)
+        self.rows[row][field] = value
+        if self.refs is not None and field in _ASSET_REF_SET:
+            self.refs.update(row, field, value)
+
+    def unset(self, row: int, field: str):
+        """Remove field from preset row (no-op if it is absent)."""
+        col = self._cols.get(field)
+        if col is None or not col.present[row]:
+            return
+        col.present[row] = False
+        col.values[row] = _COLUMN_FILL[col.kind]
+        li = int(self._layout_idx[row])
+        self._set_layout(row, tuple(k for k in self._layouts[li] if k != field))
+        del self.rows[row][field]
+        if self.refs is not None and field in _ASSET_REF_SET:
+            self.refs.update(row, field, None)
+
+    def update_row(self, row: int, values: Dict[str, Any]):
+        for k, v in values.items():
+            self.set(row, k, v)
+
+    def set_column(self, field: str, values: Any, rows: Any = None):
+        """Vectorized assignment of field for rows (default: every preset).
+
+        values is a scalar or a sequence/array aligned with rows.
+        """
+        import numpy as np
+        rows_arr = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.intp)
+        if rows_arr.size == 0:
+            return
+        if np.any(self._layout_idx[rows_arr] < 0):
+            raise BankError("Cannot set fields on a preset that is not an object")
+        if np.isscalar(values) or values is None:
+            py_vals = [values] * len(rows_arr)
+        else:
+            py_vals = np.asarray(values).tolist() if not isinstance(values, list) else values
+            if len(py_vals) != len(rows_arr):
+                raise ValueError("values and rows differ in length")
+        col = self._ensure_column(field, py_vals[0])
+        if col.kind != 'object' and not all(_fits(col.kind, v) for v in py_vals):
+            col = self._ensure_column(field, object())
+        if col.kind in ('float', 'int', 'bool'):
+            col.values[rows_arr] = py_vals
+        else:
+            for r, v in zip(rows_arr.tolist(), py_vals):
+                col.values[r] = sys.intern(v) if type(v) is str else v
+        missing = rows_arr[~col.present[rows_arr]]
+        col.present[rows_arr] = True
+        for r in missing.tolist():
+            self._add_key(r, field)
+        for r, v in zip(rows_arr.tolist(), py_vals):
+            self.rows[r][field] = v
+        if self.refs is not None and field in _ASSET_REF_SET:
+            for r, v in zip(rows_arr.tolist(), py_vals):
+                self.refs.update(r, field, v)
+
+    def move_row(self, src: int, dst: int):
+        """Move preset src to final index dst (list.pop + insert semantics).
+
+        Only the rows between src and dst shift, in place.
+        """
+        import numpy as np
+        if src == dst:
+            return
+        if src < dst:
+            sl, shift = slice(src, dst + 1), -1
+        else:
+            sl, shift = slice(dst, src + 1), 1
+        arrays = [self._layout_idx]
+        for col in self._cols.values():
+            arrays += (col.values, col.present)
+        for arr in arrays:
+            arr[sl] = np.roll(arr[sl], shift)
+        self.rows.insert(dst, self.rows.pop(src))
+        if self.refs is not None:
+            self.refs.move(src, dst)
+
+
+# ---------------------------------------------------------------------------
+# Asset references
+#
+# Presets name their assets in ASSET_REF_FIELDS. AssetRefs indexes that in
+# both directions - row -> {field: name} and name -> {(row, field)} - so
+# "which presets use this IR" and "which references are missing" are dict
+# lookups instead of presets x assets scans. It is built once from the
+# PresetColumns (Bank.asset_refs) and the column edit methods update it.
+# Names are compared without the './' prefix archive members carry.
+# References under DEVICE_ASSET_PREFIX name models that ship on the device
+# (factory presets use them) and are never reported missing.
+# ---------------------------------------------------------------------------
+
+ASSET_REF_FIELDS = ('nam', 'boostNam', 'ir', 'roomConvolutionFile')
+DEVICE_ASSET_PREFIX = 'Factory/'
+ASSET_SUFFIXES = ('.nam', '.ir', '.reverb', '.wav')  # members that count as orphans when unused
+_ASSET_REF_SET = frozenset(ASSET_REF_FIELDS)
+
+
+def _asset_key(ref: Any) -> Optional[str]:
+    """Index key of a reference value (None for empty / non-string values)."""
+    if type(ref) is not str:
+        return None
+    return ref.lstrip('./') or None
+
+
+class AssetRefs:
+    def __init__(self, n_rows: int = 0):
+        self._row_refs: List[Dict[str, str]] = [{} for _ in range(n_rows)]
+        self._users: Dict[str, Set[Tuple[int, str]]] = {}
+        self._asset_list: Optional[List[Asset]] = None
+        self._indexed: Optional[List[Asset]] = None  # list (and length) _assets was built from
+        self._indexed_len = -1
+        self._assets: Dict[str, Asset] = {}
+
+    @classmethod
+    def build(cls, cols: PresetColumns, assets: Optional[List[Asset]] = None) -> "AssetRefs":
+        import numpy as np
+        refs = cls(len(cols))
+        for field in ASSET_REF_FIELDS:
+            present = cols.present(field)
+            if not present.any():
+                continue
+            values = cols.column(field)
+            for r in np.flatnonzero(present).tolist():
+                key = _asset_key(values[r])
+                if key is not None:
+                    refs._link(r, field, key)
+        if assets is not None:
+            refs.use_assets(assets)
+        return refs
+
+    # -- assets ---------------------------------------------------------------
+    def use_assets(self, assets: List[Asset]):
+        """Track assets (the bank's member list); indexed lazily on the next query."""
+        self._asset_list = assets
+
+    def _asset_map(self) -> Dict[str, Asset]:
+        assets = self._asset_list
+        if assets is not None and (assets is not self._indexed or len(assets) != self._indexed_len):
+            self._assets = {a.name.lstrip('./'): a for a in assets
+                            if a.type == 'file' and not _is_config(a.name)}
+            self._indexed, self._indexed_len = assets, len(assets)
+        return self._assets
+
+    # -- queries --------------------------------------------------------------
+    def users(self, name: str) -> List[Tuple[int, str]]:
+        """(row, field) pairs that reference name, by row."""
+        return sorted(self._users.get(name.lstrip('./'), ()))
+
+    def rows(self, name: str) -> List[int]:
+        return sorted({r for r, _ in self._users.get(name.lstrip('./'), ())})
+
+    def refs(self, row: int) -> Dict[str, str]:
+        """{field: asset name} referenced by preset row."""
+        return dict(self._row_refs[row])
+
+    def referenced(self) -> List[str]:
+        return sorted(self._users)
+
+    def missing(self) -> Dict[str, List[Tuple[int, str]]]:
+        """Referenced names with no member in the bank -> their users.
+
+        Device assets (DEVICE_ASSET_PREFIX) are not missing when the bank
+        lacks them.
+        """
+        assets = self._asset_map()
+        return {k: sorted(u) for k, u in sorted(self._users.items())
+                if k not in assets and not k.startswith(DEVICE_ASSET_PREFIX)}
+
+    def orphans(self) -> List[Asset]:
+        """Model / IR members (ASSET_SUFFIXES) that no preset references."""
+        return [a for k, a in sorted(self._asset_map().items())
+                if k not in self._users and k.lower().endswith(ASSET_SUFFIXES)]
+
+    def shared(self) -> Dict[str, List[int]]:
+        """Names referenced by more than one preset -> those rows."""
+        out = {}
+        for k, u in sorted(self._users.items()):
+            rows = {r for r, _ in u}
+            if len(rows) > 1:
+                out[k] = sorted(rows)
+        return out
+
+    # -- maintenance (called by PresetColumns) --------------------------------
+    def _link(self, row: int, field: str, key: str):
+        self._row_refs[row][field] = key
+        self._users.setdefault(key, set()).add((row, field))
+
+    def _unlink(self, row: int, field: str):
+        key = self._row_refs[row].pop(field, None)
+        if key is None:
+            return
+        users = self._users[key]
+        users.discard((row, field))
+        if not users:
+            del self._users[key]
+
+    def update(self, row: int, field: str, value: Any):
+        """Preset row's field now holds value (None = removed)."""
+        self._unlink(row, field)
+        key = _asset_key(value)
+        if key is not None:
+            self._link(row, field, key)
+
+    def move(self, src: int, dst: int):
+        """Renumber after moving row src to dst (list.pop + insert semantics)."""
+        lo, hi = min(src, dst), max(src, dst)
+        span = [(r, list(self._row_refs[r].items())) for r in range(lo, hi + 1)]
+        for r, items in span:
+            for field, _key in items:
+                self._unlink(r, field)
+        order = list(range(lo, hi + 1))
+        order.insert(dst - lo, order.pop(src - lo))
+        for new_row, old_row in zip(range(lo, hi + 1), order):
+            for field, key in span[old_row - lo][1]:
+                self._link(new_row, field, key)
+
+
+# ---------------------------------------------------------------------------
+# Validation (FORMAT_SPEC §6)
+#
+# Preset rules are checked one field at a time against the PresetColumns
+# arrays: a typed column costs a couple of NumPy comparisons for the whole
+# bank, and only object columns (mixed or unexpected types) fall back to a
+# per-value check. Diagnostics carry the RFC 6901 pointer of the bad value.
+# ---------------------------------------------------------------------------
+
+FREQ_MIN, FREQ_MAX = 20.0, 20000.0                 # §6 "Frequencies within 20–20000 Hz"
+NG_THRESHOLD_MIN, NG_THRESHOLD_MAX = -1000.0, 0.0  # §2.2 ngThreshold; -1000.0 = gate off in factory banks
+LED_COLOR_MAX = 0xFFFFFF                           # §2.1 ledColor "24-bit RGB int"
+POT_MIN, POT_MAX = 0.0, 1.0                        # §2.1 notes / §6 "0 ≤ all poti* ≤ 1"
+
+# FORMAT_SPEC §2.1 preset field groups
+EQ_FIELDS = ('eqBassFreq', 'eqBassQ', 'eqMidsFreq', 'eqMidsQ', 'eqTrebleFreq', 'eqTrebleQ')
+
+
+@dataclass
+class Diagnostic:
+    pointer: str
+    message: str
+    value: Any = None
+    severity: str = "error"
+
+    def __str__(self):
+        return f"{self.severity}: {self.pointer or '/'}: {self.message}"
+
+
+@dataclass(frozen=True)
+class _Rule:
+    lo: float
+    hi: float
+    integer: bool = False
+    sentinel: Optional[float] = None  # allowed out-of-range "disabled" value
+
+    def describe(self) -> str:
+        text = f"{self.lo:g}..{self.hi:g}" if not self.integer or self.hi < 256 else f"0..0x{int(self.hi):06X}"
+        if self.sentinel is not None:
+            text += f" (or {self.sentinel:g} = off)"
+        return f"out of range {text}"
+
+
+_GLOBAL_RULES = {
+    'lcdBrightness': _Rule(0, 10, integer=True),      # §2 lcdBrightness "0 - 10"
+    'ledBrightness': _Rule(0, 10, integer=True),      # §2 ledBrightness "0 - 10"
+    'midiChannelIndex': _Rule(0, 16, integer=True),   # §2 midiChannelIndex "Omni (0), 1-16"
+    'tunerReferencePitch': _Rule(430.0, 450.0),       # §2 "Tuner Pitch Reference 430.0 - 450.0 Hz"
+}
+
+
+def _preset_rule(field: str) -> Optional[_Rule]:
+    if field.startswith('poti'):  # §6 "0 ≤ all poti* ≤ 1"
+        return _Rule(POT_MIN, POT_MAX)
+    if field in ('hpFreq', 'lpFreq'):
+        # §2.1 notes / §6: 0.0 disables lpFreq; factory banks use it for hpFreq too
+        return _Rule(FREQ_MIN, FREQ_MAX, sentinel=0.0)
+    if field.endswith('Freq') or field in ('roomDelayHP', 'roomDelayLP'):  # §6 frequencies
+        return _Rule(FREQ_MIN, FREQ_MAX)
+    if field == 'ngThreshold':  # §6 "plausible negative range"
+        return _Rule(NG_THRESHOLD_MIN, NG_THRESHOLD_MAX)
+    if field == 'ledColor':  # §6 "within 0x000000–0xFFFFFF"
+        return _Rule(0, LED_COLOR_MAX, integer=True)
+    return None
+
+
+def _check_value(value: Any, rule: _Rule) -> Optional[str]:
+    if rule.integer:
+        if type(value) is not int:
+            return "expected an integer"
+    elif type(value) not in (int, float):
+        return "expected a number"
+    if rule.sentinel is not None and value == rule.sentinel:
+        return None
+    if not (rule.lo <= value <= rule.hi):  # also rejects NaN
+        return rule.describe()
+    return None
+
+
+def _check_column(cols: PresetColumns, field: str, rule: _Rule) -> List[Tuple[int, str, Any]]:
+    import numpy as np
+    kind = cols.kind(field)
+    values = cols.column(field)
+    present = cols.present(field)
+    if kind == 'int' or (kind == 'float' and not rule.integer):
+        with np.errstate(invalid='ignore'):
+            bad = present & ~((values >= rule.lo) & (values <= rule.hi))
+            if rule.sentinel is not None:
+                bad &= values != rule.sentinel
+        msg = rule.describe()
+        return [(row, msg, values[row].item()) for row in np.flatnonzero(bad).tolist()]
+    out = []
+    for row in np.flatnonzero(present).tolist():
+        value = values[row]
+        value = value.item() if hasattr(value, 'item') else value
+        msg = _check_value(value, rule)
+        if msg:
+            out.append((row, msg, value))
+    return out
+
+
+@profile.timed()
+def validate(bank: Union[Bank, Dict[str, Any]], assets: Optional[List[Asset]] = None) -> List[Diagnostic]:
+    """Check a bank (or a bare config dict) against the FORMAT_SPEC §6 rules.
+
+    With assets (the bank's member list) every ASSET_REF_FIELDS reference
+    must also name one of them; a missing one is a warning, since factory
+    presets name models that live on the device rather than in the bank.
+
+    Returns pointer-addressed diagnostics, global settings first, then presets
+    in row order; an empty list means the bank passed.
+    """
+    config = bank.config if isinstance(bank, Bank) else bank
+    if not isinstance(config, dict):
+        return [Diagnostic('', "config must be a JSON object", config)]
+    diags = []
+    for key, rule in _GLOBAL_RULES.items():
+        if key in config:
+            msg = _check_value(config[key], rule)
+            if msg:
+                diags.append(Diagnostic(f"/{key}", msg, config[key]))
+    presets = config.get('presets')
+    if presets is None:
+        return diags
+    if not isinstance(presets, list):
+        return diags + [Diagnostic('/presets', "presets must be a list", presets)]
+    if isinstance(bank, Bank):
+        cols = bank.preset_columns()
+    else:
+        cols = PresetColumns.from_presets(presets)
+    found = []
+    for row in (~cols.objects()).nonzero()[0].tolist():
+        found.append((row, -1, Diagnostic(f"/presets/{row}", "preset must be an object", presets[row])))
+    for pos, field in enumerate(cols.fields):
+        rule = _preset_rule(field)
+        if rule is None:
+            continue
+        for row, msg, value in _check_column(cols, field, rule):
+            found.append((row, pos, Diagnostic(f"/presets/{row}/{_escape(field)}", msg, value)))
+    if assets is not None:
+        positions = {f: i for i, f in enumerate(cols.fields)}
+        for name, users in AssetRefs.build(cols, assets).missing().items():
+            for row, field in users:
+                found.append((row, positions[field], Diagnostic(f"/presets/{row}/{_escape(field)}",
+                                                                "asset not in bank", presets[row][field],
+                                                                severity="warning")))
+    found.sort(key=lambda t: t[:2])
+    return diags + [d for _, _, d in found]
+
+
+# ---------------------------------------------------------------------------
+# Raw tar streaming
+#
+# A save only ever replaces config.json, so every other member is copied as
+# raw tar blocks (header + padded data) instead of being parsed into TarInfo
+# objects, buffered and re-serialised through tarfile.addfile.
+# ---------------------------------------------------------------------------
+
+_BLOCK = tarfile.BLOCKSIZE
+_COPY_CHUNK = 1024 * 1024
+_EOF_BLOCKS = tarfile.NUL * (2 * _BLOCK)
+_EXT_TYPES = (tarfile.GNUTYPE_LONGNAME, tarfile.GNUTYPE_LONGLINK,
+              tarfile.XHDTYPE, tarfile.XGLTYPE, tarfile.SOLARIS_XHDTYPE)
+
+
+def _padded(size: int) -> int:
+    return (size + _BLOCK - 1) // _BLOCK * _BLOCK
+
+
+def _is_config(name: str) -> bool:
+    return name.lstrip('./') == CONFIG_NAME
+
+
+def _member_type(info: tarfile.TarInfo) -> str:
+    if info.isdir(): return 'dir'
+    if info.isfile(): return 'file'
+    return 'other'
+
+
+def _parse_pax(payload: bytes) -> Dict[str, str]:
+    """Parse pax extended header records ("<len> <key>=<value>\n")."""
+    out = {}
+    pos = 0
+    while pos < len(payload):
+        sp = payload.find(b' ', pos)
+        if sp < 0:
+            break
+        try:
+            length = int(payload[pos:sp])
+        except ValueError:
+            break
+        record = payload[sp + 1:pos + length - 1]
+        key, _, value = record.partition(b'=')
+        out[key.decode('utf-8', 'surrogateescape')] = value.decode('utf-8', 'surrogateescape')
+        pos += length
+    return out
+
+
+@dataclass
+class RawMember:
+    """One tar member as found in the uncompressed stream."""
+    name: str
+    size: int
+    type: str
+    offset: int       # uncompressed offset of the first header block
+    offset_data: int  # uncompressed offset of the member data
+    header: bytes     # raw header block(s), including pax / GNU long-name blocks
+    info: tarfile.TarInfo
+
+
+class _TarStream:
+    """Sequential reader over an uncompressed tar stream.
+
+    Yields RawMember entries; the data of the current member can be copied,
+    read or skipped. Anything left unconsumed is skipped by the next call to
+    next().
+    """
+
+    def __init__(self, fileobj: BinaryIO, on_chunk: Optional[Callable[[], None]] = None):
+        self._f = fileobj
+        self._on_chunk = on_chunk  # called after every data chunk copied (progress)
+        self.pos = 0
+        self._remaining = 0  # padded data bytes of the current member still unread
+        self._size = 0
+
+    def _read(self, n: int) -> bytes:
+        buf = self._f.read(n)
+        while len(buf) < n:
+            more = self._f.read(n - len(buf))
+            if not more:
+                break
+            buf += more
+        self.pos += len(buf)
+        return buf
+
+    def __iter__(self):
+        while True:
+            m = self.next()
+            if m is None:
+                return
             yield m
 
-def load_bank(path: str) -> Bank:
+    def next(self) -> Optional[RawMember]:
+        self.skip_data()
+        start = self.pos
+        header = b''
+        name = None
+        size = None
+        while True:
+            block = self._read(_BLOCK)
+            if len(block) < _BLOCK:
+                if header:
+                    raise tarfile.ReadError("unexpected end of archive")
+                return None
+            if not header and block.count(tarfile.NUL) == _BLOCK:
+                return None  # end-of-archive marker
+            info = tarfile.TarInfo.frombuf(block, 'utf-8', 'surrogateescape')
+            header += block
+            if info.type in _EXT_TYPES:
+                ext = self._read(_padded(info.size))
+                if len(ext) < _padded(info.size):
+                    raise tarfile.ReadError("unexpected end of archive")
+                header += ext
+                payload = ext[:info.size]
+                if info.type == tarfile.GNUTYPE_LONGNAME:
+                    name = payload.rstrip(tarfile.NUL).decode('utf-8', 'surrogateescape')
+                elif info.type in (tarfile.XHDTYPE, tarfile.SOLARIS_XHDTYPE):
+                    pax = _parse_pax(payload)
+                    name = pax.get('path', name)
+                    if 'size' in pax:
+                        size = int(pax['size'])
+                continue
+            if name is not None:
+                info.name = name.rstrip('/') if info.isdir() else name
+            if size is not None:
+                info.size = size
+            data_size = info.size if info.isfile() else 0
+            self._size = data_size
+            self._remaining = _padded(data_size)
+            return RawMember(name=info.name, size=data_size, type=_member_type(info),
+                             offset=start, offset_data=self.pos, header=header, info=info)
+
+    def copy_data(self, out: BinaryIO):
+        """Copy the padded data blocks of the current member to out."""
+        while self._remaining:
+            chunk = self._read(min(self._remaining, _COPY_CHUNK))
+            if not chunk:
+                raise tarfile.ReadError("unexpected end of archive")
+            out.write(chunk)
+            self._remaining -= len(chunk)
+            if self._on_chunk is not None:
+                self._on_chunk()
+
+    def read_data(self) -> bytes:
+        data = self._read(self._remaining)
+        if len(data) < self._remaining:
+            raise tarfile.ReadError("unexpected end of archive")
+        self._remaining = 0
+        return data[:self._size]
+
+    def skip_data(self):
+        while self._remaining:
+            chunk = self._read(min(self._remaining, _COPY_CHUNK))
+            if not chunk:
+                raise tarfile.ReadError("unexpected end of archive")
+            self._remaining -= len(chunk)
+
+
+def encode_config(config: Dict[str, Any]) -> bytes:
+    with profile.span('json encode') as span:
+        data = json.dumps(config, indent=4).encode('utf-8')
+        span.add_bytes(len(data))
+    return data
+
+
+def _file_header(template: Optional[tarfile.TarInfo], name: str, size: int,
+                 mtime: Optional[float] = None) -> bytes:
+    """Header block(s) for a regular file member of size bytes.
+
+    Ownership and mode are taken from template (the member being replaced) so a
+    rewritten config.json looks like the one the device wrote.
+    """
+    info = tarfile.TarInfo(name=name)
+    if template is not None:
+        info.mode, info.uid, info.gid = template.mode, template.uid, template.gid
+        info.uname, info.gname = template.uname, template.gname
+    info.size = size
+    info.mtime = int(time.time() if mtime is None else mtime)
+    return info.tobuf(tarfile.GNU_FORMAT, 'utf-8', 'surrogateescape')
+
+
+def _member_blocks(template: Optional[tarfile.TarInfo], name: str, data: bytes) -> bytes:
+    """Header + padded data blocks for a regular file member (see _file_header)."""
+    return _file_header(template, name, len(data)) + data + tarfile.NUL * (_padded(len(data)) - len(data))
+
+
+# config.json and any member at least this large get a gzip member of their
+# own, so BankArchive can later seek straight to them (see _GzipMembers).
+_SEPARATE_MEMBER_SIZE = 1024 * 1024
+
+
+# Parallel compression, pigz style: a gzip member's data is cut into blocks
+# that are deflated on a thread pool (zlib releases the GIL). Each block is a
+# raw deflate stream primed with the previous block's last 32 KiB (zdict) and
+# ended with Z_SYNC_FLUSH, which byte-aligns it, so the compressed blocks
+# simply concatenate into one deflate stream - the last one ends with
+# Z_FINISH. The CRC-32 is computed in order on the writing thread. The output
+# has exactly the gzip members of the single-threaded writer and compresses
+# to within a few bytes per block of it.
+_PARALLEL_BLOCK = 128 * 1024
+_DICT_SIZE = 32 * 1024
+_XFL = {9: 2, 1: 4}  # gzip header "extra flags": max / fastest compression
+
+
+def _deflate_block(data: bytes, level: int, zdict: Optional[bytes], last: bool) -> bytes:
+    with profile.span('deflate', len(data)):
+        if zdict:
+            c = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, 0, zdict)
+        else:
+            c = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, 0)
+        return c.compress(data) + c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class _GzipMemberWriter:
+    """gzip writer that can end the current gzip member and start a new one.
+
+    threads > 1 compresses blocks of each member on a thread pool (see
+    _deflate_block); use the writer as a context manager so the pool is shut
+    down.
+    """
+
+    def __init__(self, f: BinaryIO, compresslevel: int, threads: Optional[int] = None):
+        self._f = profile.writer(f, 'disk write')
+        self._level = compresslevel
+        self._gz: Optional[gzip.GzipFile] = None
+        threads = compress_threads if threads is None else threads
+        self._threads = max(1, threads)
+        self._pool = ThreadPoolExecutor(self._threads, 'gzip') if self._threads > 1 else None
+        self._open = False
+        self._buf = bytearray()
+        self._pending: deque = deque()
+        self._zdict: Optional[bytes] = None
+        self._crc = 0
+        self._size = 0
+
+    def __enter__(self) -> "_GzipMemberWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        return False
+
+    def write(self, data: bytes):
+        if self._pool is None:
+            if self._gz is None:
+                self._gz = profile.writer(gzip.GzipFile(filename='', mode='wb', fileobj=self._f,
+                                                        compresslevel=self._level, mtime=0), 'deflate')
+            self._gz.write(data)
+            return
+        if not self._open:
+            self._f.write(b'\x1f\x8b\x08\x00\x00\x00\x00\x00' + bytes((_XFL.get(self._level, 0), 255)))
+            self._open = True
+        self._buf += data
+        while len(self._buf) >= _PARALLEL_BLOCK:
+            block = bytes(self._buf[:_PARALLEL_BLOCK])
+            del self._buf[:_PARALLEL_BLOCK]
+            self._submit(block, False)
+
+    def _submit(self, block: bytes, last: bool):
+        self._crc = zlib.crc32(block, self._crc)
+        self._size += len(block)
+        self._pending.append(self._pool.submit(_deflate_block, block, self._level, self._zdict, last))
+        self._zdict = block[-_DICT_SIZE:]  # every block but the last is _PARALLEL_BLOCK long
+        # Bounded look-ahead: write finished blocks in order as we go
+        while len(self._pending) > 2 * self._threads or (self._pending and self._pending[0].done()):
+            self._f.write(self._result())
+
+    def _result(self) -> bytes:
+        with profile.span('deflate wait'):
+            return self._pending.popleft().result()
+
+    def write_member(self, header: bytes, stream: Optional[_TarStream] = None, separate: bool = False):
+        """Write one tar member: header (+ padded data blocks) and, if given,
+        the current data of stream. separate=True isolates it in its own
+        gzip member."""
+        if separate:
+            self.close()
+        self.write(header)
+        if stream is not None:
+            stream.copy_data(self)
+        if separate:
+            self.close()
+
+    def close(self):
+        if self._gz is not None:
+            self._gz.close()
+            self._gz = None
+        if self._open:
+            self._submit(bytes(self._buf), True)
+            self._buf.clear()
+            while self._pending:
+                self._f.write(self._result())
+            self._f.write(struct.pack('<II', self._crc & 0xFFFFFFFF, self._size & 0xFFFFFFFF))
+            self._open = False
+            self._zdict = None
+            self._crc = self._size = 0
+
+
+@profile.timed()
+def rewrite_archive(src_path: str, dest_path: str, config_data: Optional[bytes] = None,
+                    compresslevel: int = DEFAULT_COMPRESSLEVEL, progress: Optional[ProgressCallback] = None,
+                    exclude: Iterable[str] = (), threads: Optional[int] = None):
+    """Write src_path to dest_path with config.json replaced by config_data.
+
+    Every other member is stream-copied as raw tar blocks, in its original
+    order. The new config.json takes the place of the old one (or is appended
+    if the source has none); config_data=None keeps the newest config.json
+    already in the archive. compresslevel is the gzip level of the output;
+    see DEFAULT_COMPRESSLEVEL / FAST_COMPRESSLEVEL / STORE_COMPRESSLEVEL.
+
+    config.json and large members each go in their own gzip member (still one
+    valid gzip stream) so BankArchive can fetch them without inflating the
+    rest of the bank.
+
+    Older config.json entries (overlays from append saves) are always dropped.
+    With config_data=None a header-only pre-pass also finds the newest copy of
+    every other duplicated name, so the result has exactly one entry per name.
+    Members named in exclude (with or without the './' prefix) are left out.
+
+    progress, if given, is called with (compressed source bytes consumed,
+    source size) as members are copied. threads is the number of compression
+    threads (default: the module's compress_threads).
+    """
+    drop = {name.lstrip('./') for name in exclude}
+    try:
+        keep = None
+        if config_data is None:
+            keep, config_data = _scan_latest(src_path)
+            if config_data is None:
+                raise BankError("config.json not found in archive")
+        with _open_bank(src_path) as f_in, \
+                gzip.GzipFile(fileobj=profile.reader(f_in, 'disk read'), mode='rb') as raw_in, \
+                open(dest_path, 'wb') as f_out, _GzipMemberWriter(f_out, compresslevel, threads) as out:
+            written = False
+            stream = _TarStream(profile.reader(raw_in, 'inflate'), _source_ticker(f_in, progress))
+            for m in stream:
+                if _is_config(m.name):
+                    if not written:
+                        out.write_member(_member_blocks(m.info, m.name, config_data), separate=True)
+                        written = True
+                    continue
+                if keep is not None and m.offset not in keep:
+                    continue
+                if drop and m.name.lstrip('./') in drop:
+                    continue
+                out.write_member(m.header, stream, separate=m.size >= _SEPARATE_MEMBER_SIZE)
+            if not written:
+                out.write_member(_member_blocks(None, f'./{CONFIG_NAME}', config_data), separate=True)
+            out.close()
+            # End-of-archive marker goes in its own gzip member; see append_config.
+            f_out.write(_EOF_MEMBER)
+            if progress is not None:
+                progress(f_in.tell(), _stream_size(f_in))
+    except (tarfile.TarError, gzip.BadGzipFile, EOFError) as e:
+        raise BankError(f"Failed to rewrite archive: {e}")
+
+
+def _source_ticker(f: BinaryIO, progress: Optional[ProgressCallback]) -> Optional[Callable[[], None]]:
+    """_TarStream chunk hook reporting how far into the compressed file f we are."""
+    if progress is None:
+        return None
+    total = _stream_size(f)
+    return lambda: progress(f.tell(), total)
+
+
+@profile.timed('scan latest')
+def _scan_latest(path: str):
+    """Header-only pass: (offsets of the last member per name, newest config data).
+
+    The offset set is None when no name occurs twice.
+    """
+    last: Dict[str, int] = {}
+    duplicated = False
+    config_data = None
+    with _open_bank(path) as f, gzip.GzipFile(fileobj=f, mode='rb') as raw_in:
+        stream = _TarStream(raw_in)
+        for m in stream:
+            key = m.name.lstrip('./')
+            if key in last:
+                duplicated = True
+            last[key] = m.offset
+            if _is_config(m.name):
+                config_data = stream.read_data()
+    return (set(last.values()) if duplicated else None), config_data
+
+
+# ---------------------------------------------------------------------------
+# Append-only config overlays
+#
+# Archives written by rewrite_archive end with a separate gzip member that only
+# holds the tar end-of-archive blocks. An append save cuts that trailer off,
+# writes a new gzip member containing just ./config.json and puts the trailer
+# back. gzip readers concatenate members and tar lets a later entry supersede
+# an earlier one with the same name, so the result is still one valid tar
+# stream - the save just costs O(size of config) instead of O(size of bank).
+# Use compact_bank (nam_config_tool.py compact) to fold overlays back in.
+#
+# The bank is modified in place, so a crash mid-append would leave a torn
+# tail. Before touching it append_config writes a journal (<path>.append:
+# where the trailer stood, and the file's inode), fsynced and renamed into
+# place, and removes it once the overlay is synced. Readers never write: when
+# a journal matches the bank they read it through _open_bank as it was before
+# the save (the bytes up to the recorded offset, then the trailer). The torn
+# tail is rolled back by the next writer, or by recover_append on its own
+# (nam_config_tool.py recover), which puts the trailer back at the recorded
+# offset. The journal is flocked for the duration of the append, so recovery
+# in another process waits for a live append instead of rolling it back.
+# ---------------------------------------------------------------------------
+
+_EOF_MEMBER = gzip.compress(_EOF_BLOCKS, compresslevel=9, mtime=0)
+APPEND_JOURNAL_SUFFIX = ".append"
+
+
+@contextlib.contextmanager
+def _flocked(f, exclusive: bool):
+    try:
+        import fcntl
+    except ImportError:  # Windows: no advisory locks; concurrent writers are not detected
+        yield
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+    try:
+        yield
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _pending_append(path: str, st: os.stat_result) -> Optional[int]:
+    """Offset the trailer stood at before an unfinished append save of the
+    file path / st, or None when there is no (matching) journal."""
+    try:
+        with open(path + APPEND_JOURNAL_SUFFIX, 'r', encoding='utf-8') as f:
+            rec = json.loads(f.read())
+        offset = rec['offset']
+        if rec.get('ino') == st.st_ino and isinstance(offset, int) and 0 <= offset <= st.st_size:
+            return offset
+    except (OSError, ValueError, TypeError, KeyError):
+        pass  # stale or malformed journals are recover_append's business
+    return None
+
+
+class _RolledBackView(io.RawIOBase):
+    """Read-only view of a bank as it was before an unfinished append save:
+    the bytes up to offset followed by the end-of-archive member."""
+
+    def __init__(self, f: BinaryIO, offset: int):
+        self._f = f
+        self._offset = offset
+        self._size = offset + len(_EOF_MEMBER)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        pos = self._pos
+        n = min(len(b), self._size - pos)
+        if n <= 0:
+            return 0
+        if pos < self._offset:
+            self._f.seek(pos)
+            data = self._f.read(min(n, self._offset - pos))
+        else:
+            data = _EOF_MEMBER[pos - self._offset:pos - self._offset + n]
+        b[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        base = {os.SEEK_SET: 0, os.SEEK_CUR: self._pos, os.SEEK_END: self._size}[whence]
+        if base + offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = base + offset
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+def _open_bank(path: str) -> BinaryIO:
+    """open(path, 'rb'), minus the torn tail of an unfinished append save."""
+    f = open(path, 'rb')
+    offset = _pending_append(path, os.fstat(f.fileno()))
+    return f if offset is None else _RolledBackView(f, offset)
+
+
+def _stream_size(f: BinaryIO) -> int:
+    pos = f.tell()
+    size = f.seek(0, os.SEEK_END)
+    f.seek(pos)
+    return size
+
+
+def _restore_trailer(path: str, offset: int):
+    """Cut path back to offset and put the end-of-archive member there."""
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.write(_EOF_MEMBER)
+        f.truncate()
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def recover_append(path: str) -> bool:
+    """Roll back an append save of path that a crash interrupted; True if one was."""
+    journal = path + APPEND_JOURNAL_SUFFIX
+    while True:
+        try:
+            f = open(journal, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return False
+        with f, _flocked(f, True):  # waits while the append is still running
+            try:
+                if os.stat(journal).st_ino != os.fstat(f.fileno()).st_ino:
+                    continue  # that append finished and a newer one started
+            except FileNotFoundError:
+                return False  # the append finished
+            try:
+                rec = json.loads(f.read())
+            except ValueError:
+                rec = None
+            try:
+                st = os.stat(path)
+                if rec is not None and rec.get('ino') == st.st_ino and rec['offset'] <= st.st_size:
+                    _restore_trailer(path, rec['offset'])
+                os.remove(journal)
+            except OSError as e:
+                raise BankError(f"Cannot roll back the interrupted append save of {path}: {e}")
+        fsync_dir(os.path.dirname(path) or '.')
+        return True
+
+
+@contextlib.contextmanager
+def _append_journal(path: str, offset: int, st: os.stat_result):
+    """Journal (and lock) an in-place append that starts writing at offset."""
+    journal = path + APPEND_JOURNAL_SUFFIX
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(journal) + '.', suffix='.tmp', dir=directory)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f, _flocked(f, True):
+        try:
+            json.dump({'offset': offset, 'ino': st.st_ino}, f)
+            f.flush()
+            os.fsync(f.fileno())
+            os.replace(tmp_path, journal)  # locked before it is visible
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        fsync_dir(directory)
+        try:
+            yield
+        except BaseException:
+            _restore_trailer(path, offset)  # should this fail too, readers skip the tail until recovery
+            os.remove(journal)
+            fsync_dir(directory)
+            raise
+        os.remove(journal)
+        fsync_dir(directory)
+
+
+@profile.timed()
+def append_config(path: str, config_data: bytes, compresslevel: int = DEFAULT_COMPRESSLEVEL) -> bool:
+    """Append config_data as a config.json overlay member.
+
+    Returns False (leaving the file untouched) when the archive does not end
+    with our separate end-of-archive member, e.g. a bank straight from the
+    device; callers then fall back to a full rewrite, which produces the
+    appendable layout for next time.
+    """
+    recover_append(path)
+    trailer = len(_EOF_MEMBER)
+    st = os.stat(path)
+    with open(path, 'r+b') as f:
+        end = f.seek(0, os.SEEK_END)
+        if end < trailer:
+            return False
+        f.seek(end - trailer)
+        if f.read(trailer) != _EOF_MEMBER:
+            return False
+        with profile.span('deflate', len(config_data)):
+            overlay = gzip.compress(_member_blocks(None, f'./{CONFIG_NAME}', config_data),
+                                    compresslevel=compresslevel)
+        with _append_journal(path, end - trailer, st):
+            f.seek(end - trailer)
+            f.write(overlay)
+            f.write(_EOF_MEMBER)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+    _index_after_append(path, st, end - trailer, len(overlay), len(config_data))
+    return True
+
+
+def _index_after_append(path: str, old_st: os.stat_result, coff: int, overlay_len: int, config_len: int):
+    """Extend a cached BankArchive index with a just-appended config overlay."""
+    cached = _load_index(path, old_st)
+    if cached is None:
+        return
+    entries, checkpoints = cached
+    if checkpoints[-1][0] != coff:
+        return
+    uoff = checkpoints[-1][1]
+    entries.append(IndexEntry(f'./{CONFIG_NAME}', uoff + _BLOCK, config_len, 'file'))
+    checkpoints.append((coff + overlay_len, uoff + _BLOCK + _padded(config_len)))
+    _store_index(path, os.stat(path), entries, checkpoints)
+
+
+@profile.timed()
+def compact_bank(path: str, backup: bool = True, compresslevel: int = DEFAULT_COMPRESSLEVEL):
+    """Fold appended config overlays back into one clean single-stream archive.
+
+    Run this before copying a bank to the device after append saves.
+    """
     if not os.path.isfile(path):
         raise BankError(f"File not found: {path}")
+    recover_append(path)
+    with FileTransaction(path, backup) as txn:
+        rewrite_archive(path, txn.tmp_path, None, compresslevel)
+
+
+# ---------------------------------------------------------------------------
+# Index-backed reading
+#
+# tarfile needs to inflate and walk the whole archive to list it. BankArchive
+# walks it once, records every member's (name, offset, size, type) plus the
+# gzip member boundaries, and keeps that index in the user cache directory
+# keyed by the bank's path, mtime and size. With the index, config.json or a
+# single asset is read by seeking to the nearest gzip member boundary at or
+# before it and inflating only from there.
+# ---------------------------------------------------------------------------
+
+class _GzipMembers:
+    """Decompressing reader over concatenated gzip members.
+
+    Unlike GzipFile it can start at any member boundary (coff, uoff) and
+    records where every member it enters begins, as (compressed offset,
+    uncompressed offset) checkpoints.
+    """
+
+    _CHUNK = 64 * 1024
+
+    def __init__(self, f: BinaryIO, coff: int = 0, uoff: int = 0):
+        self._f = f
+        f.seek(coff)
+        self._cpos = coff  # compressed offset of the first byte of self._in
+        self._in = b''
+        self._d = None
+        self.uoff = uoff
+        self.checkpoints: List[Tuple[int, int]] = [(coff, uoff)]
+
+    def read(self, n: int) -> bytes:
+        out = []
+        want = n
+        while want > 0:
+            if not self._in:
+                self._in = self._f.read(self._CHUNK)
+                if not self._in:
+                    if self._d is not None:
+                        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+                    break
+            if self._d is None:
+                # Between members: skip zero padding, then start a new member
+                stripped = self._in.lstrip(tarfile.NUL)
+                self._cpos += len(self._in) - len(stripped)
+                self._in = stripped
+                if not self._in:
+                    continue
+                if self.checkpoints[-1] != (self._cpos, self.uoff):
+                    self.checkpoints.append((self._cpos, self.uoff))
+                self._d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            data = self._d.decompress(self._in, want)
+            rest = self._d.unused_data if self._d.eof else self._d.unconsumed_tail
+            self._cpos += len(self._in) - len(rest)
+            self._in = rest
+            if self._d.eof:
+                self._d = None
+            if data:
+                out.append(data)
+                want -= len(data)
+                self.uoff += len(data)
+        return b''.join(out)
+
+    def skip(self, n: int):
+        while n > 0:
+            chunk = self.read(min(n, _COPY_CHUNK))
+            if not chunk:
+                raise EOFError("unexpected end of archive")
+            n -= len(chunk)
+
+
+@dataclass
+class IndexEntry:
+    name: str
+    offset: int  # offset of the member data in the uncompressed tar stream
+    size: int
+    type: str    # 'file', 'dir', 'other'
+
+
+_INDEX_VERSION = 1
+
+
+def _index_path(path: str) -> str:
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8', 'surrogateescape')).hexdigest()
+    return cache_dir('index', key + '.json')
+
+
+def _load_index(path: str, st: os.stat_result):
+    try:
+        with open(_index_path(path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (data.get('version') != _INDEX_VERSION or data.get('mtime_ns') != st.st_mtime_ns
+            or data.get('size') != st.st_size or data.get('path') != os.path.abspath(path)):
+        return None
+    entries = [IndexEntry(*e) for e in data['members']]
+    return entries, [tuple(c) for c in data['checkpoints']]
+
+
+def _replace_cache_file(target: str, data: bytes):
+    """Write a cache file through a temp file of its own, then rename it into place.
+
+    The temp file comes from mkstemp, so concurrent writers (server threads,
+    GUI workers, other processes) never share one; it is removed on failure.
+    """
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(target) + '.', suffix='.tmp',
+                               dir=os.path.dirname(target))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, target)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+def _store_index(path: str, st: os.stat_result, entries: List[IndexEntry], checkpoints):
+    if _pending_append(path, st) is not None:
+        return  # the view is not what path holds at this stat once a live append finishes
+    data = {
+        'version': _INDEX_VERSION,
+        'path': os.path.abspath(path),
+        'mtime_ns': st.st_mtime_ns,
+        'size': st.st_size,
+        'checkpoints': [list(c) for c in checkpoints],
+        'members': [[e.name, e.offset, e.size, e.type] for e in entries],
+    }
+    target = _index_path(path)
     try:
-        with tarfile.open(path, "r:gz") as tf:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        _replace_cache_file(target, json.dumps(data, separators=(',', ':')).encode('utf-8'))
+    except OSError:
+        pass  # the index is only a cache
+
+
+class BankArchive:
+    """Lazy, index-backed reader for a .npb archive.
+
+    The member index is built in one pass on first open and reused from the
+    cache afterwards, so listing members and fetching config.json or a single
+    asset never rescans the archive. When a name occurs more than once (config
+    overlays from append saves) the last entry wins, as with tar extraction.
+    """
+
+    def __init__(self, path: str, use_cache: bool = True):
+        if not os.path.isfile(path):
+            raise BankError(f"File not found: {path}")
+        self.path = path
+        st = os.stat(path)
+        cached = _load_index(path, st) if use_cache else None
+        self.from_cache = cached is not None
+        profile.count('index cache hit' if self.from_cache else 'index cache miss')
+        if cached is None:
+            entries, self._checkpoints = self._scan()
+            if use_cache:
+                _store_index(path, st, entries, self._checkpoints)
+        else:
+            entries, self._checkpoints = cached
+        self._starts = [u for _, u in self._checkpoints]
+        self._members = entries  # every entry in archive order, superseded ones included
+        self._entries: Dict[str, IndexEntry] = {}
+        for e in entries:
+            self._entries[e.name.lstrip('./')] = e
+
+    @profile.timed('index scan')
+    def _scan(self):
+        entries = []
+        try:
+            with _open_bank(self.path) as f:
+                reader = _GzipMembers(profile.reader(f, 'disk read'))
+                for m in _TarStream(profile.reader(reader, 'inflate')):
+                    entries.append(IndexEntry(m.name, m.offset_data, m.size, m.type))
+        except (tarfile.TarError, zlib.error, EOFError) as e:
+            raise BankError(f"Failed to read archive: {e}")
+        return entries, reader.checkpoints
+
+    @property
+    def entries(self) -> List[IndexEntry]:
+        return list(self._entries.values())
+
+    def get(self, name: str) -> Optional[IndexEntry]:
+        return self._entries.get(name.lstrip('./'))
+
+    def assets(self) -> List[Asset]:
+        return [Asset(name=e.name, size=e.size, type=e.type)
+                for key, e in self._entries.items() if key != CONFIG_NAME]
+
+    def _open_at(self, f: BinaryIO, offset: int) -> _GzipMembers:
+        i = bisect.bisect_right(self._starts, offset) - 1
+        coff, uoff = self._checkpoints[i]
+        reader = _GzipMembers(f, coff, uoff)
+        with profile.span('inflate', offset - uoff):
+            reader.skip(offset - uoff)
+        return reader
+
+    def read(self, name: str) -> bytes:
+        """Return the data of member name (KeyError if absent)."""
+        e = self.get(name)
+        if e is None:
+            raise KeyError(name)
+        try:
+            with profile.span('read member', member=name), _open_bank(self.path) as f:
+                reader = self._open_at(profile.reader(f, 'disk read'), e.offset)
+                data = profile.reader(reader, 'inflate').read(e.size)
+        except (zlib.error, EOFError) as err:
+            raise BankError(f"Failed to read {name}: {err}")
+        if len(data) != e.size:
+            raise BankError(f"Failed to read {name}: archive truncated")
+        return data
+
+    def extract_to(self, name: str, out: BinaryIO):
+        """Stream member name into out without holding it in memory."""
+        e = self.get(name)
+        if e is None:
+            raise KeyError(name)
+        try:
+            with _open_bank(self.path) as f:
+                reader = self._open_at(f, e.offset)
+                remaining = e.size
+                while remaining:
+                    chunk = reader.read(min(remaining, _COPY_CHUNK))
+                    if not chunk:
+                        raise BankError(f"Failed to read {name}: archive truncated")
+                    out.write(chunk)
+                    remaining -= len(chunk)
+        except (zlib.error, EOFError) as err:
+            raise BankError(f"Failed to read {name}: {err}")
+
+    def read_config_text(self) -> str:
+        try:
+            return self.read(CONFIG_NAME).decode('utf-8')
+        except KeyError:
+            raise BankError("config.json not found in archive")
+
+    def config_digest(self) -> str:
+        """Hash of the compressed bytes from the gzip member holding the start
+        of config.json up to the end of its data.
+
+        Deflate output up to a point depends only on the input consumed so
+        far, so this changes whenever config.json does; nothing after it is
+        read, which keeps it cheap for a single-stream device bank too.
+        """
+        e = self.get(CONFIG_NAME)
+        if e is None:
+            raise BankError("config.json not found in archive")
+        i = bisect.bisect_right(self._starts, e.offset) - 1
+        start, uoff = self._checkpoints[i]
+        h = hashlib.blake2b(digest_size=16)
+        try:
+            with _open_bank(self.path) as f:
+                reader = _GzipMembers(f, start, uoff)
+                reader.skip(e.offset + e.size - uoff)
+                f.seek(start)
+                remaining = reader._cpos - start
+                while remaining:
+                    chunk = f.read(min(remaining, _COPY_CHUNK))
+                    if not chunk:
+                        raise EOFError("unexpected end of archive")
+                    h.update(chunk)
+                    remaining -= len(chunk)
+        except (zlib.error, EOFError) as err:
+            raise BankError(f"Failed to read {CONFIG_NAME}: {err}")
+        return h.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Parsed-config cache
+#
+# Scripts call the CLI over and over on the same banks; each call would
+# otherwise inflate and json-parse config.json again. ConfigCache stores the
+# parsed config (plus the raw text Bank keeps for diffing) as marshal data in
+# the user cache directory. An entry is valid only for the same path, size,
+# mtime, inode and config digest (BankArchive.config_digest). Hits touch the
+# entry's mtime, and stores evict least-recently-used entries beyond max_bytes.
+# ---------------------------------------------------------------------------
+
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_CACHE_MAGIC = b'DHC1' + importlib.util.MAGIC_NUMBER  # marshal format is per Python version
+
+
+class ConfigCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self._directory = directory
+        if max_bytes is None:
+            max_bytes = _env_int('DIMEHEAD_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def directory(self) -> str:
+        return self._directory or cache_dir('configs')
+
+    def _entry_path(self, path: str) -> str:
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.directory, key + '.bin')
+
+    def get(self, archive: BankArchive) -> Optional[Tuple[Any, str]]:
+        """Return (config, raw_text) for archive, or None on a miss."""
+        entry = self._entry_path(archive.path)
+        try:
+            with open(entry, 'rb') as f:
+                blob = f.read()
+            if not blob.startswith(_CACHE_MAGIC):
+                raise ValueError("foreign cache entry")
+            data = marshal.loads(blob[len(_CACHE_MAGIC):])
+            st = os.stat(archive.path)
+            if (data['path'] != os.path.abspath(archive.path) or data['mtime_ns'] != st.st_mtime_ns
+                    or data['size'] != st.st_size or data['ino'] != st.st_ino
+                    or data['digest'] != archive.config_digest()):
+                raise ValueError("stale cache entry")
+        except (OSError, ValueError, EOFError, TypeError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(entry)  # LRU recency
+        except OSError:
+            pass
+        return data['config'], data['raw']
+
+    def put(self, archive: BankArchive, config: Any, raw: str):
+        st = os.stat(archive.path)
+        data = {
+            'path': os.path.abspath(archive.path),
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'ino': st.st_ino,
+            'digest': archive.config_digest(),
+            'config': config,
+            'raw': raw,
+        }
+        entry = self._entry_path(archive.path)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            _replace_cache_file(entry, _CACHE_MAGIC + marshal.dumps(data))
+            self._evict(keep=entry)
+        except (OSError, ValueError):
+            pass  # caching is best-effort
+
+    def _entries(self):
+        out = []
+        try:
+            with os.scandir(self.directory) as it:
+                for de in it:
+                    if de.name.endswith('.bin'):
+                        try:
+                            st = de.stat()
+                        except OSError:
+                            continue
+                        out.append((st.st_mtime_ns, st.st_size, de.path))
+        except OSError:
+            pass
+        return out
+
+    def _evict(self, keep: str):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            try:
+                os.remove(entry)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+
+    def usage(self) -> Tuple[int, int]:
+        """(entry count, total bytes) currently on disk."""
+        entries = self._entries()
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def stats(self) -> Dict[str, int]:
+        count, size = self.usage()
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': count, 'bytes': size, 'max_bytes': self.max_bytes}
+
+
+config_cache = ConfigCache()
+
+
+@profile.timed()
+def read_config(path: str, use_cache: bool = True) -> Tuple[Any, str, BankArchive]:
+    """Parsed config.json, its raw text and the BankArchive for path.
+
+    For a manifest (see AssetStore) the third item is its BankManifest.
+    """
+    if is_manifest(path):
+        manifest = BankManifest(path)
+        raw = manifest.read_config_text()
+        return json.loads(raw), raw, manifest
+    archive = BankArchive(path, use_cache)
+    if use_cache:
+        cached = config_cache.get(archive)
+        if cached is not None:
+            profile.count('config cache hit')
+            return cached[0], cached[1], archive
+        profile.count('config cache miss')
+    raw = archive.read_config_text()
+    with profile.span('json decode', len(raw)):
+        config = json.loads(raw)
+    if use_cache:
+        config_cache.put(archive, config, raw)
+    return config, raw, archive
+
+
+# ---------------------------------------------------------------------------
+# Content-addressed asset store
+#
+# Banks in a version history (and banks built from the factory bank) carry
+# the same .nam / .ir members over and over. The asset store keeps each
+# member's data once, under content_digest() of its data, already
+# compressed as a standalone gzip member of tar data blocks. A bank saved
+# into the store is a small gzipped JSON manifest (".npbm"): the raw tar
+# header of every member, the hash of its data, and config.json inline.
+#
+# Because concatenated gzip members form one valid gzip stream, a real .npb
+# is materialized by writing each header as a tiny gzip member followed by
+# the stored object bytes verbatim - no inflate or deflate of asset data.
+# Saving a new version of a manifest bank only writes a new manifest.
+#
+# The store keeps a registry of the manifests written into it ("manifests",
+# one absolute path per line) so gc knows every bank that may still need an
+# object. Writers hold the store lock shared from their first object until
+# the manifest is registered; gc holds it exclusively.
+# ---------------------------------------------------------------------------
+
+MANIFEST_SUFFIX = ".npbm"
+_MANIFEST_FORMAT = "dimehead-bank-manifest"
+_MANIFEST_VERSION = 1
+_HASH_BUFFER_LIMIT = 16 * 1024 * 1024  # hash before compressing members up to this size
+
+
+def default_store_dir() -> str:
+    """Asset store location (override with $DIMEHEAD_STORE_DIR)."""
+    return os.environ.get('DIMEHEAD_STORE_DIR') or os.path.join(
+        platformdirs.user_data_dir('dimehead-configurator', appauthor=False), 'store')
+
+
+def is_manifest(path: str) -> bool:
+    return path.endswith(MANIFEST_SUFFIX)
+
+
+def content_digest(data: bytes) -> str:
+    """BLAKE2b-256 hex digest of a member's content: the asset store key."""
+    return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+class _HashingWriter:
+    """File-like sink that hashes the first limit bytes it is given (the
+    member content, not the tar padding) and forwards everything to out."""
+
+    def __init__(self, out: Optional[BinaryIO], limit: int):
+        self.hash = hashlib.blake2b(digest_size=32)
+        self._out = out
+        self._left = limit
+
+    def write(self, data: bytes):
+        if self._left > 0:
+            self.hash.update(data[:self._left])
+            self._left -= len(data)
+        if self._out is not None:
+            self._out.write(data)
+
+
+class AssetStore:
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.abspath(root or default_store_dir())
+        self._registry = os.path.join(self.root, 'manifests')
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest[2:] + '.gz')
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.object_path(digest))
+
+    def _commit(self, tmp_path: str, digest: str) -> bool:
+        """Move a finished temp object into place; False if it was already stored."""
+        dest = self.object_path(digest)
+        if os.path.exists(dest):
+            os.remove(tmp_path)
+            return False
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(tmp_path, dest)
+        return True
+
+    def _tmp(self) -> Tuple[BinaryIO, str]:
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='obj.', suffix='.tmp', dir=self.root)
+        return os.fdopen(fd, 'wb'), tmp_path
+
+    def put_member(self, stream: _TarStream, member: RawMember,
+                   compresslevel: int = DEFAULT_COMPRESSLEVEL) -> Tuple[str, bool]:
+        """Store the padded data blocks of stream's current member.
+
+        Returns (digest, added). Members up to _HASH_BUFFER_LIMIT are hashed
+        first so content already in the store costs no compression at all.
+        """
+        return self._put(stream, member.size, compresslevel)
+
+    def put_file(self, path: str, compresslevel: int = DEFAULT_COMPRESSLEVEL) -> Tuple[str, bool]:
+        """Store the file at path as member data (streamed, not read into memory)."""
+        data = _FileData(path)
+        return self._put(data, data.size, compresslevel)
+
+    @profile.timed('store put')
+    def _put(self, stream, size: int, compresslevel: int) -> Tuple[str, bool]:
+        # stream: anything with copy_data(out) writing the padded data blocks
+        if _padded(size) <= _HASH_BUFFER_LIMIT:
+            buf = io.BytesIO()
+            stream.copy_data(buf)
+            data = buf.getbuffer()
+            digest = content_digest(data[:size])
+            if self.has(digest):
+                return digest, False
+            f, tmp_path = self._tmp()
             try:
-                cfg_member = tf.getmember(f"./{CONFIG_NAME}")
-            except KeyError:
+                with f:
+                    f.write(gzip.compress(data, compresslevel=compresslevel, mtime=0))
+                return digest, self._commit(tmp_path, digest)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        f, tmp_path = self._tmp()
+        try:
+            with f:
+                with gzip.GzipFile(filename='', mode='wb', fileobj=f,
+                                   compresslevel=compresslevel, mtime=0) as gz:
+                    sink = _HashingWriter(gz, size)
+                    stream.copy_data(sink)
+            digest = sink.hash.hexdigest()
+            return digest, self._commit(tmp_path, digest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @contextlib.contextmanager
+    def lock(self, exclusive: bool = False):
+        """Store lock: shared while writing objects and a manifest, exclusive for gc."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, 'lock'), 'a+b') as f, _flocked(f, exclusive):
+            yield
+
+    def register(self, manifest_path: str):
+        """Record manifest_path as a bank whose objects gc must keep."""
+        path = os.path.abspath(manifest_path)
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._registry, 'a+', encoding='utf-8') as f, _flocked(f, True):
+            f.seek(0)
+            if path not in f.read().splitlines():
+                f.write(path + '\n')
+
+    def manifests(self) -> List[str]:
+        """Registered manifest paths (some may since have been deleted or moved)."""
+        try:
+            with open(self._registry, encoding='utf-8') as f:
+                return [line for line in f.read().splitlines() if line]
+        except FileNotFoundError:
+            return []
+
+    def stats(self) -> Dict[str, int]:
+        objects = size = 0
+        base = os.path.join(self.root, 'objects')
+        for dirpath, _dirs, files in os.walk(base):
+            for name in files:
+                objects += 1
+                size += os.path.getsize(os.path.join(dirpath, name))
+        return {'objects': objects, 'bytes': size, 'manifests': len(self.manifests())}
+
+    def gc(self, manifests: Iterable[str] = (), dry_run: bool = False) -> Dict[str, int]:
+        """Delete objects that no manifest of this store refers to.
+
+        Live manifests are the registered ones that still exist plus
+        manifests (registered by this call unless dry_run, for manifests
+        written before the registry or moved since); their .bak backups count
+        too. Paths that no longer exist are dropped from the registry; an
+        unreadable manifest aborts the collection. Returns counters: objects,
+        bytes (removed, or that would be with dry_run), manifests (live).
+        """
+        with self.lock(exclusive=True):
+            listed = [os.path.abspath(p) for p in manifests]
+            if not dry_run:
+                for path in listed:
+                    self.register(path)
+            known = [p for p in dict.fromkeys(self.manifests() + listed) if os.path.exists(p)]
+            live = set()
+            kept = []
+            for path in known:
+                manifest = BankManifest(path)  # BankError: better to collect nothing than too much
+                if manifest.store.root != self.root:
+                    continue
+                kept.append(path)
+                backups = [BankManifest(path + BACKUP_SUFFIX)] if os.path.exists(path + BACKUP_SUFFIX) else []
+                for m in (manifest, *backups):
+                    if m.store.root == self.root:
+                        live.update(e['object'] for e in m.members if e.get('object'))
+            stats = {'objects': 0, 'bytes': 0, 'manifests': len(kept)}
+            base = os.path.join(self.root, 'objects')
+            if not kept and os.path.isdir(base):
+                raise BankError(f"No manifests are registered with {self.root}; "
+                                "list the manifests whose objects must be kept")
+            for dirpath, _dirs, files in os.walk(base):
+                for name in files:
+                    digest = os.path.basename(dirpath) + name[:-len('.gz')]
+                    if digest not in live:
+                        p = os.path.join(dirpath, name)
+                        stats['bytes'] += os.path.getsize(p)
+                        stats['objects'] += 1
+                        if not dry_run:
+                            os.remove(p)
+            if not dry_run:
+                with open(self._registry, 'a+', encoding='utf-8') as f, _flocked(f, True):
+                    f.seek(0)
+                    f.truncate()
+                    f.writelines(p + '\n' for p in kept)
+        return stats
+
+
+class BankManifest:
+    """A bank kept in an AssetStore: member headers + object hashes + config."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                doc = json.load(f)
+        except (OSError, ValueError, EOFError) as e:
+            raise BankError(f"Cannot read manifest {path}: {e}")
+        if doc.get('format') != _MANIFEST_FORMAT or doc.get('version') != _MANIFEST_VERSION:
+            raise BankError(f"{path} is not a version {_MANIFEST_VERSION} bank manifest")
+        self.members: List[Dict[str, Any]] = doc['members']
+        self.config_text: str = doc['config']
+        self.store = AssetStore(doc.get('store'))
+
+    def assets(self) -> List[Asset]:
+        return [Asset(name=m['name'], size=m['size'], type=m['type'])
+                for m in self.members if not m.get('config')]
+
+    def read_config_text(self) -> str:
+        return self.config_text
+
+
+def _write_manifest(dest_path: str, members: List[Dict[str, Any]], config_data: bytes, store: AssetStore,
+                    backup: bool = False):
+    doc = {'format': _MANIFEST_FORMAT, 'version': _MANIFEST_VERSION, 'store': store.root,
+           'members': members, 'config': config_data.decode('utf-8')}
+    with FileTransaction(dest_path, backup) as txn, open(txn.tmp_path, 'wb') as f:
+        f.write(gzip.compress(json.dumps(doc, separators=(',', ':')).encode('utf-8'),
+                              compresslevel=6, mtime=0))
+    store.register(dest_path)
+
+
+@profile.timed()
+def store_bank(src_path: str, dest_path: str, config_data: Optional[bytes] = None,
+               store: Optional[AssetStore] = None, compresslevel: int = DEFAULT_COMPRESSLEVEL,
+               progress: Optional[ProgressCallback] = None, exclude: Iterable[str] = (),
+               backup: bool = False) -> Dict[str, int]:
+    """Save src_path (a .npb or a manifest) as a manifest at dest_path.
+
+    Member data goes into store (default: default_store_dir()); only content
+    not stored yet is compressed and written. config_data=None keeps the
+    source's config.json. Returns counters: members, objects_added,
+    bytes_added. progress and exclude as for rewrite_archive; backup=True
+    keeps an existing dest_path as .bak on the first write.
+    """
+    store = store or AssetStore()
+    with store.lock():  # gc waits until the manifest is registered
+        drop = {name.lstrip('./') for name in exclude}
+        stats = {'members': 0, 'objects_added': 0, 'bytes_added': 0}
+        if is_manifest(src_path):
+            src = BankManifest(src_path)
+            if config_data is None:
+                config_data = src.config_text.encode('utf-8')
+            if src.store.root != store.root:
+                raise BankError(f"{src_path} lives in another asset store ({src.store.root})")
+            members = [m for m in src.members if m['name'].lstrip('./') not in drop]
+            stats['members'] = len(members)
+            _write_manifest(dest_path, members, config_data, store, backup)
+            return stats
+        members: List[Optional[Dict[str, Any]]] = []
+        by_name: Dict[str, int] = {}
+        latest_config = None
+        try:
+            with _open_bank(src_path) as f_in, \
+                    gzip.GzipFile(fileobj=profile.reader(f_in, 'disk read'), mode='rb') as raw_in:
+                stream = _TarStream(profile.reader(raw_in, 'inflate'), _source_ticker(f_in, progress))
+                for m in stream:
+                    if drop and m.name.lstrip('./') in drop:
+                        continue
+                    entry = {'name': m.name, 'type': m.type, 'size': m.size,
+                             'header': base64.b64encode(m.header).decode('ascii')}
+                    if _is_config(m.name):
+                        entry['config'] = True
+                        latest_config = stream.read_data()
+                    elif m.size:
+                        digest, added = store.put_member(stream, m, compresslevel)
+                        entry['object'] = digest
+                        if added:
+                            stats['objects_added'] += 1
+                            stats['bytes_added'] += os.path.getsize(store.object_path(digest))
+                    # A later entry with the same name supersedes the earlier one
+                    # (config overlays from append saves); config keeps its first slot
+                    key = m.name.lstrip('./')
+                    prev = by_name.get(key)
+                    if prev is not None and entry.get('config'):
+                        members[prev]['header'] = entry['header']
+                        continue
+                    if prev is not None:
+                        members[prev] = None
+                    by_name[key] = len(members)
+                    members.append(entry)
+        except (tarfile.TarError, gzip.BadGzipFile, EOFError) as e:
+            raise BankError(f"Failed to read archive: {e}")
+        members = [m for m in members if m is not None]
+        if config_data is None:
+            config_data = latest_config
+            if config_data is None:
+                raise BankError("config.json not found in archive")
+        if latest_config is None:
+            header = _member_blocks(None, f'./{CONFIG_NAME}', b'')[:_BLOCK]
+            members.append({'name': f'./{CONFIG_NAME}', 'type': 'file', 'size': 0, 'config': True,
+                            'header': base64.b64encode(header).decode('ascii')})
+        stats['members'] = len(members)
+        _write_manifest(dest_path, members, config_data, store, backup)
+        return stats
+
+
+@profile.timed()
+def materialize_manifest(src_path: str, dest_path: str, config_data: Optional[bytes] = None,
+                         compresslevel: int = DEFAULT_COMPRESSLEVEL,
+                         progress: Optional[ProgressCallback] = None, exclude: Iterable[str] = ()):
+    """Write the manifest at src_path out as a real .npb at dest_path.
+
+    Stored objects are copied byte for byte; only the member headers and
+    config.json are compressed here (at compresslevel). progress gets
+    (object bytes copied, total object bytes); exclude as for rewrite_archive.
+    """
+    manifest = BankManifest(src_path)
+    if config_data is None:
+        config_data = manifest.config_text.encode('utf-8')
+    drop = {name.lstrip('./') for name in exclude}
+    members = [m for m in manifest.members if m['name'].lstrip('./') not in drop]
+    objects = [manifest.store.object_path(m['object']) for m in members if m.get('object')]
+    total = sum(os.path.getsize(p) for p in objects if os.path.exists(p))
+    done = 0
+    with open(dest_path, 'wb') as out:
+        for m in members:
+            header = base64.b64decode(m['header'])
+            if m.get('config'):
+                info = tarfile.TarInfo.frombuf(header[-_BLOCK:], 'utf-8', 'surrogateescape')
+                out.write(gzip.compress(_member_blocks(info, m['name'], config_data),
+                                        compresslevel=compresslevel, mtime=0))
+                continue
+            out.write(gzip.compress(header, compresslevel=compresslevel, mtime=0))
+            if m.get('object'):
+                obj = manifest.store.object_path(m['object'])
                 try:
-                    cfg_member = tf.getmember(CONFIG_NAME)
-                except KeyError:
-                    raise BankError("config.json not found in archive")
-            raw = tf.extractfile(cfg_member).read().decode('utf-8')
-            config = json.loads(raw)
-            assets = []
-            for m in tf.getmembers():
-                if m.name.lstrip('./') == CONFIG_NAME:
+                    with open(obj, 'rb') as f:
+                        while True:
+                            chunk = f.read(_COPY_CHUNK)
+                            if not chunk:
+                                break
+                            out.write(chunk)
+                            done += len(chunk)
+                            if progress is not None:
+                                progress(done, total)
+                except FileNotFoundError:
+                    raise BankError(f"Asset store object missing for {m['name']}: {obj}")
+        out.write(_EOF_MEMBER)
+
+
+# ---------------------------------------------------------------------------
+# Asset editing
+#
+# edit_assets adds, replaces and removes members without rebuilding the whole
+# archive. It plans from the BankArchive index: a gzip member of the source
+# whose tar entries all survive unchanged, and that starts and ends on entry
+# boundaries, is copied as compressed bytes - no inflate, no deflate. Only runs
+# of gzip members holding a touched entry are re-streamed through _TarStream
+# (for a single-stream device bank that is the whole file, once; the result
+# has the seekable layout). New data is streamed from disk into gzip members
+# of its own, so later edits copy it through as well.
+# ---------------------------------------------------------------------------
+
+class _FileData:
+    """_TarStream stand-in supplying the padded data blocks of a file on disk."""
+
+    def __init__(self, path: str, on_chunk: Optional[Callable[[int], None]] = None):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._on_chunk = on_chunk
+
+    def copy_data(self, out: BinaryIO):
+        left = self.size
+        with open(self.path, 'rb') as f:
+            while left:
+                chunk = f.read(min(left, _COPY_CHUNK))
+                if not chunk:
+                    raise BankError(f"{self.path} shrank while it was being added")
+                out.write(chunk)
+                left -= len(chunk)
+                if self._on_chunk is not None:
+                    self._on_chunk(len(chunk))
+        out.write(tarfile.NUL * (_padded(self.size) - self.size))
+
+
+def _asset_edits(names, add: Dict[str, str], replace: Dict[str, str], remove: Iterable[str]):
+    """Normalize and check an edit against the member keys in names."""
+    add = {k.lstrip('./'): p for k, p in add.items()}
+    replace = {k.lstrip('./'): p for k, p in replace.items()}
+    remove = {k.lstrip('./') for k in remove}
+    for key in [*add, *replace, *remove]:
+        if not key or key == CONFIG_NAME:
+            raise BankError(f"Not an asset name: {key!r}")
+    for key in add:
+        if key in names:
+            raise BankError(f"{key} is already in the bank (replace it instead)")
+    for key in [*replace, *remove]:
+        if key not in names:
+            raise BankError(f"{key} is not in the bank")
+    if set(replace) & remove:
+        raise BankError(f"Cannot both replace and remove {sorted(set(replace) & remove)[0]}")
+    for path in [*add.values(), *replace.values()]:
+        if not os.path.isfile(path):
+            raise BankError(f"File not found: {path}")
+    return add, replace, remove
+
+
+@profile.timed()
+def edit_assets(src_path: str, dest_path: str, add: Optional[Dict[str, str]] = None,
+                replace: Optional[Dict[str, str]] = None, remove: Iterable[str] = (),
+                config_data: Optional[bytes] = None, compresslevel: int = DEFAULT_COMPRESSLEVEL,
+                progress: Optional[ProgressCallback] = None, use_cache: bool = True,
+                threads: Optional[int] = None) -> Dict[str, int]:
+    """Write src_path to dest_path with assets added, replaced or removed.
+
+    add and replace map member names ('./' prefix optional) to files on disk;
+    added members go at the end of the archive, a replacement keeps the slot,
+    mode and ownership of the member it replaces. remove lists member names.
+    config_data=None keeps the bank's config.json. A manifest source gets its
+    new data put into its asset store and dest_path is written as a manifest.
+
+    Returns counters: added, replaced, removed, copied_bytes (compressed source
+    bytes copied through as-is) and streamed_bytes (uncompressed bytes that
+    had to be re-read and recompressed). progress gets (bytes done, total) as
+    for rewrite_archive, with the new files' sizes included; threads as for
+    rewrite_archive.
+    """
+    if is_manifest(src_path):
+        src = BankManifest(src_path)
+        with src.store.lock():  # gc waits until the manifest is registered
+            members, stats = _edit_manifest(src, add or {}, replace or {}, remove, compresslevel)
+            if config_data is None:
+                config_data = src.config_text.encode('utf-8')
+            _write_manifest(dest_path, members, config_data, src.store)
+        return stats
+    archive = BankArchive(src_path, use_cache)
+    add, replace, remove = _asset_edits(archive._entries, add or {}, replace or {}, remove)
+    stats = {'added': len(add), 'replaced': len(replace), 'removed': len(remove),
+             'copied_bytes': 0, 'streamed_bytes': 0}
+    if config_data is None and archive.get(CONFIG_NAME) is None:
+        raise BankError("config.json not found in archive")
+
+    # Which entries survive byte for byte, which simply go away, and where
+    # entries begin and end
+    members = archive._members
+    kept, gone, starts, ends = [], [], [], []
+    pos = 0
+    for e in members:
+        key = e.name.lstrip('./')
+        latest = archive._entries.get(key) is e
+        kept.append(latest and key not in remove and key not in replace
+                    and not (key == CONFIG_NAME and config_data is not None))
+        gone.append(not latest or key in remove)
+        starts.append(pos)
+        pos = e.offset + _padded(e.size)
+        ends.append(pos)
+    last_end = pos
+    by_start = {u: i for i, u in enumerate(starts)}
+    boundaries = set(starts) | set(ends)
+
+    # Plan: (kind, compressed offset, uncompressed offset, compressed end) of
+    # gzip members to copy or skip and of runs of gzip members to re-stream
+    plan: List[Tuple[str, int, int, int]] = []
+    checkpoints = archive._checkpoints
+    for (c0, u0), (c1, u1) in zip(checkpoints, checkpoints[1:]):
+        inside = range(bisect.bisect_left(starts, u0), bisect.bisect_left(starts, u1))
+        aligned = u0 in by_start and u1 in boundaries and u0 < u1 <= last_end
+        if aligned and all(kept[i] for i in inside):
+            plan.append(('copy', c0, u0, c1))
+        elif aligned and all(gone[i] for i in inside):
+            plan.append(('skip', c0, u0, c1))
+        elif not plan or plan[-1][0] != 'stream':
+            plan.append(('stream', c0, u0, -1))
+    if not plan or plan[-1][0] != 'stream':
+        c_last, u_last = checkpoints[-1]
+        plan.append(('stream', c_last, u_last, -1))
+    # A run stops where the next copied member starts
+    stops = [plan[i + 1][2] if i + 1 < len(plan) else None for i in range(len(plan))]
+
+    total = os.path.getsize(src_path) + sum(os.path.getsize(p) for p in [*add.values(), *replace.values()])
+    added_bytes = 0
+
+    def tick(n: int = 0):
+        nonlocal added_bytes
+        added_bytes += n
+        if progress is not None:
+            progress(min(f_in.tell(), total) + added_bytes, total)
+
+    try:
+        with _open_bank(src_path) as f_in, open(dest_path, 'wb') as f_out, \
+                _GzipMemberWriter(f_out, compresslevel, threads) as out:
+            for (kind, c0, u0, c1), stop in zip(plan, stops):
+                if kind == 'skip':
                     continue
-                if m.isdir(): t = 'dir'
-                elif m.isfile(): t = 'file'
-                else: t = 'other'
-                assets.append(Asset(name=m.name, size=getattr(m, 'size', 0), type=t))
-    except tarfile.TarError as e:
+                if kind == 'copy':
+                    out.close()
+                    f_in.seek(c0)
+                    left = c1 - c0
+                    with profile.span('raw copy', left):
+                        while left:
+                            chunk = f_in.read(min(left, _COPY_CHUNK))
+                            if not chunk:
+                                raise BankError("Archive truncated")
+                            f_out.write(chunk)
+                            left -= len(chunk)
+                            tick()
+                    stats['copied_bytes'] += c1 - c0
+                    continue
+                reader = _GzipMembers(profile.reader(f_in, 'disk read'), c0, u0)
+                stream = _TarStream(profile.reader(reader, 'inflate'), tick)
+                for m in stream:
+                    if stop is not None and u0 + m.offset >= stop:
+                        break
+                    i = by_start.get(u0 + m.offset)
+                    if i is None:
+                        raise BankError("Archive index is out of date")
+                    key = m.name.lstrip('./')
+                    if kept[i]:
+                        out.write_member(m.header, stream, separate=m.size >= _SEPARATE_MEMBER_SIZE)
+                    elif key == CONFIG_NAME and archive._entries[key] is members[i]:
+                        out.write_member(_member_blocks(m.info, m.name, config_data), separate=True)
+                    elif key in replace:
+                        data = _FileData(replace[key], tick)
+                        out.write_member(_file_header(m.info, m.name, data.size,
+                                                      os.path.getmtime(data.path)), data, separate=True)
+                stats['streamed_bytes'] += reader.uoff - u0
+            if archive.get(CONFIG_NAME) is None:
+                out.write_member(_member_blocks(None, f'./{CONFIG_NAME}', config_data), separate=True)
+            for key, path in add.items():
+                data = _FileData(path, tick)
+                out.write_member(_file_header(None, f'./{key}', data.size, os.path.getmtime(path)),
+                                 data, separate=True)
+            out.close()
+            f_out.write(_EOF_MEMBER)
+            tick()
+    except (tarfile.TarError, zlib.error, EOFError) as e:
+        raise BankError(f"Failed to rewrite archive: {e}")
+    return stats
+
+
+def _edit_manifest(src: BankManifest, add: Dict[str, str], replace: Dict[str, str], remove: Iterable[str],
+                   compresslevel: int) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Put the new data of an edit into src's store; return (members, stats).
+
+    The caller holds the store lock until the edited manifest is registered.
+    """
+    add, replace, remove = _asset_edits({m['name'].lstrip('./') for m in src.members}, add, replace, remove)
+    stats = {'added': len(add), 'replaced': len(replace), 'removed': len(remove),
+             'copied_bytes': 0, 'streamed_bytes': 0}
+
+    def stored(template: Optional[tarfile.TarInfo], name: str, path: str) -> Dict[str, Any]:
+        digest, _added = src.store.put_file(path, compresslevel)
+        size = os.path.getsize(path)
+        stats['streamed_bytes'] += size
+        return {'name': name, 'type': 'file', 'size': size, 'object': digest,
+                'header': base64.b64encode(_file_header(template, name, size,
+                                                        os.path.getmtime(path))).decode('ascii')}
+
+    members = []
+    for m in src.members:
+        key = m['name'].lstrip('./')
+        if key in remove:
+            continue
+        if key in replace:
+            header = base64.b64decode(m['header'])
+            info = tarfile.TarInfo.frombuf(header[-_BLOCK:], 'utf-8', 'surrogateescape')
+            m = stored(info, m['name'], replace[key])
+        members.append(m)
+    members += [stored(None, f'./{key}', path) for key, path in add.items()]
+    return members, stats
+
+
+@profile.timed()
+def update_assets(path: str, add: Optional[Dict[str, str]] = None, replace: Optional[Dict[str, str]] = None,
+                  remove: Iterable[str] = (), backup: bool = True, compresslevel: int = DEFAULT_COMPRESSLEVEL,
+                  progress: Optional[ProgressCallback] = None) -> Dict[str, int]:
+    """edit_assets on the bank at path in place (temp file, .bak, then replace)."""
+    if not os.path.isfile(path):
+        raise BankError(f"File not found: {path}")
+    if is_manifest(path):
+        # The manifest is written and registered under its own name, so the
+        # store never records the temp file and gc keeps the new objects
+        src = BankManifest(path)
+        with src.store.lock():
+            members, stats = _edit_manifest(src, add or {}, replace or {}, remove, compresslevel)
+            _write_manifest(path, members, src.config_text.encode('utf-8'), src.store, backup)
+        return stats
+    recover_append(path)
+    with FileTransaction(path, backup) as txn:
+        return edit_assets(path, txn.tmp_path, add, replace, remove,
+                           compresslevel=compresslevel, progress=progress)
+
+
+def add_asset(path: str, file_path: str, name: Optional[str] = None, **kwargs) -> Dict[str, int]:
+    """Add file_path to the bank at path as member name (default: its file name)."""
+    return update_assets(path, add={name or os.path.basename(file_path): file_path}, **kwargs)
+
+
+def replace_asset(path: str, name: str, file_path: str, **kwargs) -> Dict[str, int]:
+    """Swap the data of member name for the contents of file_path."""
+    return update_assets(path, replace={name: file_path}, **kwargs)
+
+
+def remove_asset(path: str, name: str, **kwargs) -> Dict[str, int]:
+    """Remove member name from the bank (presets still naming it are left alone)."""
+    return update_assets(path, remove=[name], **kwargs)
+
+
+def _tar_members(path: str):
+    with _open_bank(path) as f, tarfile.open(fileobj=f, mode="r:gz") as tf:
+        for m in tf.getmembers():
+            yield m
+
+@profile.timed()
+def load_bank(path: str, use_cache: bool = True) -> Bank:
+    config, raw, archive = read_config(path, use_cache)
+    return Bank(path=path, config=config, assets=archive.assets(), original_config_json=raw)
+
+
+# ---------------------------------------------------------------------------
+# Config-first loading
+#
+# The GUI wants the preset table on screen as soon as config.json is parsed.
+# open_bank_fast returns a Bank with no asset list: from the cached index
+# when there is one, otherwise by inflating the archive only up to the first
+# config.json (device banks put it near the front). scan_bank then makes one
+# streaming pass - typically on a worker thread - that reports every asset
+# with its content digest and, for .nam models, the model header, refreshes
+# the cached member index and returns the authoritative config text.
+# ---------------------------------------------------------------------------
+
+def nam_model_info(data: bytes) -> Dict[str, Any]:
+    """Header fields of a .nam model (version, architecture, config,
+    metadata, ...) without decoding its weights list.
+
+    The weights are assumed to be a flat list of numbers, as the NAM exporter
+    writes them: the list ends at the first ']' after its '['. Anything else
+    (a nested list) makes the header unparseable and {} is returned.
+    """
+    key = data.find(b'"weights"')
+    if key >= 0:
+        start = data.find(b'[', key)
+        end = data.find(b']', start)
+        if start >= 0 and end >= 0:
+            data = data[:start] + b'[]' + data[end + 1:]
+    try:
+        doc = json.loads(data)
+    except ValueError:
+        return {}
+    if not isinstance(doc, dict):
+        return {}
+    doc.pop('weights', None)
+    return doc
+
+
+_NAM_HEADER_BYTES = 64 * 1024  # kept from each end of a .nam while streaming it
+
+
+class _HeadTail:
+    """Sink keeping the first and last n bytes of the first limit bytes it is
+    given: enough of a .nam for nam_model_info without holding its weights."""
+
+    def __init__(self, limit: int, n: int = _NAM_HEADER_BYTES):
+        self._left = limit
+        self._n = n
+        self.head = bytearray()
+        self._tail = bytearray()
+
+    def write(self, data: bytes):
+        data = memoryview(data)[:max(self._left, 0)]
+        self._left -= len(data)
+        room = self._n - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        self._tail += data[-self._n:]
+        if len(self._tail) > 2 * self._n:
+            del self._tail[:-self._n]
+
+    def model_info(self) -> Dict[str, Any]:
+        tail = bytes(self._tail[-self._n:])
+        if len(self._tail) <= self._n:
+            return nam_model_info(bytes(self.head) + bytes(self._tail))  # got it all
+        # The weights run from the head into the tail; their list ends at the
+        # tail's first ']' (a flat list, see nam_model_info)
+        key = self.head.find(b'"weights"')
+        start = self.head.find(b'[', key) if key >= 0 else -1
+        end = tail.find(b']')
+        if start < 0 or end < 0:
+            return {}
+        return nam_model_info(bytes(self.head[:start]) + b'[]' + tail[end + 1:])
+
+
+def _stream_details(name: str, size: int, type: str, copy_data: Callable[[BinaryIO], None]) -> Asset:
+    """Asset with digest and model info from a member streamed through copy_data."""
+    keep = _HeadTail(size) if name.lower().endswith('.nam') else None
+    sink = _HashingWriter(keep, size)
+    copy_data(sink)
+    return Asset(name=name, size=size, type=type, digest=sink.hash.hexdigest(),
+                 info=keep.model_info() if keep is not None else None)
+
+
+@profile.timed()
+def open_bank_fast(path: str, use_cache: bool = True) -> Tuple[Bank, bool]:
+    """(Bank with config only, final) as quickly as possible.
+
+    final is True when the config came from a cached index or a manifest. On
+    a first open only the first config.json is read; an append-saved bank can
+    carry a newer overlay further on, so final is False and the config text
+    returned by scan_bank is the one to trust.
+    """
+    if not os.path.isfile(path):
+        raise BankError(f"File not found: {path}")
+    if is_manifest(path) or (use_cache and _load_index(path, os.stat(path)) is not None):
+        config, raw, _ = read_config(path, use_cache)
+        return Bank(path=path, config=config, original_config_json=raw), True
+    raw = None
+    try:
+        with _open_bank(path) as f:
+            stream = _TarStream(profile.reader(_GzipMembers(profile.reader(f, 'disk read')), 'inflate'))
+            for m in stream:
+                if _is_config(m.name):
+                    raw = stream.read_data().decode('utf-8')
+                    break
+    except (tarfile.TarError, zlib.error, EOFError) as e:
         raise BankError(f"Failed to read archive: {e}")
-    return Bank(path=path, config=config, assets=assets, original_config_json=raw)
+    if raw is None:
+        raise BankError("config.json not found in archive")
+    return Bank(path=path, config=json.loads(raw), original_config_json=raw), False
 
 
-def save_bank(bank: Bank, backup: bool = True):
-    path = bank.path
-    dir_name = os.path.dirname(path) or '.'
-    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path)+'.', suffix='.tmp', dir=dir_name)
-    os.close(fd)
+@profile.timed()
+def scan_bank(path: str, on_asset: Callable[[Asset], None], use_cache: bool = True,
+              progress: Optional[ProgressCallback] = None) -> str:
+    """Report every asset of path with its digest and model info; return the
+    text of the config.json that wins (the last one in the archive).
+
+    on_asset is called once per member in archive order (a superseded
+    duplicate is reported again under the same name) and may raise
+    OperationCancelled. The member index cache is refreshed on the way.
+    """
+    if is_manifest(path):
+        manifest = BankManifest(path)
+        for m in manifest.members:
+            if m.get('config'):
+                continue
+            info = None
+            if m.get('object') and m['name'].lower().endswith('.nam'):
+                keep = _HeadTail(m['size'])
+                with gzip.open(manifest.store.object_path(m['object']), 'rb') as f:
+                    shutil.copyfileobj(f, keep, _COPY_CHUNK)
+                info = keep.model_info()
+            on_asset(Asset(name=m['name'], size=m['size'], type=m['type'], digest=m.get('object'), info=info))
+        return manifest.config_text
+    st = os.stat(path)
+    entries = []
+    raw = None
     try:
-        with tarfile.open(path, 'r:gz') as tf_in, tarfile.open(tmp_path, 'w:gz') as tf_out:
-            for member in tf_in.getmembers():
-                name_norm = member.name.lstrip('./')
-                if name_norm == CONFIG_NAME:
-                    continue
-                extracted = tf_in.extractfile(member) if member.isfile() else None
-                tf_out.addfile(member, extracted)
-            data = json.dumps(bank.config, indent=4).encode('utf-8')
-            info = tarfile.TarInfo(name=f'./{CONFIG_NAME}')
-            info.size = len(data)
-            tf_out.addfile(info, io.BytesIO(data))
-        if backup and not os.path.exists(path + '.bak'):
-            shutil.copy2(path, path + '.bak')
-        os.replace(tmp_path, path)
-        bank.original_config_json = json.dumps(bank.config)
-    finally:
-        if os.path.exists(tmp_path):
-            try: os.remove(tmp_path)
-            except OSError: pass
+        with _open_bank(path) as f:
+            reader = _GzipMembers(profile.reader(f, 'disk read'))
+            stream = _TarStream(profile.reader(reader, 'inflate'), _source_ticker(f, progress))
+            for m in stream:
+                entries.append(IndexEntry(m.name, m.offset_data, m.size, m.type))
+                if _is_config(m.name):
+                    raw = stream.read_data().decode('utf-8')
+                elif m.type == 'file':
+                    on_asset(_stream_details(m.name, m.size, m.type, stream.copy_data))
+                else:
+                    on_asset(Asset(name=m.name, size=m.size, type=m.type))
+    except (tarfile.TarError, zlib.error, EOFError) as e:
+        raise BankError(f"Failed to read archive: {e}")
+    if raw is None:
+        raise BankError("config.json not found in archive")
+    if use_cache:
+        _store_index(path, st, entries, reader.checkpoints)
+    return raw
+
+
+def _orphan_names(path: str, config_data: bytes) -> List[str]:
+    """Model / IR members of the bank at path that no preset in config_data uses."""
+    try:
+        presets = json.loads(config_data).get('presets') or []
+    except (ValueError, AttributeError) as e:
+        raise BankError(f"Cannot read presets from config: {e}")
+    assets = BankManifest(path).assets() if is_manifest(path) else BankArchive(path).assets()
+    refs = AssetRefs.build(PresetColumns.from_presets(presets), assets)
+    return [a.name for a in refs.orphans()]
+
+
+def _drop_assets(bank: Bank, names: List[str]):
+    if names:
+        gone = {n.lstrip('./') for n in names}
+        bank.assets = [a for a in bank.assets if a.name.lstrip('./') not in gone]
 
 
-def save_bank_as(bank: Bank, dest_path: str, backup_source: bool = False):
+@profile.timed()
+def save_bank(bank: Bank, backup: bool = True, compresslevel: int = DEFAULT_COMPRESSLEVEL,
+              mode: str = "rewrite", config_data: Optional[bytes] = None,
+              progress: Optional[ProgressCallback] = None, prune_orphans: bool = False) -> List[str]:
+    """Write bank.config back to bank.path.
+
+    mode="rewrite" rebuilds the archive (stream-copying assets). mode="append"
+    adds a config.json overlay at the end of the file instead (see
+    append_config); if the file is not in the appendable layout yet it is
+    rewritten once.
+
+    config_data is an already encoded config (e.g. a snapshot taken before
+    handing the save to a worker thread; default encode_config(bank.config)).
+    progress gets (bytes done, bytes total) and may raise SaveCancelled, in
+    which case the bank file is left untouched.
+
+    prune_orphans=True leaves out the .nam / IR members no preset of the saved
+    config references (AssetRefs.orphans); an append save that has something
+    to prune becomes a rewrite. Returns the names of the pruned members.
+    """
+    if mode not in ("rewrite", "append"):
+        raise ValueError(f"Unknown save mode: {mode}")
+    path = bank.path
+    data = encode_config(bank.config) if config_data is None else config_data
+    drop = _orphan_names(path, data) if prune_orphans else []
+    recover_append(path)  # before the .bak is taken
+    if is_manifest(path):
+        # Only the manifest's inline config (and member list) changes; the assets are already stored
+        store_bank(path, path, data, BankManifest(path).store, compresslevel, exclude=drop, backup=backup)
+    elif mode == "append" and not drop and _append_in_place(path, data, compresslevel, backup):
+        pass
+    else:
+        with FileTransaction(path, backup) as txn:
+            rewrite_archive(path, txn.tmp_path, data, compresslevel, progress, exclude=drop)
+    bank.original_config_json = data.decode('utf-8')
+    _drop_assets(bank, drop)
+    return drop
+
+
+def _append_in_place(path: str, config_data: bytes, compresslevel: int, backup: bool) -> bool:
+    """append_config as a transaction (the .bak is a copy: the file changes in place)."""
+    with FileTransaction(path, backup, in_place=True) as txn:
+        if not append_config(path, config_data, compresslevel):
+            txn.discard()
+            return False
+    return True
+
+
+@profile.timed()
+def save_bank_as(bank: Bank, dest_path: str, backup_source: bool = False,
+                 compresslevel: int = DEFAULT_COMPRESSLEVEL, store: Optional[AssetStore] = None,
+                 config_data: Optional[bytes] = None, progress: Optional[ProgressCallback] = None,
+                 prune_orphans: bool = False) -> List[str]:
     """Save bank config into a new archive at dest_path.
 
-    Reads all non-config members from the original bank.path and writes them
-    plus updated config.json to the new dest_path. Optionally create a .bak for
-    the original (controlled by backup_source).
+    Stream-copies all non-config members from the original bank.path and writes
+    them plus updated config.json to the new dest_path. Optionally create a .bak
+    for the original (controlled by backup_source).
+
+    A dest_path ending in MANIFEST_SUFFIX saves into the asset store instead
+    (store, default AssetStore()); a manifest bank saved to a .npb path is
+    materialized from its stored objects. config_data, progress and
+    prune_orphans as for save_bank (the source is not modified); a cancelled
+    save leaves no file at dest_path.
     """
     src_path = bank.path
     if not os.path.isfile(src_path):
         raise BankError(f"Source bank missing: {src_path}")
-    dir_name = os.path.dirname(dest_path) or '.'
-    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(dest_path)+'.', suffix='.tmp', dir=dir_name)
-    os.close(fd)
-    try:
-        with tarfile.open(src_path, 'r:gz') as tf_in, tarfile.open(tmp_path, 'w:gz') as tf_out:
-            for member in tf_in.getmembers():
-                name_norm = member.name.lstrip('./')
-                if name_norm == CONFIG_NAME:
-                    continue
-                extracted = tf_in.extractfile(member) if member.isfile() else None
-                tf_out.addfile(member, extracted)
-            data = json.dumps(bank.config, indent=4).encode('utf-8')
-            info = tarfile.TarInfo(name=f'./{CONFIG_NAME}')
-            info.size = len(data)
-            tf_out.addfile(info, io.BytesIO(data))
-        os.replace(tmp_path, dest_path)
-        if backup_source and not os.path.exists(src_path + '.bak'):
-            shutil.copy2(src_path, src_path + '.bak')
-    finally:
-        if os.path.exists(tmp_path):
-            try: os.remove(tmp_path)
-            except OSError: pass
+    data = encode_config(bank.config) if config_data is None else config_data
+    drop = _orphan_names(src_path, data) if prune_orphans else []
+    if is_manifest(dest_path):
+        if store is None and is_manifest(src_path):
+            store = BankManifest(src_path).store
+        store_bank(src_path, dest_path, data, store, compresslevel, progress, exclude=drop)
+    else:
+        with FileTransaction(dest_path) as txn:
+            if is_manifest(src_path):
+                materialize_manifest(src_path, txn.tmp_path, data, compresslevel, progress, exclude=drop)
+            else:
+                rewrite_archive(src_path, txn.tmp_path, data, compresslevel, progress, exclude=drop)
+    if backup_source:
+        backup_file(src_path)  # a copy: the source stays live and may be appended to
+    return drop
@@ -0,0 +1,115 @@
+"""Undo/redo commands for the NAM Player Manager GUI.
+
+Every command stores only what it changes - (field, old, new) triples or a
+pair of row indexes - never a copy of the config, so the undo history stays
+small however long the session runs. Commands apply themselves through the
+PresetTableModel / GlobalSettingsPanel, which emit the usual change signals.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Sequence, Tuple
+
+from PySide6.QtGui import QUndoCommand
+
+ABSENT = object()  # "field did not exist": undo removes it again
+
+_ID_SET_GLOBAL = 1
+
+
+class SetPresetFieldsCommand(QUndoCommand):
+    """Set one or more fields of one preset (rename, LED colour, edit dialog)."""
+
+    def __init__(self, model, row: int, values: Dict[str, Any], text: str = "Edit preset"):
+        super().__init__(text)
+        self._model = model
+        self._row = row
+        cols = model.bank.preset_columns()
+        present = {f: bool(cols.present(f)[row]) for f in values}
+        self._delta: Dict[str, Tuple[Any, Any]] = {
+            f: (cols.get(row, f) if present[f] else ABSENT, v) for f, v in values.items()}
+
+    def redo(self):
+        self._model.apply_fields(self._row, {f: new for f, (_old, new) in self._delta.items()})
+
+    def undo(self):
+        self._model.apply_fields(self._row, {f: old for f, (old, _new) in self._delta.items()})
+
+
+class SetPresetColumnsCommand(QUndoCommand):
+    """Set fields across many presets at once (bulk edits).
+
+    values maps field -> a list with one value per row. The model applies
+    each direction as a single batched column update.
+    """
+
+    def __init__(self, model, rows: Sequence[int], values: Dict[str, Any], text: str = "Edit presets"):
+        super().__init__(text)
+        self._model = model
+        self._rows = list(rows)
+        cols = model.bank.preset_columns()
+        self._new: Dict[str, List[Any]] = {}
+        self._old: Dict[str, List[Any]] = {}
+        for f, v in values.items():
+            present = cols.present(f)
+            self._new[f] = list(v)
+            self._old[f] = [cols.get(r, f) if present[r] else ABSENT for r in self._rows]
+
+    def redo(self):
+        self._model.apply_columns(self._rows, self._new)
+
+    def undo(self):
+        self._model.apply_columns(self._rows, self._old)
+
+
+class MovePresetCommand(QUndoCommand):
+    """Move one preset; undo is the inverse move, nothing else is stored."""
+
+    def __init__(self, model, src: int, dst: int):
+        super().__init__(f"Move preset {src} to {dst}")
+        self._model = model
+        self._src = src
+        self._dst = dst
+
+    def redo(self):
+        self._model.apply_move(self._src, self._dst)
+
+    def undo(self):
+        self._model.apply_move(self._dst, self._src)
+
+
+class SetGlobalCommand(QUndoCommand):
+    """Change one global setting.
+
+    Consecutive changes of the same key (spin box steps, typing) merge into a
+    single entry; one that ends on the original value drops out of the stack.
+    """
+
+    def __init__(self, panel, config: Dict[str, Any], key: str, old: Any, new: Any):
+        super().__init__(f"Change {key}")
+        self._panel = panel
+        self._config = config
+        self._key = key
+        self._old = old
+        self._new = new
+
+    def id(self) -> int:
+        return _ID_SET_GLOBAL
+
+    def mergeWith(self, other: QUndoCommand) -> bool:
+        if not isinstance(other, SetGlobalCommand) or other._key != self._key or other._config is not self._config:
+            return False
+        self._new = other._new
+        self.setObsolete(self._new == self._old and type(self._new) is type(self._old))
+        return True
+
+    def _apply(self, value: Any):
+        if value is ABSENT:
+            self._config.pop(self._key, None)
+        else:
+            self._config[self._key] = value
+        self._panel.refresh_key(self._key)
+
+    def redo(self):
+        self._apply(self._new)
+
+    def undo(self):
+        self._apply(self._old)
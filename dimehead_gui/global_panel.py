@@ -4,6 +4,8 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Signal, Qt
 
+from .commands import ABSENT
+
 # Keys we expose, their widget types/ranges, and NAM Player GUI labels
 _GLOBAL_SPECS = {
     "lcdBrightness": {"type": "int", "min": 0, "max": 10, "step": 1, "label": "LCD Brightness"},
@@ -19,6 +21,7 @@ _GLOBAL_SPECS = {
 
 class GlobalSettingsPanel(QWidget):
     changed = Signal(str, object)  # key, new_value
+    edited = Signal(str, object, object)  # key, old_value (ABSENT if missing), new_value
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -65,16 +68,26 @@ class GlobalSettingsPanel(QWidget):
             w = self._widgets.get(key)
             if not w:
                 continue
-            if spec["type"] == "bool":
-                w.setChecked(False)
-            elif spec["type"] == "int":
-                w.setValue(spec.get("min", 0))
-            elif spec["type"] == "float":
-                w.setValue(spec.get("min", 0.0))
+            self._apply_value(w, spec, None)
         self._config_version_label.setText("-")
         self._suppress = False
         self.setDisabled(True)
 
+    def refresh_key(self, key: str):
+        """Show the config's current value of key (after an undo/redo), without emitting."""
+        widget = self._widgets.get(key)
+        if widget is None or self._config_ref is None:
+            return
+        value = self._config_ref.get(key)
+        spec = _GLOBAL_SPECS[key]
+        current = widget.isChecked() if spec["type"] == "bool" else widget.value()
+        if value is not None and current == value:
+            return  # leave a spin box that is being typed into alone
+        self._suppress = True
+        self._apply_value(widget, spec, value)
+        self._suppress = False
+        self.changed.emit(key, value)
+
     # Internal helpers -------------------------------------------------------
     def _create_widget_for_spec(self, key: str, spec: dict):
         t = spec["type"]
@@ -99,9 +112,14 @@ class GlobalSettingsPanel(QWidget):
         return QLabel("(unsupported)")
 
     def _apply_value(self, widget, spec, value):
+        """Show value; None (key missing from the config) shows the spec's default."""
+        t = spec["type"]
         if value is None:
+            if t == "bool":
+                widget.setChecked(False)
+            elif t in ("int", "float"):
+                widget.setValue(spec.get("min", 0))
             return
-        t = spec["type"]
         if t == "bool":
             widget.setChecked(bool(value))
         elif t == "int":
@@ -120,9 +138,7 @@ class GlobalSettingsPanel(QWidget):
         if self._suppress or not self._config_ref:
             return
         w: QCheckBox = self._widgets[key]
-        new_val = bool(w.isChecked())
-        self._config_ref[key] = new_val
-        self.changed.emit(key, new_val)
+        self._store(key, bool(w.isChecked()))
 
     def _on_number_changed(self, key: str):
         if self._suppress or not self._config_ref:
@@ -133,7 +149,12 @@ class GlobalSettingsPanel(QWidget):
             new_val = int(w.value())
         else:
             new_val = float(w.value())
+        self._store(key, new_val)
+
+    def _store(self, key: str, new_val):
+        old_val = self._config_ref.get(key, ABSENT)
         self._config_ref[key] = new_val
         self.changed.emit(key, new_val)
+        self.edited.emit(key, old_val, new_val)
 
 __all__ = ["GlobalSettingsPanel"]
@@ -1,16 +1,27 @@
 from __future__ import annotations
 import sys
+import json
 from pathlib import Path
 from PySide6.QtWidgets import (
-    QApplication, QMainWindow, QFileDialog, QMessageBox, QTableView, QStatusBar, QToolBar, QSplitter, QWidget, QColorDialog, QHeaderView, QStyledItemDelegate, QStyleOptionButton
+    QApplication, QMainWindow, QFileDialog, QMessageBox, QTableView, QStatusBar, QToolBar, QSplitter, QWidget, QColorDialog, QHeaderView, QStyledItemDelegate, QStyleOptionButton, QLabel, QProgressBar, QPushButton,
+    QInputDialog, QMenu, QToolButton, QDockWidget
 )
 from PySide6.QtCore import QEvent
-from PySide6.QtGui import QAction, QColor
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+from PySide6.QtGui import QAction, QColor, QKeySequence, QUndoStack
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal, QThreadPool, QSettings
 
 import dimehead_bank as db
+import dimehead_analysis as analysis
 from .global_panel import GlobalSettingsPanel
+from .profile_panel import ProfilePanel
 from .preset_edit_dialog import PresetEditDialog
+from .workers import SaveWorker, AssetScanWorker, AnalysisWorker
+from .commands import ABSENT, SetPresetFieldsCommand, SetPresetColumnsCommand, MovePresetCommand, SetGlobalCommand
+
+# Qt enum attribute lookups cost microseconds each in PySide6; data() runs per painted cell
+_DISPLAY_ROLE, _EDIT_ROLE, _TOOLTIP_ROLE, _BACKGROUND_ROLE = Qt.DisplayRole, Qt.EditRole, Qt.ToolTipRole, Qt.BackgroundRole
+
+
 class EditButtonDelegate(QStyledItemDelegate):
     def paint(self, painter, option, index):
         from PySide6.QtWidgets import QStyle
@@ -35,16 +46,115 @@ class EditButtonDelegate(QStyledItemDelegate):
 
 class PresetTableModel(QAbstractTableModel):
     HEADERS = ["#", "Name", "Model (nam)", "IR", "Gain", "VolNorm", "LED", "Edit"]
+    # Preset field -> table column showing it (other fields are not displayed)
+    FIELD_COLUMNS = {'name': 1, 'nam': 2, 'ir': 3, 'potiGain': 4, 'volNormalizeEnabled': 5, 'ledColor': 6}
     dirtyChanged = Signal(bool)
 
     def __init__(self, bank: db.Bank | None = None):
         super().__init__()
         self.bank = bank
+        self._flags = [self._column_flags(c) for c in range(len(self.HEADERS))]
+        # Rendered (display tuple, LED background) per row, built on first
+        # paint and dropped only for rows an edit touches
+        self._cache: list[tuple | None] = [None] * (len(bank.preset_columns()) if bank else 0)
+        self._assets: dict[str, db.Asset] = {}
+        self._assets_complete = False
+        self.ir_summaries: dict[str, dict] = {}  # member name -> dimehead_analysis.ir_summary
+        # Edit history; dirty means "not at the state last loaded or saved"
+        self.undo_stack = QUndoStack(self)
+        self.undo_stack.indexChanged.connect(self._history_changed)
+
+    def _history_changed(self, _index: int):
+        self.dirtyChanged.emit(not self.undo_stack.isClean())
 
-    def set_bank(self, bank: db.Bank):
-        self.beginResetModel()
+    def set_bank(self, bank: db.Bank, assets_complete: bool = True):
+        """Show bank; only the row count difference is inserted/removed, the rest is a dataChanged."""
+        old_count = self.rowCount()
+        new_count = len(bank.preset_columns())
+        previous = self.bank
+        parent = QModelIndex()
+        if new_count < old_count:
+            self.beginRemoveRows(parent, new_count, old_count - 1)
+        elif new_count > old_count:
+            self.beginInsertRows(parent, old_count, new_count - 1)
         self.bank = bank
-        self.endResetModel()
+        self._cache = [None] * new_count
+        self._assets = {a.name.lstrip('./'): a for a in bank.assets}
+        self._assets_complete = assets_complete
+        if bank is not previous:
+            self.ir_summaries = {}
+        if new_count < old_count:
+            self.endRemoveRows()
+        elif new_count > old_count:
+            self.endInsertRows()
+        if min(old_count, new_count):
+            self.dataChanged.emit(self.index(0, 0), self.index(min(old_count, new_count) - 1, self.columnCount() - 1))
+        self.undo_stack.clear()
+
+    def _rows_changed(self, rows, fields):
+        """Drop the cached rendering of rows and emit one dataChanged for the displayed fields."""
+        for r in rows:
+            self._cache[r] = None
+        columns = [self.FIELD_COLUMNS[f] for f in fields if f in self.FIELD_COLUMNS]
+        if rows and columns:
+            self.dataChanged.emit(self.index(min(rows), min(columns)), self.index(max(rows), max(columns)))
+
+    def _render(self, row: int) -> tuple:
+        cols = self.bank.preset_columns()
+        led = cols.get(row, 'ledColor')
+        is_rgb = isinstance(led, int)
+        text = (cols.get(row, 'name', ''), cols.get(row, 'nam', ''), cols.get(row, 'ir', ''),
+                f"{cols.get(row, 'potiGain', 0):.2f}", 'Y' if cols.get(row, 'volNormalizeEnabled') else '',
+                f"#{led:06X}" if is_rgb else '')  # LED as hex RGB
+        background = QColor((led >> 16) & 0xFF, (led >> 8) & 0xFF, led & 0xFF) if is_rgb else None
+        entry = self._cache[row] = (text, background)
+        return entry
+
+    # Asset metadata arrives from a background scan after the table is shown
+    def add_asset(self, asset: db.Asset):
+        key = asset.name.lstrip('./')
+        self._assets[key] = asset
+        rows = self._rows_referencing(key)
+        if rows:
+            self.dataChanged.emit(self.index(rows[0], 2), self.index(rows[-1], 3), [Qt.ToolTipRole])
+
+    def set_ir_summaries(self, summaries: dict):
+        self.ir_summaries = summaries
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 3), self.index(self.rowCount() - 1, 3), [Qt.ToolTipRole])
+
+    def set_assets_complete(self):
+        self._assets_complete = True
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 2), self.index(self.rowCount() - 1, 3), [Qt.ToolTipRole])
+
+    def _rows_referencing(self, key: str) -> list[int]:
+        users = self.bank.asset_refs().users(key)
+        return sorted({r for r, field in users if field in ('nam', 'ir')})
+
+    def _asset_tooltip(self, ref: str) -> str | None:
+        if not ref:
+            return None
+        asset = self._assets.get(ref.lstrip('./'))
+        if asset is None:
+            return "Not in this bank" if self._assets_complete else "Scanning bank..."
+        parts = [f"{asset.size / 1024:.0f} KiB"]
+        if asset.info:
+            arch = asset.info.get('architecture')
+            if arch:
+                parts.append(str(arch))
+            rate = asset.info.get('sample_rate')
+            if rate:
+                parts.append(f"{rate} Hz")
+        if asset.digest:
+            parts.append(asset.digest[:12])
+        text = " · ".join(parts)
+        ir = self.ir_summaries.get(ref.lstrip('./'))
+        if ir and 'centroid_hz' in ir:
+            text += (f"\n{ir['length_ms']:.0f} ms (99% energy in {ir['effective_ms']:.1f} ms) · "
+                     f"{ir['low_rolloff_hz']:.0f}–{ir['high_rolloff_hz']:.0f} Hz · "
+                     f"centroid {ir['centroid_hz'] / 1000:.1f} kHz")
+        return text
 
     # Basic model implementation
     def rowCount(self, parent=QModelIndex()):
@@ -56,7 +166,7 @@ class PresetTableModel(QAbstractTableModel):
         It provides a table-based editor for .npb preset banks, with drag-and-drop, inline editing, and global settings panel.
         """
 
-        return len(self.bank.config.get('presets', []))
+        return len(self.bank.preset_columns())
 
     def columnCount(self, parent=QModelIndex()):
         return len(self.HEADERS)
@@ -72,74 +182,103 @@ class PresetTableModel(QAbstractTableModel):
         # Preset Table Model
         # ----------------------
             return None
-        presets = self.bank.config.get('presets', [])
-        if index.row() >= len(presets):
+        row = index.row()
+        if row >= len(self._cache):
             return None
-        preset = presets[index.row()]
         col = index.column()
-        if role == Qt.DisplayRole:
+        if role == _DISPLAY_ROLE:
             if col == 0:
-                return index.row()
-            if col == 1:
-                return preset.get('name', '')
-            if col == 2:
-                return preset.get('nam', '')
-            if col == 3:
-                return preset.get('ir', '')
-            if col == 4:
-                return f"{preset.get('potiGain', 0):.2f}"
-            if col == 5:
-                return 'Y' if preset.get('volNormalizeEnabled') else ''
-            if col == 6:
-                # Show hex RGB
-                val = preset.get('ledColor')
-                if isinstance(val, int):
-                    return f"#{val:06X}"
-                return ''
+                return row
             if col == 7:
                 return "Edit"
-        if role == Qt.EditRole and col == 1:
-            return preset.get('name', '')
-        if role == Qt.BackgroundRole and col == 6:
-            val = preset.get('ledColor')
-            if isinstance(val, int):
-                r = (val >> 16) & 0xFF
-                g = (val >> 8) & 0xFF
-                b = val & 0xFF
-                return QColor(r, g, b)
+            # Name / Model / IR / Gain / VolNorm / LED hex, rendered once per row
+            return (self._cache[row] or self._render(row))[0][col - 1]
+        if role == _EDIT_ROLE and col == 1:
+            return (self._cache[row] or self._render(row))[0][0]
+        if role == _TOOLTIP_ROLE and col in (2, 3):
+            return self._asset_tooltip((self._cache[row] or self._render(row))[0][col - 1])
+        if role == _BACKGROUND_ROLE and col == 6:
+            return (self._cache[row] or self._render(row))[1]
         return None
 
     # Combined flags: selection, edit (Name), drag for all rows, drop on first column
     def flags(self, index: QModelIndex):  # merged editing + dnd
         if not index.isValid():
             return Qt.ItemIsEnabled | Qt.ItemIsDropEnabled
+        return self._flags[index.column()]
+
+    @staticmethod
+    def _column_flags(column: int):
         base = Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsDragEnabled
-        if index.column() == 1:
+        if column == 1:
             base |= Qt.ItemIsEditable
-        if index.column() == 0:
+        if column == 0:
             base |= Qt.ItemIsDropEnabled
-        if index.column() == 7:
+        if column == 7:
             base |= Qt.ItemIsEnabled
         return base
 
     def setData(self, index: QModelIndex, value, role=Qt.EditRole):
         if not self.bank or role != Qt.EditRole or index.column() != 1:
             return False
-        presets = self.bank.config.get('presets', [])
-        if index.row() >= len(presets):
+        cols = self.bank.preset_columns()
+        if index.row() >= len(cols):
             return False
         new_name = str(value).strip()
         if not new_name:
             return False
-        preset = presets[index.row()]
-        old_name = preset.get('name', '')
+        old_name = cols.get(index.row(), 'name', '')
         if new_name == old_name:
             return False
-        preset['name'] = new_name
-        self.dataChanged.emit(index, index, [Qt.DisplayRole])
-        self.dirtyChanged.emit(True)
+        self.undo_stack.push(SetPresetFieldsCommand(self, index.row(), {'name': new_name}, "Rename preset"))
+        return True
+
+    def edit_fields(self, row: int, values: dict, text: str = "Edit preset") -> bool:
+        """Change fields of preset row as one undoable step (unchanged fields are dropped)."""
+        cols = self.bank.preset_columns()
+        present = {f: bool(cols.present(f)[row]) for f in values}
+        delta = {f: v for f, v in values.items()
+                 if not present[f] or cols.get(row, f) != v or type(cols.get(row, f)) is not type(v)}
+        if not delta:
+            return False
+        self.undo_stack.push(SetPresetFieldsCommand(self, row, delta, text))
         return True
 
+    def edit_columns(self, rows, values: dict, text: str = "Edit presets") -> bool:
+        """Set fields across rows as one undoable step; values maps field -> one value per row."""
+        rows = list(rows)
+        if not rows or not values:
+            return False
+        cols = self.bank.preset_columns()
+        if all(cols.present(f)[r] and cols.get(r, f) == v and type(cols.get(r, f)) is type(v)
+               for f, vals in values.items() for r, v in zip(rows, vals)):
+            return False  # nothing would change: keep the history clean
+        self.undo_stack.push(SetPresetColumnsCommand(self, rows, values, text))
+        return True
+
+    def apply_columns(self, rows: list, values: dict):
+        """Batched write of field columns for rows (ABSENT removes); one dataChanged for the span."""
+        cols = self.bank.preset_columns()
+        for field, vals in values.items():
+            keep = [(r, v) for r, v in zip(rows, vals) if v is not ABSENT]
+            if keep:
+                cols.set_column(field, [v for _, v in keep], [r for r, _ in keep])
+            if len(keep) != len(rows):
+                for r, v in zip(rows, vals):
+                    if v is ABSENT:
+                        cols.unset(r, field)
+        self._rows_changed(rows, values)
+
+    def apply_fields(self, row: int, values: dict):
+        """Write values into preset row (ABSENT removes the field); used by the undo commands."""
+        cols = self.bank.preset_columns()
+        for field, value in values.items():
+            if value is ABSENT:
+                cols.unset(row, field)
+            else:
+                cols.set(row, field, value)
+        self._rows_changed([row], values)
+
     # Reordering support
     def move_row(self, src_row: int, dst_row: int) -> bool:
         """Move a single row to dst_row (after adjustment) using beginMoveRows.
@@ -147,12 +286,45 @@ class PresetTableModel(QAbstractTableModel):
         """
         if not self.bank:
             return False
-        presets = self.bank.config.get('presets', [])
-        count = len(presets)
+        cols = self.bank.preset_columns()
+        count = len(cols)
         if src_row < 0 or src_row >= count or dst_row < 0 or dst_row >= count:
             return False
         if src_row == dst_row:
             return False
+        self.undo_stack.push(MovePresetCommand(self, src_row, dst_row))
+        return True
+
+    def move_rows(self, rows, dst_row: int) -> bool:
+        """Move rows as a contiguous block whose first row ends up at dst_row (one undo step).
+
+        Rows moving down are placed last-first and rows moving up first-first,
+        so each row is moved exactly once and no placed row is disturbed.
+        """
+        if not self.bank:
+            return False
+        rows = sorted(set(rows))
+        count = self.rowCount()
+        if not rows or rows[0] < 0 or rows[-1] >= count:
+            return False
+        dst_row = max(0, min(dst_row, count - len(rows)))
+        targets = [dst_row + i for i in range(len(rows))]
+        if rows == targets:
+            return False
+        if len(rows) == 1:
+            return self.move_row(rows[0], dst_row)
+        down = [(r, t) for r, t in zip(rows, targets) if r < t]
+        up = [(r, t) for r, t in zip(rows, targets) if r > t]
+        self.undo_stack.beginMacro(f"Move {len(rows)} presets")
+        for r, t in reversed(down):
+            self.undo_stack.push(MovePresetCommand(self, r, t))
+        for r, t in up:
+            self.undo_stack.push(MovePresetCommand(self, r, t))
+        self.undo_stack.endMacro()
+        return True
+
+    def apply_move(self, src_row: int, dst_row: int) -> bool:
+        cols = self.bank.preset_columns()
         # Qt beginMoveRows requires parent indexes
         parent = QModelIndex()
         # Adjust destination for removal if moving downward
@@ -160,15 +332,18 @@ class PresetTableModel(QAbstractTableModel):
             adj_dst = dst_row + 1  # because removal shifts indices up
         else:
             adj_dst = dst_row
+        # Qt refuses a no-op or invalid move; the list must not change then
         if not self.beginMoveRows(parent, src_row, src_row, parent, adj_dst):
             return False
-        item = presets.pop(src_row)
-        # Insert at the final intended index. When moving downward we intentionally
-        # do NOT decrement dst_row; the desired final index remains dst_row because
-        # items after the source shifted left by one after the pop.
-        presets.insert(dst_row, item)
+        # Final intended index is dst_row (pop + insert semantics). When moving
+        # downward we intentionally do NOT decrement dst_row; items after the
+        # source shift left by one after the pop.
+        cols.move_row(src_row, dst_row)
+        self._cache.insert(dst_row, self._cache.pop(src_row))
         self.endMoveRows()
-        self.dirtyChanged.emit(True)
+        # The "#" column shows the position: renumber the rows in between
+        lo, hi = min(src_row, dst_row), max(src_row, dst_row)
+        self.dataChanged.emit(self.index(lo, 0), self.index(hi, 0), [Qt.DisplayRole])
         return True
 
     # ---- Drag & Drop Reordering API ----
@@ -181,10 +356,10 @@ class PresetTableModel(QAbstractTableModel):
     def mimeData(self, indexes):
         from PySide6.QtCore import QMimeData
         mime = QMimeData()
-        # Use first row index only (row-based move)
+        # Every selected row, comma separated
         rows = sorted({i.row() for i in indexes})
         if rows:
-            mime.setData("application/x-dimehead-preset-index", str(rows[0]).encode('utf-8'))
+            mime.setData("application/x-dimehead-preset-index", ",".join(map(str, rows)).encode('utf-8'))
         return mime
 
     def dropMimeData(self, data, action, row, column, parent):
@@ -193,7 +368,7 @@ class PresetTableModel(QAbstractTableModel):
         if not data.hasFormat("application/x-dimehead-preset-index"):
             return False
         try:
-            src_row = int(bytes(data.data("application/x-dimehead-preset-index")).decode('utf-8'))
+            src_rows = [int(r) for r in bytes(data.data("application/x-dimehead-preset-index")).decode('utf-8').split(',')]
         except Exception:
             return False
         # Determine destination row: Qt supplies 'row' or parent.row()
@@ -205,10 +380,7 @@ class PresetTableModel(QAbstractTableModel):
                 dst_row = self.rowCount() - 1
         else:
             dst_row = row
-        # If dropping below original when intending to move after, adjust
-        if dst_row != src_row:
-            return self.move_row(src_row, dst_row)
-        return False
+        return self.move_rows(src_rows, dst_row)
 
 class MainWindow(QMainWindow):
     # Main application window: contains the preset table and global settings panel
@@ -228,20 +400,47 @@ class MainWindow(QMainWindow):
         self.table.setAcceptDrops(True)
         self.table.setDefaultDropAction(Qt.MoveAction)
         self.table.setSelectionBehavior(QTableView.SelectRows)
-        self.table.setSelectionMode(QTableView.SingleSelection)
+        self.table.setSelectionMode(QTableView.ExtendedSelection)
         # Global settings panel
         self.global_panel = GlobalSettingsPanel()
-        self.global_panel.changed.connect(self._on_global_changed)
+        self.global_panel.edited.connect(self._on_global_edited)
         splitter = QSplitter()
         splitter.addWidget(self.table)
         splitter.addWidget(self.global_panel)
         splitter.setStretchFactor(0, 3)
         splitter.setStretchFactor(1, 1)
         self.setCentralWidget(splitter)
+        # Debug view of load / scan / save timings (dimehead_profile), hidden by default
+        self.profile_panel = ProfilePanel()
+        self._profile_dock = QDockWidget("Profiling", self)
+        self._profile_dock.setObjectName("ProfilingDock")
+        self._profile_dock.setWidget(self.profile_panel)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self._profile_dock)
+        self._profile_dock.hide()
         self._dirty = False
         self._save_act = None
         self._create_actions()
         self.setStatusBar(QStatusBar())
+        # Validation summary (re-checked after every edit)
+        self._validation_label = QLabel()
+        self.statusBar().addPermanentWidget(self._validation_label)
+        # Background save progress + cancel (hidden while idle)
+        self._save_worker = None
+        self._scan_worker = None
+        self._analysis_worker = None
+        self._ir_worker = None
+        # Bumped on every undo-stack move (edit, undo or redo); tells if a save
+        # or analysis started earlier still matches what is on screen
+        self._edit_generation = 0
+        self.model.undo_stack.indexChanged.connect(self._bump_edit_generation)
+        self._save_progress = QProgressBar()
+        self._save_progress.setMaximumWidth(200)
+        self._save_progress.hide()
+        self._save_cancel = QPushButton("Cancel")
+        self._save_cancel.clicked.connect(self._cancel_save)
+        self._save_cancel.hide()
+        self.statusBar().addPermanentWidget(self._save_progress)
+        self.statusBar().addPermanentWidget(self._save_cancel)
 
         # Set fixed column widths for the preset table
         header = self.table.horizontalHeader()
@@ -263,12 +462,7 @@ class MainWindow(QMainWindow):
         preset = presets[row]
         dlg = PresetEditDialog(preset, self)
         if dlg.exec() == dlg.Accepted:
-            updated = dlg.get_result()
-            presets[row].update(updated)
-            idx0 = self.model.index(row, 0)
-            idxN = self.model.index(row, self.model.columnCount() - 1)
-            self.model.dataChanged.emit(idx0, idxN)
-            self.notify_dirty(True)
+            self.model.edit_fields(row, dlg.get_result(), f"Edit preset {row}")
 
     # ... (rest of MainWindow methods: file open/save, dirty tracking, etc.)
     def _create_actions(self):
@@ -277,6 +471,7 @@ class MainWindow(QMainWindow):
         open_act = QAction("Open Bank", self)
         open_act.triggered.connect(self.open_bank)
         tb.addAction(open_act)
+        self._open_act = open_act
         tb.addSeparator()
         version_act = QAction("Save New Version", self)
         version_act.triggered.connect(self.save_new_version)
@@ -290,6 +485,33 @@ class MainWindow(QMainWindow):
         # Mark visually (Qt doesn't have native color on QAction text, so rely on confirmation)
         tb.addAction(overwrite_act)
         self._overwrite_act = overwrite_act
+        export_act = QAction("Export .npb", self)
+        export_act.triggered.connect(self.export_npb)
+        tb.addAction(export_act)
+        self._export_act = export_act
+        # Opt-in save behaviours, remembered between sessions
+        self._settings = QSettings("dimehead-configurator", "NAM Player Manager")
+        options_menu = QMenu("Save Options", self)
+        self._append_act = options_menu.addAction("Fast Overwrite (append config.json)")
+        self._append_act.setCheckable(True)
+        self._append_act.setChecked(self._settings.value("save/appendOverwrite", False, type=bool))
+        self._append_act.toggled.connect(lambda on: self._settings.setValue("save/appendOverwrite", on))
+        self._manifest_act = options_menu.addAction("Save Versions to Asset Store (.npbm)")
+        self._manifest_act.setCheckable(True)
+        self._manifest_act.setChecked(self._settings.value("save/manifestVersions", False, type=bool))
+        self._manifest_act.toggled.connect(lambda on: self._settings.setValue("save/manifestVersions", on))
+        options_btn = QToolButton()
+        options_btn.setText("Save Options")
+        options_btn.setMenu(options_menu)
+        options_btn.setPopupMode(QToolButton.InstantPopup)
+        tb.addWidget(options_btn)
+        tb.addSeparator()
+        undo_act = self.model.undo_stack.createUndoAction(self, "Undo")
+        undo_act.setShortcut(QKeySequence.Undo)
+        tb.addAction(undo_act)
+        redo_act = self.model.undo_stack.createRedoAction(self, "Redo")
+        redo_act.setShortcut(QKeySequence.Redo)
+        tb.addAction(redo_act)
         tb.addSeparator()
         up_act = QAction("Move Up", self)
         up_act.triggered.connect(self.move_up)
@@ -299,24 +521,121 @@ class MainWindow(QMainWindow):
         tb.addAction(down_act)
         self._move_up_act = up_act
         self._move_down_act = down_act
+        # Bulk operations on the selected presets
+        bulk_menu = QMenu("Bulk", self)
+        self._bulk_set_act = bulk_menu.addAction("Set Field...", self.bulk_set_field)
+        self._bulk_gain_act = bulk_menu.addAction("Gain Offset...", self.bulk_gain_offset)
+        self._bulk_led_act = bulk_menu.addAction("Recolour LEDs...", self.bulk_led_color)
+        self._bulk_eq_act = bulk_menu.addAction("Copy EQ from Current", self.bulk_copy_eq)
+        self._bulk_norm_act = bulk_menu.addAction("Normalize Volume", self.bulk_normalize_volume)
+        self._bulk_filter_act = bulk_menu.addAction("HP/LP from Cab IR", self.bulk_filters_from_ir)
+        bulk_btn = QToolButton()
+        bulk_btn.setText("Bulk")
+        bulk_btn.setMenu(bulk_menu)
+        bulk_btn.setPopupMode(QToolButton.InstantPopup)
+        tb.addWidget(bulk_btn)
+        self._bulk_menu = bulk_menu
+        tb.addSeparator()
+        tb.addAction(self._profile_dock.toggleViewAction())
 
     def open_bank(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Open .npb Bank", str(Path.cwd()), "NAM Banks (*.npb *.tar.gz)")
+        path, _ = QFileDialog.getOpenFileName(self, "Open .npb Bank", str(Path.cwd()), "NAM Banks (*.npb *.tar.gz *.npbm)")
         if not path:
             return
         try:
-            bank = db.load_bank(path)
+            # config.json only; asset metadata is streamed in afterwards
+            bank, final = db.open_bank_fast(path)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load bank:\n{e}")
             return
-        self.model.set_bank(bank)
-        self.statusBar().showMessage(f"Loaded {Path(path).name} ({len(bank.config.get('presets', []))} presets)")
+        self.table.clearSelection()
+        self._show_bank(bank, assets_complete=False)
+        self.notify_dirty(False)
+        self._start_asset_scan(bank, final)
+
+    def _show_bank(self, bank: db.Bank, assets_complete: bool = True):
+        self.model.set_bank(bank, assets_complete)
+        self.statusBar().showMessage(f"Loaded {Path(bank.path).name} ({len(bank.config.get('presets', []))} presets)")
         # Load global settings
         if bank and bank.config:
             self.global_panel.load_config(bank.config)
         else:
             self.global_panel.clear()
         self._update_move_actions()
+        self._run_validation()
+
+    # ---- Background asset scan ----
+    def _start_asset_scan(self, bank: db.Bank, config_final: bool):
+        self._cancel_asset_scan()
+        worker = AssetScanWorker(bank.path)
+
+        def add(asset):
+            if self.model.bank is bank:
+                bank.assets = [a for a in bank.assets if a.name != asset.name] + [asset]
+                self.model.add_asset(asset)
+
+        def finished(raw):
+            if self._scan_worker is worker:
+                self._scan_worker = None
+            if self.model.bank is not bank:
+                return
+            self.model.set_assets_complete()
+            self._start_ir_analysis(bank)
+            if not config_final and raw != bank.original_config_json:
+                # An append-saved overlay later in the file supersedes the
+                # config.json found first
+                if self._dirty:
+                    self.statusBar().showMessage("Bank has a newer config.json overlay than the one shown; "
+                                                 "reopen it before saving to keep those changes")
+                    return
+                bank.config = json.loads(raw)
+                bank.original_config_json = raw
+                self._show_bank(bank)
+                return
+            self.statusBar().showMessage(f"Loaded {Path(bank.path).name} ({len(bank.config.get('presets', []))} "
+                                         f"presets, {len(bank.assets)} assets)")
+            self.profile_panel.refresh()
+
+        def failed(msg):
+            if self._scan_worker is worker:
+                self._scan_worker = None
+            self.statusBar().showMessage(f"Asset scan failed: {msg}")
+
+        worker.signals.asset.connect(add)
+        worker.signals.finished.connect(finished)
+        worker.signals.failed.connect(failed)
+        self._scan_worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def _cancel_asset_scan(self):
+        if self._scan_worker is not None:
+            self._scan_worker.cancel()
+            self._scan_worker = None
+        if self._ir_worker is not None:
+            self._ir_worker.cancel()
+            self._ir_worker = None
+
+    def _start_ir_analysis(self, bank: db.Bank):
+        """Summarize the bank's IRs for the IR tooltips and HP/LP suggestions (cached per IR hash)."""
+        path = bank.path
+        worker = AnalysisWorker(lambda progress: analysis.bank_ir_summaries(path, progress=progress))
+
+        def finished(summaries):
+            if self._ir_worker is worker:
+                self._ir_worker = None
+            if self.model.bank is bank:
+                self.model.set_ir_summaries(summaries)
+                self._update_move_actions()
+
+        def failed(msg):
+            if self._ir_worker is worker:
+                self._ir_worker = None
+            self.statusBar().showMessage(f"IR analysis failed: {msg}")
+
+        worker.signals.finished.connect(finished)
+        worker.signals.failed.connect(failed)
+        self._ir_worker = worker
+        QThreadPool.globalInstance().start(worker)
 
     def _current_path(self) -> Path | None:
         if self.model.bank:
@@ -329,16 +648,22 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, "No Bank", "No bank loaded")
             return
         base_path = Path(bank.path)
-        new_path = self._next_version_path(base_path)
-        try:
-            db.save_bank_as(bank, str(new_path))
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save new version:\n{e}")
-            return
-        # Update bank path to new version for subsequent overwrites / increments
-        bank.path = str(new_path)
-        self.statusBar().showMessage(f"Saved new version: {new_path.name}")
-        self.notify_dirty(False)
+        # Self-contained .npb by default; as an asset-store manifest (opt-in)
+        # the assets are shared and only config.json is new
+        as_manifest = self._manifest_act.isChecked()
+        new_path = self._next_version_path(base_path, db.MANIFEST_SUFFIX if as_manifest else ".npb")
+
+        def save(data, progress):
+            db.save_bank_as(bank, str(new_path), config_data=data, progress=progress)
+
+        def done(data):
+            # Update bank path to new version for subsequent overwrites / increments
+            bank.path = str(new_path)
+            bank.original_config_json = data.decode('utf-8')
+            hint = " (use Export .npb for the device)" if as_manifest else ""
+            self.statusBar().showMessage(f"Saved new version: {new_path.name}{hint}")
+
+        self._start_save(f"Saving {new_path.name}", save, done, "Failed to save new version", clears_dirty=True)
 
     def overwrite_bank(self):
         bank = self.model.bank
@@ -354,21 +679,133 @@ class MainWindow(QMainWindow):
         )
         if resp != QMessageBox.StandardButton.Yes:
             return
-        try:
-            db.save_bank(bank)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to overwrite bank:\n{e}")
+
+        # A full rewrite keeps the bank ready for the device; Fast Overwrite only
+        # appends a config.json overlay (Export .npb writes a compacted copy)
+        mode = "append" if self._append_act.isChecked() else "rewrite"
+
+        def save(data, progress):
+            db.save_bank(bank, mode=mode, config_data=data, progress=progress)
+
+        def done(data):
+            if mode == "append":
+                self.statusBar().showMessage("Overwrote existing bank (config appended; use Export .npb for the device)")
+            else:
+                self.statusBar().showMessage("Overwrote existing bank")
+
+        self._start_save("Overwriting bank", save, done, "Failed to overwrite bank", clears_dirty=True)
+
+    def export_npb(self):
+        bank = self.model.bank
+        if not bank:
+            QMessageBox.information(self, "No Bank", "No bank loaded")
             return
-        self.statusBar().showMessage("Overwrote existing bank")
-        self.notify_dirty(False)
+        src = Path(bank.path)
+        path, _ = QFileDialog.getSaveFileName(self, "Export .npb Bank", str(src.with_suffix('.npb')),
+                                              "NAM Banks (*.npb)")
+        if not path:
+            return
+
+        def save(data, progress):
+            db.save_bank_as(bank, path, config_data=data, progress=progress)
+
+        def done(data):
+            self.statusBar().showMessage(f"Exported {Path(path).name}")
+
+        self._start_save(f"Exporting {Path(path).name}", save, done, "Failed to export bank")
+
+    # ---- Background saves ----
+    def _start_save(self, label: str, save_fn, on_done, error_title: str, clears_dirty: bool = False):
+        """Run save_fn(config_data, progress) on the thread pool.
+
+        The config is encoded here, on the GUI thread, so the worker writes an
+        immutable snapshot and editing can carry on while it runs.
+        """
+        if self._save_worker is not None:
+            return
+        data = db.encode_config(self.model.bank.config)
+        generation = self._edit_generation
+        worker = SaveWorker(save_fn, data)
 
-    def _next_version_path(self, path: Path) -> Path:
+        def finished(timings):
+            self._end_save()
+            on_done(data)
+            if timings:
+                # Per-phase timings of the write (see dimehead_txn)
+                status = self.statusBar()
+                status.showMessage(f"{status.currentMessage()} · {timings[-1].summary()}")
+            self.profile_panel.refresh()
+            # Edits made during the save are not in the file: stay dirty then
+            if clears_dirty and generation == self._edit_generation:
+                self.model.undo_stack.setClean()
+                self.notify_dirty(False)
+
+        def cancelled():
+            self._end_save()
+            self.statusBar().showMessage(f"{label} cancelled")
+
+        def failed(msg):
+            self._end_save()
+            QMessageBox.critical(self, "Error", f"{error_title}:\n{msg}")
+
+        worker.signals.progress.connect(self._on_save_progress)
+        worker.signals.finished.connect(finished)
+        worker.signals.cancelled.connect(cancelled)
+        worker.signals.failed.connect(failed)
+        self._save_worker = worker
+        self._set_save_actions_enabled(False)
+        self._save_progress.setRange(0, 0)  # busy until the first progress report
+        self._save_progress.show()
+        self._save_cancel.setEnabled(True)
+        self._save_cancel.show()
+        self.statusBar().showMessage(f"{label}...")
+        QThreadPool.globalInstance().start(worker)
+
+    def _on_save_progress(self, done, total):
+        if total > 0:
+            # QProgressBar is int-based: report in KiB
+            self._save_progress.setRange(0, max(1, total >> 10))
+            self._save_progress.setValue(min(done, total) >> 10)
+            self._save_progress.setFormat(f"{done / 2**20:.1f} / {total / 2**20:.1f} MiB")
+
+    def _cancel_save(self):
+        if self._save_worker is not None:
+            self._save_worker.cancel()
+            self._save_cancel.setEnabled(False)
+
+    def _end_save(self):
+        self._save_worker = None
+        self._save_progress.hide()
+        self._save_cancel.hide()
+        self._set_save_actions_enabled(True)
+
+    def _set_save_actions_enabled(self, enabled: bool):
+        self._open_act.setEnabled(enabled)
+        self._export_act.setEnabled(enabled)
+        self._save_act.setEnabled(enabled and self._dirty)
+        self._overwrite_act.setEnabled(enabled and self._dirty)
+
+    def closeEvent(self, event):
+        # Let an in-flight save stop cleanly (it removes its temp file)
+        self._cancel_asset_scan()
+        if self._analysis_worker is not None:
+            self._analysis_worker.cancel()
+        if self._save_worker is not None:
+            self._save_worker.cancel()
+        QThreadPool.globalInstance().waitForDone()
+        super().closeEvent(event)
+
+    def show_profiling(self, record: bool = False):
+        self._profile_dock.show()
+        if record:
+            self.profile_panel.set_recording(True)
+
+    def _next_version_path(self, path: Path, suffix: str = ".npb") -> Path:
         """Generate next versioned filename by inserting _v### before extension.
-        Example: mybank.npb -> mybank_v001.npb, mybank_v002.npb, etc.
-        If file already has _vNNN, increment.
+        Example: mybank.npb -> mybank_v001.npb, mybank_v002.npb, etc. (suffix
+        ".npbm" for manifest versions). If file already has _vNNN, increment.
         """
         stem = path.stem
-        suffix = path.suffix  # .npb
         import re
         m = re.search(r"^(.*)_v(\d{3})$", stem)
         if m:
@@ -380,25 +817,43 @@ class MainWindow(QMainWindow):
         while True:
             num += 1
             candidate = path.with_name(f"{base}_v{num:03d}{suffix}")
-            if not candidate.exists():
+            if not candidate.exists() and not candidate.with_suffix('.npb').exists() \
+                    and not candidate.with_suffix(db.MANIFEST_SUFFIX).exists():
                 return candidate
 
+    def _bump_edit_generation(self, _index: int):
+        self._edit_generation += 1
+
     def notify_dirty(self, dirty: bool):
         self._dirty = dirty
+        saving = getattr(self, '_save_worker', None) is not None
         if self._save_act:
-            self._save_act.setEnabled(dirty)
+            self._save_act.setEnabled(dirty and not saving)
         if hasattr(self, '_overwrite_act') and self._overwrite_act:
-            self._overwrite_act.setEnabled(dirty)
+            self._overwrite_act.setEnabled(dirty and not saving)
         if dirty:
             self.setWindowTitle("* NAM Player Manager")
+            self._run_validation()
         else:
             self.setWindowTitle("NAM Player Manager")
         self._update_move_actions()
 
-    def _on_global_changed(self, key: str, value):
-        # Mark dirty if a global setting changed
-        if not self._dirty:
-            self.notify_dirty(True)
+    def _run_validation(self):
+        bank = self.model.bank
+        diags = db.validate(bank) if bank else []
+        if not diags:
+            self._validation_label.setText("")
+            self._validation_label.setToolTip("")
+            return
+        self._validation_label.setText(f"⚠ {len(diags)} validation issue(s)")
+        lines = [str(d) for d in diags[:20]]
+        if len(diags) > 20:
+            lines.append(f"... and {len(diags) - 20} more")
+        self._validation_label.setToolTip("\n".join(lines))
+
+    def _on_global_edited(self, key: str, old, new):
+        # Spin box steps on the same key merge into one undo entry
+        self.model.undo_stack.push(SetGlobalCommand(self.global_panel, self.model.bank.config, key, old, new))
 
     def _maybe_edit(self, index: QModelIndex):
         if index.column() == 1:
@@ -427,54 +882,192 @@ class MainWindow(QMainWindow):
         new_val = (color.red() << 16) | (color.green() << 8) | color.blue()
         if new_val == current:
             return
-        preset['ledColor'] = new_val
-        # Emit dataChanged for that cell
-        idx = self.model.index(row, self.model.HEADERS.index("LED"))
-        self.model.dataChanged.emit(idx, idx, [Qt.DisplayRole, Qt.BackgroundRole])
-        self.notify_dirty(True)
+        self.model.edit_fields(row, {'ledColor': new_val}, "Change LED colour")
 
-    def _selected_row(self) -> int:
+    def _selected_rows(self) -> list[int]:
         sel = self.table.selectionModel()
         if not sel:
-            return -1
-        indexes = sel.selectedRows()
-        if not indexes:
-            return -1
-        return indexes[0].row()
+            return []
+        return sorted(i.row() for i in sel.selectedRows())
+
+    def _selected_row(self) -> int:
+        rows = self._selected_rows()
+        return rows[0] if rows else -1
+
+    def _select_rows(self, first: int, count: int):
+        from PySide6.QtCore import QItemSelection, QItemSelectionModel
+        sel = QItemSelection(self.model.index(first, 0), self.model.index(first + count - 1, self.model.columnCount() - 1))
+        self.table.selectionModel().select(sel, QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
 
     def move_up(self):
-        row = self._selected_row()
-        if row <= 0:
+        rows = self._selected_rows()
+        if not rows or rows[0] <= 0:
             return
-        if self.model.move_row(row, row - 1):
-            self.table.selectRow(row - 1)
+        if self.model.move_rows(rows, rows[0] - 1):
+            self._select_rows(rows[0] - 1, len(rows))
 
     def move_down(self):
-        row = self._selected_row()
-        if row < 0:
+        rows = self._selected_rows()
+        if not rows:
             return
         last = self.model.rowCount() - 1
-        if row >= last:
+        if rows[-1] >= last:
             return
-        if self.model.move_row(row, row + 1):
-            self.table.selectRow(row + 1)
+        # A gapped selection closes up around its last row
+        first = rows[-1] + 2 - len(rows)
+        if self.model.move_rows(rows, first):
+            self._select_rows(first, len(rows))
 
     def _update_move_actions(self):
         if not hasattr(self, '_move_up_act'):
             return
-        row = self._selected_row()
+        rows = self._selected_rows()
         count = self.model.rowCount()
-        if row < 0:
+        for act in (self._bulk_set_act, self._bulk_gain_act, self._bulk_led_act):
+            act.setEnabled(bool(rows))
+        self._bulk_norm_act.setEnabled(bool(rows) and self._analysis_worker is None)
+        self._bulk_filter_act.setEnabled(bool(rows) and bool(self.model.ir_summaries))
+        self._bulk_eq_act.setEnabled(len(rows) > 1 and self.table.currentIndex().row() in rows)
+        if not rows:
             self._move_up_act.setEnabled(False)
             self._move_down_act.setEnabled(False)
             return
-        self._move_up_act.setEnabled(row > 0)
-        self._move_down_act.setEnabled(row < count - 1)
+        self._move_up_act.setEnabled(rows[0] > 0)
+        self._move_down_act.setEnabled(rows[-1] < count - 1)
+
+    # ---- Bulk operations (one undo step, one table update each) ----
+    def _object_rows(self) -> list[int]:
+        cols = self.model.bank.preset_columns()
+        objects = cols.objects()
+        return [r for r in self._selected_rows() if objects[r]]
+
+    def bulk_set_field(self):
+        rows = self._object_rows()
+        if not rows:
+            return
+        cols = self.model.bank.preset_columns()
+        field, ok = QInputDialog.getItem(self, "Set Field", f"Field to set on {len(rows)} presets:",
+                                         cols.fields, 0, True)
+        if not ok or not field:
+            return
+        current = cols.get(rows[0], field)
+        text, ok = QInputDialog.getText(self, "Set Field", f"{field} (JSON value):",
+                                        text=json.dumps(current) if current is not None else "")
+        if not ok:
+            return
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            value = text  # bare text is taken as a string
+        self.model.edit_columns(rows, {field: [value] * len(rows)}, f"Set {field} on {len(rows)} presets")
+
+    def bulk_gain_offset(self):
+        import numpy as np
+        rows = self._object_rows()
+        cols = self.model.bank.preset_columns()
+        rows = [r for r in rows if cols.present('potiGain')[r]]
+        if not rows:
+            return
+        offset, ok = QInputDialog.getDouble(self, "Gain Offset", f"Add to Gain of {len(rows)} presets:",
+                                            0.0, -1.0, 1.0, 2)
+        if not ok or offset == 0.0:
+            return
+        gains = np.asarray(cols.column('potiGain')[rows], dtype=float)
+        new = np.round(np.clip(gains + offset, db.POT_MIN, db.POT_MAX), 6)
+        self.model.edit_columns(rows, {'potiGain': new.tolist()}, f"Gain offset {offset:+.2f}")
+
+    def bulk_led_color(self):
+        rows = self._object_rows()
+        if not rows:
+            return
+        color = QColorDialog.getColor(QColor(255, 170, 0), self, f"LED Color for {len(rows)} presets")
+        if not color.isValid():
+            return
+        new_val = (color.red() << 16) | (color.green() << 8) | color.blue()
+        self.model.edit_columns(rows, {'ledColor': [new_val] * len(rows)}, "Recolour LEDs")
+
+    def bulk_normalize_volume(self):
+        """Set potiVol of the selected presets from their models' loudness (analysed in the background)."""
+        cols = self.model.bank.preset_columns()
+        present = cols.present('nam')
+        refs = {r: cols.get(r, 'nam') for r in self._object_rows() if present[r]}
+        refs = {r: ref.lstrip('./') for r, ref in refs.items() if isinstance(ref, str) and ref}
+        if not refs or self._analysis_worker is not None:
+            return
+        bank = self.model.bank
+        path = bank.path
+        generation = self._edit_generation
+        worker = AnalysisWorker(lambda progress: analysis.bank_loudness(path, set(refs.values()), progress=progress))
+
+        def progress(done, total):
+            self.statusBar().showMessage(f"Analysing models {done}/{total}...")
+
+        def finished(results):
+            self._analysis_worker = None
+            self._update_move_actions()
+            if self.model.bank is not bank or generation != self._edit_generation:
+                self.statusBar().showMessage("Presets changed during the analysis; run Normalize Volume again")
+                return
+            rows = [r for r, ref in refs.items() if 'loudness_db' in results.get(ref, {})]
+            failed = sorted({ref for ref in refs.values() if 'loudness_db' not in results.get(ref, {})})
+            if rows:
+                vols = analysis.normalized_volume([results[refs[r]]['loudness_db'] for r in rows])
+                self.model.edit_columns(rows, {'potiVol': vols.tolist()}, "Normalize volume")
+            msg = f"Normalized potiVol of {len(rows)} preset(s) to {analysis.LOUDNESS_TARGET_DB:.0f} dBFS"
+            if failed:
+                msg += f"; could not analyse {', '.join(failed)}"
+            self.statusBar().showMessage(msg)
+
+        def failed(msg):
+            self._analysis_worker = None
+            self._update_move_actions()
+            QMessageBox.critical(self, "Error", f"Loudness analysis failed:\n{msg}")
+
+        worker.signals.progress.connect(progress)
+        worker.signals.finished.connect(finished)
+        worker.signals.failed.connect(failed)
+        self._analysis_worker = worker
+        self._update_move_actions()
+        QThreadPool.globalInstance().start(worker)
+
+    def bulk_filters_from_ir(self):
+        """Set hpFreq / lpFreq of the selected presets to their cab IR's rolloffs."""
+        cols = self.model.bank.preset_columns()
+        present = cols.present('ir')
+        rows, hp, lp = [], [], []
+        for r in self._object_rows():
+            ref = cols.get(r, 'ir') if present[r] else None
+            summary = self.model.ir_summaries.get(ref.lstrip('./')) if isinstance(ref, str) else None
+            if summary and 'low_rolloff_hz' in summary:
+                h, l = analysis.suggested_filters(summary)
+                rows.append(r)
+                hp.append(h)
+                lp.append(l)
+        if not rows:
+            self.statusBar().showMessage("No selected preset has an analysed cab IR")
+            return
+        self.model.edit_columns(rows, {'hpFreq': hp, 'lpFreq': lp}, "HP/LP from cab IR")
+        self.statusBar().showMessage(f"Set HP/LP of {len(rows)} preset(s) from their cab IRs")
+
+    def bulk_copy_eq(self):
+        """Copy the EQ block of the current preset to the other selected presets."""
+        src = self.table.currentIndex().row()
+        rows = [r for r in self._object_rows() if r != src]
+        if src < 0 or not rows:
+            return
+        cols = self.model.bank.preset_columns()
+        values = {f: [cols.get(src, f)] * len(rows) for f in db.EQ_FIELDS if cols.present(f)[src]}
+        if not values:
+            QMessageBox.information(self, "Copy EQ", f"Preset {src} has no EQ settings")
+            return
+        self.model.edit_columns(rows, values, f"Copy EQ from preset {src}")
 
 
 def run():
     app = QApplication(sys.argv)
     win = MainWindow()
+    if '--profile' in sys.argv[1:]:
+        win.show_profiling(record=True)
     win.resize(1000, 500)
     win.show()
     sys.exit(app.exec())
@@ -0,0 +1,95 @@
+from __future__ import annotations
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QCheckBox, QPushButton, QPlainTextEdit, QFileDialog, QMessageBox
+)
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QFontDatabase
+
+import dimehead_profile as profile
+
+
+class ProfilePanel(QWidget):
+    """Debug view of dimehead_profile: where loads, scans and saves spend their time.
+
+    Record starts a profile (spans from the worker threads included); the
+    summary refreshes every second while recording and the panel is visible,
+    and can be exported as a Chrome trace.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("ProfilePanel")
+        self._profile: profile.Profile | None = None  # the recording one, or the last one stopped
+
+        self._record = QCheckBox("Record")
+        self._record.toggled.connect(self.set_recording)
+        refresh = QPushButton("Refresh")
+        refresh.clicked.connect(self.refresh)
+        clear = QPushButton("Clear")
+        clear.clicked.connect(self.clear)
+        self._export = QPushButton("Export Chrome Trace...")
+        self._export.clicked.connect(self.export_trace)
+        buttons = QHBoxLayout()
+        for w in (self._record, refresh, clear, self._export):
+            buttons.addWidget(w)
+        buttons.addStretch(1)
+
+        self._text = QPlainTextEdit()
+        self._text.setReadOnly(True)
+        self._text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self._text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(6, 6, 6, 6)
+        layout.addLayout(buttons)
+        layout.addWidget(self._text)
+        self.setLayout(layout)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self._tick)
+        self.refresh()
+
+    # Public API -------------------------------------------------------------
+    def set_recording(self, on: bool):
+        if self._record.isChecked() != on:
+            self._record.setChecked(on)  # re-enters through toggled
+            return
+        if on:
+            self._profile = profile.start()
+            self._timer.start()
+        else:
+            if profile.active() is self._profile:
+                profile.stop()
+            self._timer.stop()
+        self.refresh()
+
+    def clear(self):
+        if self._record.isChecked():
+            self._profile = profile.start()
+        else:
+            self._profile = None
+        self.refresh()
+
+    def refresh(self):
+        if self._profile is None:
+            self._text.setPlainText("Not recording. Tick Record, then open or save a bank.")
+        else:
+            self._text.setPlainText(self._profile.summary())
+        self._export.setEnabled(self._profile is not None)
+
+    def export_trace(self):
+        if self._profile is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Chrome Trace", "dimehead-trace.json",
+                                              "Trace JSON (*.json)")
+        if not path:
+            return
+        try:
+            self._profile.write_chrome_trace(path)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to write trace:\n{e}")
+
+    def _tick(self):
+        if self.isVisible():
+            self.refresh()
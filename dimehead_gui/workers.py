@@ -0,0 +1,143 @@
+"""Background workers for the NAM Player Manager GUI.
+
+Long bank operations run on QThreadPool so the window stays responsive; the
+results come back to the GUI thread through Qt signals (queued connections).
+"""
+from __future__ import annotations
+import threading
+from typing import Callable
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+import dimehead_bank as db
+import dimehead_txn
+
+
+class SaveSignals(QObject):
+    progress = Signal(object, object)  # bytes done, bytes total
+    finished = Signal(object)          # [dimehead_txn.WriteTimings] of the files written
+    cancelled = Signal()
+    failed = Signal(str)
+
+
+class SaveWorker(QRunnable):
+    """Run save_fn(config_data, progress) on a pool thread.
+
+    config_data is the encoded config snapshot taken on the GUI thread, so
+    edits made while the save is running never leak into the file. cancel()
+    makes the next progress callback raise db.SaveCancelled; the save
+    functions remove their temp file on the way out.
+    """
+
+    def __init__(self, save_fn: Callable[[bytes, db.ProgressCallback], None], config_data: bytes):
+        super().__init__()
+        self.signals = SaveSignals()
+        self._save_fn = save_fn
+        self._config_data = config_data
+        self._cancel = False
+
+    def cancel(self):
+        self._cancel = True
+
+    def _progress(self, done: int, total: int):
+        if self._cancel:
+            raise db.SaveCancelled("Save cancelled")
+        self.signals.progress.emit(done, total)
+
+    def run(self):
+        timings = []
+        thread = threading.get_ident()
+
+        def observe(t: dimehead_txn.WriteTimings):
+            if threading.get_ident() == thread:
+                timings.append(t)
+
+        dimehead_txn.add_observer(observe)
+        try:
+            if self._cancel:
+                raise db.SaveCancelled("Save cancelled")
+            self._save_fn(self._config_data, self._progress)
+        except db.SaveCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(timings)
+        finally:
+            dimehead_txn.remove_observer(observe)
+
+
+class ScanSignals(QObject):
+    asset = Signal(object)      # db.Asset
+    progress = Signal(object, object)
+    finished = Signal(str)      # authoritative config.json text
+    failed = Signal(str)
+
+
+class AssetScanWorker(QRunnable):
+    """Stream asset metadata (size, digest, .nam header) of a bank via db.scan_bank."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.signals = ScanSignals()
+        self._path = path
+        self._cancel = False
+
+    def cancel(self):
+        self._cancel = True
+
+    def _check(self):
+        if self._cancel:
+            raise db.OperationCancelled("Scan cancelled")
+
+    def _asset(self, asset: db.Asset):
+        self._check()
+        self.signals.asset.emit(asset)
+
+    def _progress(self, done: int, total: int):
+        self._check()
+        self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            raw = db.scan_bank(self._path, self._asset, progress=self._progress)
+        except db.OperationCancelled:
+            pass
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(raw)
+
+
+class AnalysisSignals(QObject):
+    progress = Signal(object, object)  # items done, items total
+    finished = Signal(object)          # fn's result
+    failed = Signal(str)
+
+
+class AnalysisWorker(QRunnable):
+    """Run fn(progress) -> result on a pool thread (asset analysis, see dimehead_analysis)."""
+
+    def __init__(self, fn: Callable[[db.ProgressCallback], object]):
+        super().__init__()
+        self.signals = AnalysisSignals()
+        self._fn = fn
+        self._cancel = False
+
+    def cancel(self):
+        self._cancel = True
+
+    def _progress(self, done: int, total: int):
+        if self._cancel:
+            raise db.OperationCancelled("Analysis cancelled")
+        self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            result = self._fn(self._progress)
+        except db.OperationCancelled:
+            pass
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
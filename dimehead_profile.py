@@ -0,0 +1,287 @@
+"""Lightweight timing spans and byte counters for bank I/O.
+
+    with profile.span('json encode', nbytes=len(data)):
+        ...
+    profile.count('config cache hit')
+
+    @profile.timed()
+    def rewrite_archive(...):
+
+Nothing is recorded until start() is called. Until then span() returns a
+shared no-op context manager and reader() / writer() hand the file object
+back unwrapped, so the instrumentation in dimehead_bank, dimehead_txn and the
+CLI costs a global lookup per call.
+
+While a Profile is active every span adds to its per-name totals (calls,
+inclusive and self time, bytes) and, if it lasted at least min_event seconds,
+is kept as an event for the Chrome trace export (chrome://tracing or
+Perfetto; one row per thread). reader() / writer() wrap file objects so that
+each read / write call is a span counting its bytes: wrapping the gzip
+reader as 'inflate' and the raw file under it as 'disk read' splits a
+streaming save into decompression, compression and disk time.
+
+Self time is the span's time minus that of spans nested in it on the same
+thread. Spans on worker threads (parallel deflate) overlap the writing
+thread, so totals can add up to more than the wall time.
+"""
+from __future__ import annotations
+import functools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+_MIN_EVENT = 50e-6  # shorter spans only go into the totals, not the trace
+
+
+@dataclass
+class SpanStats:
+    calls: int = 0
+    total: float = 0.0      # seconds, inclusive
+    self_time: float = 0.0  # seconds, minus nested spans on the same thread
+    bytes: int = 0
+
+
+class _Span:
+    __slots__ = ('_profile', 'name', 'args', 'nbytes', 'start', 'child')
+
+    def __init__(self, profile: "Profile", name: str, nbytes: int, args: Dict[str, Any]):
+        self._profile = profile
+        self.name = name
+        self.args = args
+        self.nbytes = nbytes
+        self.child = 0.0
+
+    def add_bytes(self, n: int):
+        self.nbytes += n
+
+    def note(self, **args):
+        """Attach args known only at the end of the span (shown in the trace)."""
+        self.args.update(args)
+
+    def __enter__(self) -> "_Span":
+        self._profile._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        stack = self._profile._stack()
+        stack.pop()
+        self._profile._finish(self.name, self.start, end, self.child, self.nbytes, self.args, stack)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def add_bytes(self, n: int):
+        pass
+
+    def note(self, **args):
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+class Profile:
+    """Spans and counters recorded between start() and stop()."""
+
+    def __init__(self, min_event: float = _MIN_EVENT):
+        self.started = time.perf_counter()
+        self.stopped: Optional[float] = None
+        self.min_event = min_event
+        self.stats: Dict[str, SpanStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.events: List[Tuple[str, float, float, int, Dict[str, Any]]] = []  # name, start, dur, tid, args
+        self._threads: Dict[int, str] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._threads[threading.get_native_id()] = threading.current_thread().name
+        return stack
+
+    def _finish(self, name: str, start: float, end: float, child: float, nbytes: int,
+                args: Dict[str, Any], stack: List[_Span]):
+        dur = end - start
+        if stack:
+            stack[-1].child += dur
+        with self._lock:
+            s = self.stats.get(name)
+            if s is None:
+                s = self.stats[name] = SpanStats()
+            s.calls += 1
+            s.total += dur
+            s.self_time += dur - child
+            s.bytes += nbytes
+            if dur >= self.min_event:
+                if nbytes:
+                    args = dict(args, bytes=nbytes)
+                self.events.append((name, start, dur, threading.get_native_id(), args))
+
+    def span(self, name: str, nbytes: int = 0, **args) -> _Span:
+        return _Span(self, name, nbytes, args)
+
+    def record(self, name: str, start: float, end: float, nbytes: int = 0, **args):
+        """Add an interval timed elsewhere (perf_counter values) as a leaf span."""
+        self._finish(name, start, end, 0.0, nbytes, args, self._stack())
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @property
+    def elapsed(self) -> float:
+        return (self.stopped or time.perf_counter()) - self.started
+
+    def summary(self, limit: Optional[int] = None) -> str:
+        """Per-span totals, slowest first, then the counters."""
+        with self._lock:
+            rows = sorted(self.stats.items(), key=lambda kv: kv[1].total, reverse=True)
+            counters = sorted(self.counters.items())
+        lines = [f"profile: {self.elapsed * 1000:.1f} ms wall, {len(self.events)} trace events",
+                 f"{'span':<28}{'calls':>7}{'total ms':>11}{'self ms':>10}{'MiB':>9}{'MiB/s':>9}"]
+        for name, s in rows[:limit]:
+            mib = s.bytes / 2**20
+            rate = f"{mib / s.total:9.1f}" if s.bytes and s.total > 0 else f"{'':>9}"
+            lines.append(f"{name:<28}{s.calls:>7}{s.total * 1000:>11.1f}{s.self_time * 1000:>10.1f}"
+                         f"{(f'{mib:.2f}' if s.bytes else ''):>9}{rate}")
+        for name, n in counters:
+            lines.append(f"{name:<28}{n:>7}")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """The recorded spans in Chrome's Trace Event Format."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+            threads = dict(self._threads)
+        out: List[Dict[str, Any]] = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                                      'args': {'name': 'dimehead'}}]
+        out += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                for tid, name in threads.items()]
+        for name, start, dur, tid, args in events:
+            ev = {'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                  'ts': round((start - self.started) * 1e6, 3), 'dur': round(dur * 1e6, 3)}
+            if args:
+                ev['args'] = {k: v if isinstance(v, (int, float, bool)) or v is None else str(v)
+                              for k, v in args.items()}
+            out.append(ev)
+        if counters:
+            out.append({'name': 'counters', 'ph': 'C', 'pid': pid, 'tid': 0,
+                        'ts': round(self.elapsed * 1e6, 3), 'args': counters})
+        return {'traceEvents': out, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, separators=(',', ':'))
+
+
+class _TimedFile:
+    """File proxy timing each read / write call as a span named name."""
+
+    def __init__(self, f: BinaryIO, name: str):
+        self._f = f
+        self._name = name
+
+    def read(self, n: int = -1) -> bytes:
+        p = _active
+        if p is None:
+            return self._f.read(n)
+        with p.span(self._name) as s:
+            data = self._f.read(n)
+            s.nbytes = len(data)
+        return data
+
+    def write(self, data) -> int:
+        p = _active
+        if p is None:
+            return self._f.write(data)
+        with p.span(self._name, len(data)):
+            return self._f.write(data)
+
+    def __getattr__(self, attr):
+        return getattr(self._f, attr)
+
+
+_active: Optional[Profile] = None
+
+
+def start(min_event: float = _MIN_EVENT) -> Profile:
+    """Begin recording into a new Profile (replacing any active one)."""
+    global _active
+    _active = Profile(min_event)
+    return _active
+
+
+def stop() -> Optional[Profile]:
+    """Stop recording; returns the Profile that was active."""
+    global _active
+    p, _active = _active, None
+    if p is not None:
+        p.stopped = time.perf_counter()
+    return p
+
+
+def active() -> Optional[Profile]:
+    return _active
+
+
+def span(name: str, nbytes: int = 0, **args):
+    """Context manager timing its block as span name (no-op when not profiling)."""
+    p = _active
+    if p is None:
+        return _NULL
+    return _Span(p, name, nbytes, args)
+
+
+def record(name: str, start: float, end: float, nbytes: int = 0, **args):
+    p = _active
+    if p is not None:
+        p.record(name, start, end, nbytes, **args)
+
+
+def count(name: str, n: int = 1):
+    p = _active
+    if p is not None:
+        p.count(name, n)
+
+
+def timed(name: Optional[str] = None):
+    """Decorator running the function inside a span (default: its __name__)."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            p = _active
+            if p is None:
+                return fn(*args, **kwargs)
+            with _Span(p, label, 0, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def reader(f: BinaryIO, name: str = 'read'):
+    """f, with every read() timed as span name while profiling."""
+    return f if _active is None else _TimedFile(f, name)
+
+
+def writer(f: BinaryIO, name: str = 'write'):
+    """f, with every write() timed as span name while profiling."""
+    return f if _active is None else _TimedFile(f, name)
@@ -0,0 +1,272 @@
+"""Crash-safe file replacement for every bank write.
+
+save_bank, save_bank_as, compact_bank, update_assets, store_bank and the
+CLI's NPBBank.replace_config all write through FileTransaction:
+
+    with FileTransaction(path, backup=True) as txn:
+        rewrite_archive(src, txn.tmp_path, ...)
+
+The new content goes to a temp file next to path, which is fsynced, renamed
+over path, and the directory fsynced - after a crash path holds either the
+old or the new bank, never a torn one, and the rename itself is durable.
+in_place=True (append saves) cannot promise that by itself: the writer
+modifies path directly, so dimehead_bank journals the append: readers skip
+the torn tail of an interrupted one, and recover_append rolls it back before
+the bank is next written (or on nam_config_tool.py recover).
+
+The first-write backup (<path>.bak) is taken without pushing the bank's bytes
+through Python: a hard link when path is about to be replaced by rename (the
+old inode simply lives on as the .bak), otherwise a reflink (FICLONE) or
+os.copy_file_range, with a plain copy as the last resort. Copies are made
+under a temp name and renamed, so a half-written .bak never exists.
+
+Every transaction times its phases (WriteTimings); functions registered with
+add_observer receive them after each commit (nam_config_tool.py --timings).
+While dimehead_profile is recording, the backup, sync and commit phases are
+also spans ("txn backup", ...); clone_file reports its method and byte count.
+"""
+from __future__ import annotations
+import errno
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+import dimehead_profile as profile
+
+BACKUP_SUFFIX = ".bak"
+PHASES = ('backup', 'write', 'sync', 'commit')
+
+_FICLONE = 0x40049409  # linux/fs.h _IOW(0x94, 9, int)
+_COPY_CHUNK = 1024 * 1024
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY,
+                errno.EPERM, errno.EBADF, errno.ETXTBSY}
+
+
+@dataclass
+class WriteTimings:
+    path: str
+    phases: Dict[str, float] = field(default_factory=dict)  # seconds, in PHASES order
+    backup_method: Optional[str] = None  # 'hardlink', 'reflink', 'copy_file_range', 'copy'
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def summary(self) -> str:
+        parts = []
+        for name in PHASES:
+            if name in self.phases:
+                extra = f" ({self.backup_method})" if name == 'backup' and self.backup_method else ""
+                parts.append(f"{name} {self.phases[name] * 1000:.1f} ms{extra}")
+        return ", ".join(parts) + f"; total {self.total * 1000:.1f} ms"
+
+    def __str__(self):
+        return f"{self.path}: {self.summary()}"
+
+
+_observers: List[Callable[[WriteTimings], None]] = []
+
+
+def add_observer(fn: Callable[[WriteTimings], None]):
+    """Call fn(timings) after every committed transaction (from the writing thread)."""
+    _observers.append(fn)
+
+
+def remove_observer(fn: Callable[[WriteTimings], None]):
+    if fn in _observers:
+        _observers.remove(fn)
+
+
+def fsync_dir(path: str):
+    """Make a rename / link in directory path durable (no-op where unsupported)."""
+    flags = getattr(os, 'O_DIRECTORY', None)
+    if flags is None:
+        return  # Windows: directory handles cannot be fsynced
+    try:
+        fd = os.open(path, os.O_RDONLY | flags)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def fsync_file(path: str):
+    fd = os.open(path, os.O_RDWR)  # Windows refuses to flush a read-only handle
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _reflink(src: BinaryIO, dst: BinaryIO) -> bool:
+    try:
+        import fcntl
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def _copy_range(src: BinaryIO, dst: BinaryIO, size: int) -> bool:
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is None:
+        return False
+    done = 0
+    try:
+        while done < size:
+            n = copy_file_range(src.fileno(), dst.fileno(), size - done)
+            if n == 0:
+                break
+            done += n
+    except OSError as e:
+        if done or e.errno not in _UNSUPPORTED:
+            raise
+        return False
+    return done == size
+
+
+def clone_file(src_path: str, dest_path: str) -> str:
+    """Copy src_path to dest_path (atomically, metadata as copy2); returns the method used."""
+    dir_name = os.path.dirname(dest_path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(dest_path) + '.', suffix='.tmp', dir=dir_name)
+    try:
+        with open(src_path, 'rb') as src, os.fdopen(fd, 'wb') as dst, profile.span('clone_file') as span:
+            size = os.fstat(src.fileno()).st_size
+            span.add_bytes(size)
+            if _reflink(src, dst):
+                method = 'reflink'
+            elif _copy_range(src, dst, size):
+                method = 'copy_file_range'
+            else:
+                src.seek(0)
+                dst.seek(0)
+                dst.truncate()
+                shutil.copyfileobj(src, dst, _COPY_CHUNK)
+                method = 'copy'
+            span.note(method=method)
+            dst.flush()
+            os.fsync(dst.fileno())
+        shutil.copystat(src_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            try: os.remove(tmp_path)
+            except OSError: pass
+    fsync_dir(dir_name)
+    return method
+
+
+def backup_file(path: str, link_ok: bool = False) -> Optional[str]:
+    """Create path + BACKUP_SUFFIX unless it exists; returns the method or None.
+
+    link_ok=True allows a hard link, which is only a backup if path is about
+    to be replaced by rename rather than modified in place.
+    """
+    bak = path + BACKUP_SUFFIX
+    if os.path.exists(bak):
+        return None
+    if link_ok:
+        try:
+            os.link(path, bak)
+            fsync_dir(os.path.dirname(bak) or '.')
+            return 'hardlink'
+        except OSError:
+            pass
+    return clone_file(path, bak)
+
+
+class FileTransaction:
+    """Replace path atomically (see module docstring).
+
+    Inside the with block write the new content to tmp_path; it is committed
+    when the block exits normally and discarded otherwise. backup=True keeps
+    the previous file as <path>.bak on the first write. in_place=True is for
+    writers that modify path itself (append saves): the backup is a real copy
+    taken on entry, there is no temp file, and commit just fsyncs path. Such
+    writers must make a crash recoverable themselves (see append_config).
+    """
+
+    def __init__(self, path: str, backup: bool = False, in_place: bool = False):
+        self.path = path
+        self.backup = backup
+        self.in_place = in_place
+        self.tmp_path: Optional[str] = None
+        self.timings = WriteTimings(path)
+        self._dir = os.path.dirname(path) or '.'
+        self._t = 0.0
+        self._linked = False
+        self._discarded = False
+
+    def _phase(self, name: str):
+        now = time.perf_counter()
+        self.timings.phases[name] = self.timings.phases.get(name, 0.0) + now - self._t
+        if name in ('sync', 'commit'):  # backup is a span of its own, write the caller's work
+            profile.record(f'txn {name}', self._t, now)
+        self._t = now
+
+    def _backup(self, link_ok: bool):
+        if self.backup and os.path.exists(self.path):
+            with profile.span('txn backup') as span:
+                method = backup_file(self.path, link_ok)
+                span.note(method=method)
+            self.timings.backup_method = method
+            self._linked = method == 'hardlink'
+        self._phase('backup')
+
+    def discard(self):
+        """Commit nothing on exit (the writer found it had nothing to write)."""
+        self._discarded = True
+
+    def __enter__(self) -> "FileTransaction":
+        self._t = time.perf_counter()
+        if self.in_place:
+            self._backup(link_ok=False)
+        else:
+            fd, self.tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.', suffix='.tmp',
+                                                 dir=self._dir)
+            os.close(fd)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and not self._discarded:
+                self._phase('write')
+                self._commit()
+        finally:
+            if self.tmp_path is not None and os.path.exists(self.tmp_path):
+                try: os.remove(self.tmp_path)
+                except OSError: pass
+        return False
+
+    def _commit(self):
+        if self.in_place:
+            fsync_file(self.path)
+            self._phase('sync')
+        else:
+            # mkstemp files are 0600: keep the replaced file's mode, else the usual 0644
+            if os.path.exists(self.path):
+                shutil.copymode(self.path, self.tmp_path)
+            else:
+                os.chmod(self.tmp_path, 0o644)
+            fsync_file(self.tmp_path)
+            self._phase('sync')
+            self._backup(link_ok=True)
+            try:
+                os.replace(self.tmp_path, self.path)
+            except BaseException:
+                if self._linked:
+                    # The .bak shares the live file's inode; drop it rather than
+                    # let a later in-place write change the "backup" as well
+                    os.remove(self.path + BACKUP_SUFFIX)
+                raise
+            fsync_dir(self._dir)
+            self._phase('commit')
+        for fn in list(_observers):
+            fn(self.timings)
@@ -15,148 +15,393 @@ Commands:
   export <bank.npb> <out.json>    : Extract config.json to a separate file
   update <bank.npb> <in.json>     : Replace config.json in the archive using JSON from file
   set <bank.npb> <json-pointer> <value> : In-place modify a single value (string/number/bool)
-  get <bank.npb> <json-pointer>   : Print value at JSON pointer
+  get <bank.npb> <json-pointer>...: Print value at JSON pointer; several pointers print a
+                                    JSON object, '*' fans out over a list (/presets/*/potiGain)
+  patch <bank.npb> <ops.json|->   : Apply many edits ({pointer: value} or RFC 6902 JSON Patch)
+                                    with a single archive rewrite; failing ops are reported, not fatal
+                                    (exit status 2 if any failed)
+  batch [-j N] [-o out.jsonl] <get|set|patch|export|validate> <bank-or-glob...> <args>
+                                  : Run one command over many banks on a process pool,
+                                    one JSON Lines record per bank
+  validate [--json] [--assets] <bank.npb>
+                                  : Check presets / global settings against the FORMAT_SPEC
+                                    rules (--assets: also warn about references to assets the
+                                    bank lacks); one line per problem, exit status 2 if any
+  store add|export|stats|gc ...   : Content-addressed asset store; "add" keeps a bank as a small
+                                    .npbm manifest, "export" materializes one into a real .npb
+  loudness [--set-vol] <bank.npb> : Measure every .nam model on a fixed test signal (cached per
+                                    model hash); --set-vol sets potiVol of each preset from it
+  ir [--set-filters] <bank.npb>   : Summarize every IR (length, peak, rolloffs, centroid; cached per
+                                    hash); --set-filters sets hpFreq/lpFreq from each preset's cab IR
+  refs [--prune] <bank.npb>       : Asset references: missing files, unused (orphaned) models / IRs
+                                    and assets shared by several presets; --prune rewrites the
+                                    bank without the orphans (exit status 2 if any are missing)
+  add-asset <bank.npb> <file>...  : Add .nam / IR files to the bank (--name sets the member name)
+  replace-asset <bank.npb> <name> <file>
+                                  : Swap the data of an existing member for a file's contents
+  remove-asset <bank.npb> <name>...
+                                  : Remove members (presets still naming them are reported)
+  compact <bank.npb>              : Fold appended config overlays into one clean archive
+  serve [bank.npb...]             : Keep banks parsed in memory and answer get / set / patch /
+                                    validate / save as JSON-RPC 2.0 on a Unix socket (--socket,
+                                    default $DIMEHEAD_SOCKET); banks changed on disk are re-read
+  call <method> [key=value...]    : Thin client for serve, e.g.
+                                    call get bank=a.npb pointer=/presets/0/name
+
+Global options (before the command):
+  --stats      : Print parsed-config cache hit/miss counters to stderr
+  --no-cache   : Bypass the parsed-config cache
+  --timings    : Print per-phase timings (backup / write / sync / commit) of every bank write
+  --threads N  : Compression threads for rewritten banks (default 1, the plain
+                 single-threaded writer, or $DIMEHEAD_COMPRESS_THREADS; batch
+                 divides the count between its workers)
+  --profile    : Print where the command spent its time to stderr: spans for JSON
+                 decode/encode, inflate, tar streaming, deflate, disk I/O and the .bak
+                 backup, with byte counts (see dimehead_profile)
+  --trace FILE : Also write the spans as a Chrome trace (chrome://tracing, Perfetto);
+                 implies --profile. batch -j N > 1 workers are not profiled
 
 JSON Pointer: RFC6901 style, e.g.
   /presets/0/name
   /presets/2/potiGain
 
 For convenience, a leading '#' is ignored (so shell users can write '#/presets/0/name').
+In get, a '*' token matches every element of a list (or value of an object).
+
+Commands that rewrite the archive (update, set) accept --level 0-9 to pick the
+gzip level of the new file: 9 (default) matches the original tarfile output,
+1 is much faster on banks full of large .nam captures, 0 stores without
+compression. Members other than config.json are stream-copied, never re-parsed.
+With --append they add a small config.json overlay to the end of the bank
+instead of rewriting it; run "compact" before copying such a bank to the device.
 
 Safety:
-  - The original file is backed up to <bank.npb>.bak before destructive updates.
-  - Archive rewrite is atomic-ish: writes to temp then moves into place.
+  - The original file is backed up to <bank.npb>.bak before destructive updates
+    (a hard link / reflink where the filesystem allows, so it costs no copy).
+  - Archive rewrite is atomic: the new bank is written to a temp file, fsynced,
+    renamed into place and the directory fsynced (see dimehead_txn).
 
 Limitations / future ideas:
-  - No schema enforcement yet.
-  - Could add validation + diff output.
+  - Validation is advisory: set / patch / update do not refuse out-of-range values.
+  - Could add diff output.
 
 """
 from __future__ import annotations
 import argparse
+import copy
+import functools
+import glob
 import json
 import os
 import sys
 import tarfile
-import tempfile
-import shutil
-from typing import Any, Tuple
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Optional, Tuple
+
+import dimehead_bank as db
+import dimehead_analysis as analysis
+import dimehead_profile as profile
+import dimehead_txn
 
 CONFIG_NAME = "config.json"
 
 class NPBBank:
-    def __init__(self, path: str):
+    def __init__(self, path: str, use_cache: bool = True):
         self.path = path
+        self.use_cache = use_cache
         if not os.path.isfile(path):
             raise FileNotFoundError(path)
         if not tarfile.is_tarfile(path):
             # tarfile.is_tarfile only works on uncompressed? We'll open with mode 'r:gz'
             pass
 
+    @profile.timed('NPBBank.read_config')
     def read_config(self) -> Any:
-        with tarfile.open(self.path, "r:gz") as tf:
-            try:
-                member = tf.getmember(f"./{CONFIG_NAME}")
-            except KeyError:
-                # fallback without leading ./
-                try:
-                    member = tf.getmember(CONFIG_NAME)
-                except KeyError:
-                    raise RuntimeError(f"{CONFIG_NAME} not found in archive")
-            data = tf.extractfile(member).read().decode("utf-8")
-            return json.loads(data)
-
-    def replace_config(self, new_config: Any):
-        # Create temp tar with all original members except config.json, then add new one.
-        dir_name = os.path.dirname(self.path)
-        base_name = os.path.basename(self.path)
-        fd, tmp_path = tempfile.mkstemp(prefix=base_name+".", suffix=".tmp", dir=dir_name)
-        os.close(fd)
-        try:
-            with tarfile.open(self.path, "r:gz") as tf_in, \
-                 tarfile.open(tmp_path, "w:gz") as tf_out:
-                for member in tf_in.getmembers():
-                    name_norm = member.name.lstrip("./")
-                    if name_norm == CONFIG_NAME:
-                        continue  # skip old config
-                    extracted = tf_in.extractfile(member) if member.isfile() else None
-                    tf_out.addfile(member, extracted)
-                # Add new config
-                data = json.dumps(new_config, indent=4, sort_keys=False).encode("utf-8")
-                info = tarfile.TarInfo(name=f"./{CONFIG_NAME}")
-                info.size = len(data)
-                tf_out.addfile(info, io_bytes(data))
-            # Backup original
-            backup = self.path + ".bak"
-            if not os.path.exists(backup):
-                shutil.copy2(self.path, backup)
-            # Replace
-            os.replace(tmp_path, self.path)
-        finally:
-            if os.path.exists(tmp_path):
-                try: os.remove(tmp_path)
-                except OSError: pass
+        # Index-backed + parsed-config cache (see db.read_config)
+        return db.read_config(self.path, self.use_cache)[0]
 
+    @profile.timed('NPBBank.replace_config')
+    def replace_config(self, new_config: Any, compresslevel: int = db.DEFAULT_COMPRESSLEVEL,
+                       append: bool = False):
+        # Same transactional write paths as the GUI: .bak on the first write,
+        # fsynced temp file renamed into place (see db.save_bank / dimehead_txn)
+        bank = db.Bank(path=self.path, config=new_config)
+        db.save_bank(bank, compresslevel=compresslevel, mode="append" if append else "rewrite")
 
-def io_bytes(data: bytes):
-    import io
-    return io.BytesIO(data)
 
 # JSON Pointer utilities
+#
+# Pointers are parsed once into a JsonPointer (tokens unescaped, list indexes
+# pre-parsed) and memoized, so scripts hammering the same pointers skip the
+# split/unescape work. get_many walks the document once for a whole set of
+# pointers, sharing common prefixes, and supports '*' to fan out over a list
+# (e.g. /presets/*/potiGain returns the whole column).
 
-def json_pointer_get(doc: Any, pointer: str) -> Any:
-    if pointer in ('', '/'): return doc
+WILDCARD = '*'
+
+class JsonPointer:
+    __slots__ = ('text', 'tokens', 'indexes', 'has_wildcard')
+
+    def __init__(self, text: str, tokens: tuple):
+        self.text = text
+        self.tokens = tokens
+        # int for tokens that look like list indexes (optionally negative), else None
+        self.indexes = tuple(_token_index(t) for t in tokens)
+        self.has_wildcard = WILDCARD in tokens
+
+    def __repr__(self):
+        return f"JsonPointer({self.text!r})"
+
+def _token_index(token: str):
+    digits = token[1:] if token.startswith('-') else token
+    if digits and digits.isascii() and digits.isdigit():
+        return int(token)
+    return None
+
+@functools.lru_cache(maxsize=16384)
+def compile_pointer(pointer: str) -> JsonPointer:
+    text = pointer
     if pointer.startswith('#'):
         pointer = pointer[1:]
+    # '', '/', '#' and '#/' all name the root ('#' is the RFC 6901 URI
+    # fragment for it; before pointers were compiled it raised ValueError)
+    if pointer in ('', '/'):
+        return JsonPointer(text, ())
     if not pointer.startswith('/'):
         raise ValueError("Pointer must start with '/' (after optional '#')")
-    parts = [p.replace('~1','/').replace('~0','~') for p in pointer.split('/')[1:]]
+    return JsonPointer(text, tuple(p.replace('~1','/').replace('~0','~') for p in pointer.split('/')[1:]))
+
+def _step(cur: Any, token: str, idx):
+    """Descend one level; raises KeyError with the CLI's messages."""
+    if isinstance(cur, list):
+        if idx is None:
+            raise KeyError(f"List index expected, got '{token}'")
+        if not -len(cur) <= idx < len(cur):
+            raise KeyError(f"Index {idx} out of range")
+        return cur[idx]
+    if isinstance(cur, dict):
+        if token not in cur:
+            raise KeyError(f"Key '{token}' not found")
+        return cur[token]
+    raise KeyError(f"Cannot descend into non-container at '{token}'")
+
+def json_pointer_get(doc: Any, pointer: str) -> Any:
+    ptr = compile_pointer(pointer)
     cur = doc
-    for p in parts:
-        if isinstance(cur, list):
-            try:
-                idx = int(p)
-            except ValueError:
-                raise KeyError(f"List index expected, got '{p}'")
-            try:
-                cur = cur[idx]
-            except IndexError:
-                raise KeyError(f"Index {idx} out of range")
-        elif isinstance(cur, dict):
-            if p not in cur: raise KeyError(f"Key '{p}' not found")
-            cur = cur[p]
-        else:
-            raise KeyError(f"Cannot descend into non-container at '{p}'")
+    for token, idx in zip(ptr.tokens, ptr.indexes):
+        cur = _step(cur, token, idx)
     return cur
 
 def json_pointer_set(doc: Any, pointer: str, value: Any):
-    if pointer in ('', '/'): raise ValueError("Refusing to overwrite root with scalar")
-    if pointer.startswith('#'):
-        pointer = pointer[1:]
-    if not pointer.startswith('/'):
-        raise ValueError("Pointer must start with '/' (after optional '#')")
-    parts = [p.replace('~1','/').replace('~0','~') for p in pointer.split('/')[1:]]
-    cur = doc
-    for i, p in enumerate(parts):
-        last = i == len(parts) - 1
-        if isinstance(cur, list):
-            try: idx = int(p)
-            except ValueError: raise KeyError(f"List index expected, got '{p}'")
-            if idx < 0 or idx >= len(cur):
-                raise KeyError(f"Index {idx} out of range")
-            if last:
-                cur[idx] = value
+    ptr = compile_pointer(pointer)
+    if not ptr.tokens: raise ValueError("Refusing to overwrite root with scalar")
+    parent = doc
+    for token, idx in zip(ptr.tokens[:-1], ptr.indexes[:-1]):
+        if isinstance(parent, list) and idx is not None and idx < 0:
+            raise KeyError(f"Index {idx} out of range")
+        parent = _step(parent, token, idx)
+    token, idx = ptr.tokens[-1], ptr.indexes[-1]
+    if isinstance(parent, list):
+        if idx is None:
+            raise KeyError(f"List index expected, got '{token}'")
+        if idx < 0 or idx >= len(parent):
+            raise KeyError(f"Index {idx} out of range")
+        parent[idx] = value
+    elif isinstance(parent, dict):
+        if token not in parent:
+            raise KeyError(f"Key '{token}' not found")
+        parent[token] = value
+    else:
+        raise KeyError(f"Cannot descend into non-container at '{token}'")
+
+def _parent_of(doc: Any, pointer: str):
+    """Return (container, last token, its index) for pointer; the container must exist."""
+    ptr = compile_pointer(pointer)
+    if not ptr.tokens:
+        raise ValueError("Refusing to replace document root")
+    parent = doc
+    for token, idx in zip(ptr.tokens[:-1], ptr.indexes[:-1]):
+        parent = _step(parent, token, idx)
+    return parent, ptr.tokens[-1], ptr.indexes[-1]
+
+def json_pointer_add(doc: Any, pointer: str, value: Any):
+    """RFC 6902 "add": insert into a list ('-' appends) or set an object member."""
+    parent, key, idx = _parent_of(doc, pointer)
+    if isinstance(parent, list):
+        if key == '-':
+            parent.append(value)
+            return
+        if idx is None:
+            raise KeyError(f"List index expected, got '{key}'")
+        if idx < 0 or idx > len(parent):
+            raise KeyError(f"Index {idx} out of range")
+        parent.insert(idx, value)
+    elif isinstance(parent, dict):
+        parent[key] = value
+    else:
+        raise KeyError(f"Cannot add into non-container at '{key}'")
+
+def json_pointer_remove(doc: Any, pointer: str) -> Any:
+    """RFC 6902 "remove": delete and return the value at pointer."""
+    parent, key, idx = _parent_of(doc, pointer)
+    if isinstance(parent, list):
+        if idx is None:
+            raise KeyError(f"List index expected, got '{key}'")
+        if idx < 0 or idx >= len(parent):
+            raise KeyError(f"Index {idx} out of range")
+        return parent.pop(idx)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise KeyError(f"Key '{key}' not found")
+        return parent.pop(key)
+    raise KeyError(f"Cannot remove from non-container at '{key}'")
+
+class _Node:
+    __slots__ = ('children', 'ends')
+
+    def __init__(self):
+        self.children = {}  # token -> (index, _Node)
+        self.ends = []      # JsonPointers that end at this node
+
+    def pointers_below(self):
+        out = list(self.ends)
+        for _idx, child in self.children.values():
+            out.extend(child.pointers_below())
+        return out
+
+_MISSING = object()
+
+def json_pointer_get_many(doc: Any, pointers, default: Any = _MISSING) -> dict:
+    """Resolve many pointers in one walk of doc; returns {pointer: value}.
+
+    A pointer containing '*' fans out over every element of the list (or
+    every value of the object) at that position and yields a list of values.
+    Missing values raise KeyError unless a default is given; inside a wildcard
+    column they are filled with default (None when not given) so the column
+    stays aligned with the list it came from. A column whose prefix (the part
+    before the first '*') is missing counts as missing itself.
+    """
+    root = _Node()
+    compiled = list({p.text: p for p in map(compile_pointer, pointers)}.values())  # each pointer once
+    for ptr in compiled:
+        node = root
+        for token, idx in zip(ptr.tokens, ptr.indexes):
+            entry = node.children.get(token)
+            if entry is None:
+                entry = node.children[token] = (idx, _Node())
+            node = entry[1]
+        node.ends.append(ptr)
+    out = {p.text: [] for p in compiled if p.has_wildcard}
+    fill = None if default is _MISSING else default
+
+    def missing(node, err, fanned):
+        for ptr in node.pointers_below():
+            if ptr.has_wildcard and fanned:
+                out[ptr.text].append(fill)
+            elif default is _MISSING:
+                raise KeyError(f"{ptr.text}: {err.args[0]}")
             else:
-                cur = cur[idx]
-        elif isinstance(cur, dict):
-            if p not in cur:
-                raise KeyError(f"Key '{p}' not found")
-            if last:
-                cur[p] = value
+                out[ptr.text] = default
+
+    def walk(node, cur, fanned=False):
+        for ptr in node.ends:
+            if ptr.has_wildcard:
+                out[ptr.text].append(cur)
             else:
-                cur = cur[p]
-        else:
-            raise KeyError(f"Cannot descend into non-container at '{p}'")
+                out[ptr.text] = cur
+        for token, (idx, child) in node.children.items():
+            if token == WILDCARD and isinstance(cur, (list, dict)):
+                for item in (cur if isinstance(cur, list) else cur.values()):
+                    walk(child, item, True)
+                continue
+            try:
+                nxt = _step(cur, token, idx)
+            except KeyError as e:
+                missing(child, e, fanned)
+                continue
+            walk(child, nxt, fanned)
+
+    walk(root, doc)
+    return out
+
+
+# Batch edits: a JSON object {pointer: value, ...} (each a json_pointer_set) or
+# an RFC 6902 JSON Patch list. Every operation is applied on its own; a failing
+# one is reported and skipped, the rest still apply.
+
+def _json_equal(a: Any, b: Any) -> bool:
+    """RFC 6902 'test' equality: numbers compare by value (1 == 1.0), but a
+    boolean is not a number, and containers compare member by member."""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_json_equal(v, b[k]) for k, v in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(_json_equal, a, b))
+    return a == b
+
+def _apply_op(doc: Any, op: Any):
+    if not isinstance(op, dict) or 'op' not in op or 'path' not in op:
+        raise ValueError("Operation must be an object with 'op' and 'path'")
+    kind, path = op['op'], op['path']
+    if not isinstance(path, str):
+        raise ValueError("'path' must be a string")
+    if kind in ('add', 'replace', 'test') and 'value' not in op:
+        raise ValueError(f"'{kind}' needs a 'value'")
+    if kind == 'add':
+        json_pointer_add(doc, path, op['value'])
+    elif kind == 'replace':
+        json_pointer_set(doc, path, op['value'])
+    elif kind == 'remove':
+        json_pointer_remove(doc, path)
+    elif kind == 'test':
+        actual = json_pointer_get(doc, path)
+        if not _json_equal(actual, op['value']):
+            raise ValueError(f"test failed: found {actual!r}")
+    elif kind in ('move', 'copy'):
+        if 'from' not in op:
+            raise ValueError(f"'{kind}' needs a 'from'")
+        src = op['from']
+        if not isinstance(src, str):
+            raise ValueError("'from' must be a string")
+        if kind == 'move' and path.startswith(src.rstrip('/') + '/'):
+            raise ValueError("Cannot move a value into one of its children")
+        if kind == 'copy':
+            json_pointer_add(doc, path, copy.deepcopy(json_pointer_get(doc, src)))
+            return
+        value = json_pointer_remove(doc, src)
+        try:
+            json_pointer_add(doc, path, value)
+        except (KeyError, ValueError):
+            json_pointer_add(doc, src, value)  # put it back; keep the op atomic
+            raise
+    else:
+        raise ValueError(f"Unknown op '{kind}'")
+
+def normalize_ops(spec: Any) -> list:
+    """Turn a {pointer: value} mapping into 'replace' ops; pass JSON Patch lists through."""
+    if isinstance(spec, dict):
+        return [{'op': 'replace', 'path': k, 'value': v} for k, v in spec.items()]
+    if isinstance(spec, list):
+        return spec
+    raise ValueError("Patch must be a JSON object {pointer: value} or an RFC 6902 list")
+
+def apply_patch(doc: Any, ops: list):
+    """Apply ops to doc in place; return [(index, op, error or None), ...]."""
+    results = []
+    for i, op in enumerate(ops):
+        try:
+            _apply_op(doc, op)
+            results.append((i, op, None))
+        except (KeyError, ValueError, TypeError) as e:
+            results.append((i, op, e.args[0] if isinstance(e, KeyError) and e.args else str(e)))
+    return results
 
 
 def coerce_value(raw: str) -> Any:
@@ -182,14 +427,14 @@ def coerce_value(raw: str) -> Any:
 
 
 def cmd_show(args):
-    bank = NPBBank(args.bank)
+    bank = NPBBank(args.bank, not args.no_cache)
     cfg = bank.read_config()
     json.dump(cfg, sys.stdout, indent=4)
     print()
 
 
 def cmd_export(args):
-    bank = NPBBank(args.bank)
+    bank = NPBBank(args.bank, not args.no_cache)
     cfg = bank.read_config()
     with open(args.output, 'w', encoding='utf-8') as f:
         json.dump(cfg, f, indent=4)
@@ -197,17 +442,24 @@ def cmd_export(args):
 
 
 def cmd_update(args):
-    bank = NPBBank(args.bank)
+    bank = NPBBank(args.bank, not args.no_cache)
     with open(args.input, 'r', encoding='utf-8') as f:
         new_cfg = json.load(f)
-    bank.replace_config(new_cfg)
+    bank.replace_config(new_cfg, args.level, args.append)
     print("Updated config.json inside bank (backup created if not already present).")
 
 
 def cmd_get(args):
-    bank = NPBBank(args.bank)
+    bank = NPBBank(args.bank, not args.no_cache)
     cfg = bank.read_config()
-    val = json_pointer_get(cfg, args.pointer)
+    if len(args.pointer) > 1:
+        json.dump(json_pointer_get_many(cfg, args.pointer), sys.stdout, indent=2)
+        print()
+        return
+    if compile_pointer(args.pointer[0]).has_wildcard:
+        val = json_pointer_get_many(cfg, args.pointer)[args.pointer[0]]
+    else:
+        val = json_pointer_get(cfg, args.pointer[0])
     if isinstance(val, (dict, list)):
         json.dump(val, sys.stdout, indent=2)
         print()
@@ -216,18 +468,774 @@ def cmd_get(args):
 
 
 def cmd_set(args):
-    bank = NPBBank(args.bank)
+    bank = NPBBank(args.bank, not args.no_cache)
     cfg = bank.read_config()
     value = coerce_value(args.value)
     json_pointer_set(cfg, args.pointer, value)
-    bank.replace_config(cfg)
+    bank.replace_config(cfg, args.level, args.append)
     print(f"Set {args.pointer} = {value!r}")
 
 
+def cmd_patch(args):
+    bank = NPBBank(args.bank, not args.no_cache)
+    if args.ops == '-':
+        spec = json.load(sys.stdin)
+    else:
+        with open(args.ops, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+    ops = normalize_ops(spec)
+    cfg = bank.read_config()
+    results = apply_patch(cfg, ops)
+    failed = 0
+    for i, op, err in results:
+        desc = f"{op.get('op', '?')} {op.get('path', '?')}" if isinstance(op, dict) else repr(op)
+        if err is None:
+            print(f"ok    #{i} {desc}")
+        else:
+            failed += 1
+            print(f"FAIL  #{i} {desc}: {err}")
+    applied = len(results) - failed
+    if applied and not args.dry_run and not (args.atomic and failed):
+        bank.replace_config(cfg, args.level, args.append)  # one rewrite for the whole batch
+        print(f"Applied {applied}/{len(results)} operations")
+    else:
+        print(f"Applied 0/{len(results)} operations (bank unchanged)")
+    return 2 if failed else 0
+
+
+# Batch mode: one operation over many banks on a process pool. Each bank is
+# handled independently by _batch_one (top-level so it pickles) and yields one
+# JSON Lines record; writes go through replace_config, i.e. temp file + rename
+# per bank, so a crash never leaves a half-written bank behind.
+
+def _export_path(path: str, params: dict) -> str:
+    """out_dir/<bank path relative to the banks' common directory>.json"""
+    rel = os.path.relpath(os.path.abspath(path), params['root'])
+    return os.path.join(params['out_dir'], os.path.splitext(rel)[0] + '.json')
+
+def _batch_one(op: str, path: str, params: dict) -> dict:
+    t0 = time.perf_counter()
+    rec = {'bank': path, 'op': op, 'ok': True}
+    db.compress_threads = params['threads']  # passed explicitly: spawned workers do not inherit --threads
+    try:
+        bank = NPBBank(path, params['use_cache'])
+        if op == 'get':
+            cfg = bank.read_config()
+            if compile_pointer(params['pointer']).has_wildcard:
+                rec['value'] = json_pointer_get_many(cfg, [params['pointer']])[params['pointer']]
+            else:
+                rec['value'] = json_pointer_get(cfg, params['pointer'])
+        elif op == 'set':
+            cfg = bank.read_config()
+            value = coerce_value(params['value'])
+            json_pointer_set(cfg, params['pointer'], value)
+            bank.replace_config(cfg, params['level'], params['append'])
+            rec['value'] = value
+        elif op == 'patch':
+            cfg = bank.read_config()
+            results = apply_patch(cfg, copy.deepcopy(params['ops']))
+            failed = [{'index': i, 'error': err} for i, _op, err in results if err is not None]
+            applied = len(results) - len(failed)
+            if applied and not (params['atomic'] and failed):
+                bank.replace_config(cfg, params['level'], params['append'])
+            else:
+                applied = 0
+            rec.update(applied=applied, failed=failed, ok=not failed)
+        elif op == 'validate':
+            diags = db.validate(bank.read_config())
+            rec.update(ok=not diags, problems=[{'pointer': d.pointer, 'message': d.message,
+                                                'value': d.value} for d in diags])
+        elif op == 'export':
+            cfg = bank.read_config()
+            out = _export_path(path, params)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with open(out, 'w', encoding='utf-8') as f:
+                json.dump(cfg, f, indent=4)
+            rec['output'] = out
+        else:
+            raise ValueError(f"Unknown batch op '{op}'")
+    except Exception as e:
+        rec.update(ok=False, error=e.args[0] if isinstance(e, KeyError) and e.args else str(e))
+    rec['ms'] = round((time.perf_counter() - t0) * 1000, 3)
+    return rec
+
+
+def cmd_batch(args):
+    found, missing = set(), []
+    for pattern in args.banks:
+        matches = [p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p)]
+        if not matches and glob.escape(pattern) == pattern:
+            missing.append(pattern)  # a plain path, not a pattern: report it rather than skip it
+        found.update(matches)
+    banks = sorted(found)
+    if not banks and not missing:
+        raise FileNotFoundError(f"No banks match {' '.join(args.banks)}")
+    workers = 1 if args.jobs == 1 else max(1, min(args.jobs, len(banks)))
+    # Split the compression threads between the workers rather than giving
+    # each of them the whole machine (--threads still sets the per-bank count)
+    threads = args.threads if args.threads is not None else db.compress_threads // workers
+    params = {'use_cache': not args.no_cache, 'level': getattr(args, 'level', db.DEFAULT_COMPRESSLEVEL),
+              'append': getattr(args, 'append', False), 'threads': max(1, threads)}
+    if args.op in ('get', 'set'):
+        params['pointer'] = args.pointer
+    if args.op == 'set':
+        params['value'] = args.value
+    if args.op == 'patch':
+        with open(args.ops, 'r', encoding='utf-8') as f:
+            params['ops'] = normalize_ops(json.load(f))
+        params['atomic'] = args.atomic
+    if args.op == 'export' and banks:
+        params['out_dir'] = args.out_dir
+        params['root'] = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in banks])
+        seen = {}
+        for path in banks:
+            out = _export_path(path, params)
+            if out in seen:
+                raise ValueError(f"{seen[out]} and {path} would both be exported to {out}")
+            seen[out] = path
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    failed = 0
+    try:
+        def emit(rec):
+            nonlocal failed
+            failed += not rec['ok']
+            out.write(json.dumps(rec) + '\n')
+            out.flush()
+        for path in missing:
+            emit({'bank': path, 'op': args.op, 'ok': False, 'error': 'no such bank'})
+        if workers == 1:
+            for path in banks:
+                emit(_batch_one(args.op, path, params))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_batch_one, args.op, path, params) for path in banks]
+                for fut in as_completed(futures):
+                    emit(fut.result())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    total = len(banks) + len(missing)
+    print(f"{total - failed}/{total} banks OK", file=sys.stderr)
+    return 2 if failed else 0
+
+
+# Resident server: "serve" keeps banks parsed in memory and answers JSON-RPC
+# 2.0 requests on a Unix domain socket - one JSON object per line in each
+# direction, on a connection that stays open (a JSON array is a batch). Each
+# request stats the bank file first and a watcher thread polls every loaded
+# bank, so a bank another program changed is re-read; if it has unsaved edits
+# it is flagged stale instead, and save refuses to overwrite it without
+# force. Edits stay in memory until a save. "call" is the thin client;
+# scripts that want sub-millisecond round trips keep a BankClient open.
+
+RPC_PARSE_ERROR, RPC_INVALID_REQUEST, RPC_METHOD_NOT_FOUND, RPC_INVALID_PARAMS = -32700, -32600, -32601, -32602
+RPC_BANK_ERROR = -32000  # bank, pointer and I/O failures
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def default_socket_path() -> str:
+    """$DIMEHEAD_SOCKET, else dimehead.sock in the per-user runtime directory."""
+    path = os.environ.get('DIMEHEAD_SOCKET')
+    if path:
+        return path
+    import platformdirs
+    return os.path.join(platformdirs.user_runtime_dir('dimehead-configurator', appauthor=False), 'dimehead.sock')
+
+
+def _file_signature(path: str) -> Tuple[int, int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class _LoadedBank:
+    __slots__ = ('bank', 'signature', 'dirty', 'stale', 'lock')
+
+    def __init__(self, bank: db.Bank, signature):
+        self.bank = bank
+        self.signature = signature
+        self.dirty = False  # edited in memory since the last load / save
+        self.stale = False  # changed on disk while dirty
+        self.lock = threading.Lock()
+
+    def summary(self) -> dict:
+        return {'bank': self.bank.path, 'presets': len(self.bank.config.get('presets') or []),
+                'assets': len(self.bank.assets), 'dirty': self.dirty, 'stale': self.stale}
+
+
+class BankServer:
+    """The state and request handling behind "serve" (see serve_forever)."""
+
+    def __init__(self, socket_path: str, poll: float = 1.0, use_cache: bool = True, log=None):
+        self.socket_path = socket_path
+        self.poll = poll
+        self.use_cache = use_cache
+        self.log = log or (lambda msg: print(msg, file=sys.stderr, flush=True))
+        self._banks: dict = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server = None
+        self._methods = {'ping': self.rpc_ping, 'banks': self.rpc_banks, 'open': self.rpc_open,
+                         'reload': self.rpc_reload, 'close': self.rpc_close, 'get': self.rpc_get,
+                         'set': self.rpc_set, 'patch': self.rpc_patch, 'validate': self.rpc_validate,
+                         'save': self.rpc_save, 'shutdown': self.rpc_shutdown}
+
+    # Bank registry ----------------------------------------------------------
+    def _load(self, path: str) -> _LoadedBank:
+        signature = _file_signature(path)  # before reading: a write during the load shows up next time
+        return _LoadedBank(db.load_bank(path, self.use_cache), signature)
+
+    def _refresh(self, path: str, entry: _LoadedBank) -> _LoadedBank:
+        """entry, or a fresh load if the file changed on disk (call with entry.lock held)."""
+        try:
+            signature = _file_signature(path)
+        except OSError:
+            return entry  # deleted / being replaced: keep serving what we have
+        if signature == entry.signature:
+            return entry
+        if entry.dirty:
+            if not entry.stale:
+                entry.stale = True
+                self.log(f"{path} changed on disk; keeping unsaved edits (stale)")
+            return entry
+        fresh = self._load(path)
+        with self._lock:
+            self._banks[path] = fresh
+        self.log(f"reloaded {path} (changed on disk)")
+        return fresh
+
+    def _bank_param(self, params: dict) -> str:
+        path = params.get('bank')
+        if not isinstance(path, str):
+            raise RPCError(RPC_INVALID_PARAMS, "'bank' (a path) is required")
+        return os.path.abspath(path)
+
+    def _with_bank(self, params: dict, fn):
+        """Run fn(path, entry) under the bank's lock, loading or refreshing it first."""
+        path = self._bank_param(params)
+        with self._lock:
+            entry = self._banks.get(path)
+        if entry is None:
+            if not os.path.isfile(path):
+                raise RPCError(RPC_BANK_ERROR, f"File not found: {path}")
+            entry = self._load(path)
+            with self._lock:
+                entry = self._banks.setdefault(path, entry)
+        with entry.lock:
+            entry = self._refresh(path, entry)  # may hand back a freshly loaded entry
+        with entry.lock:
+            return fn(path, entry)
+
+    def watch(self):
+        """Poll loaded banks for external changes until the server stops."""
+        while not self._stop.wait(self.poll):
+            with self._lock:
+                items = list(self._banks.items())
+            for path, entry in items:
+                with entry.lock:
+                    try:
+                        self._refresh(path, entry)
+                    except Exception as e:
+                        self.log(f"reloading {path} failed: {e}")
+
+    # Methods ----------------------------------------------------------------
+    def rpc_ping(self, params):
+        return 'pong'
+
+    def rpc_banks(self, params):
+        with self._lock:
+            entries = list(self._banks.values())
+        return [e.summary() for e in entries]
+
+    def rpc_open(self, params):
+        return self._with_bank(params, lambda path, e: e.summary())
+
+    def rpc_reload(self, params):
+        """Re-read the bank from disk, dropping unsaved edits."""
+        path = self._bank_param(params)
+        entry = self._load(path)
+        with self._lock:
+            self._banks[path] = entry
+        return entry.summary()
+
+    def rpc_close(self, params):
+        def close(path, entry):
+            if entry.dirty and not params.get('force'):
+                raise RPCError(RPC_BANK_ERROR, f"{path} has unsaved edits (save it, or close with force)")
+            with self._lock:
+                self._banks.pop(path, None)
+            return {'closed': path}
+        return self._with_bank(params, close)
+
+    def rpc_get(self, params):
+        pointers = params.get('pointers')
+        pointer = params.get('pointer')
+        if pointers is None and not isinstance(pointer, str):
+            raise RPCError(RPC_INVALID_PARAMS, "'pointer' or 'pointers' is required")
+
+        def get(path, entry):
+            cfg = entry.bank.config
+            if pointers is not None:
+                return json_pointer_get_many(cfg, pointers)
+            if compile_pointer(pointer).has_wildcard:
+                return json_pointer_get_many(cfg, [pointer])[pointer]
+            return json_pointer_get(cfg, pointer)
+        return self._with_bank(params, get)
+
+    def rpc_set(self, params):
+        if not isinstance(params.get('pointer'), str) or 'value' not in params:
+            raise RPCError(RPC_INVALID_PARAMS, "'pointer' and 'value' are required")
+
+        def set_(path, entry):
+            json_pointer_set(entry.bank.config, params['pointer'], params['value'])
+            entry.bank.invalidate_columns()
+            entry.dirty = True
+            return {'dirty': True}
+        return self._with_bank(params, set_)
+
+    def rpc_patch(self, params):
+        try:
+            ops = normalize_ops(params.get('ops'))
+        except ValueError as e:
+            raise RPCError(RPC_INVALID_PARAMS, str(e))
+
+        def patch(path, entry):
+            # atomic: apply to a copy and keep it only if every op succeeded
+            cfg = copy.deepcopy(entry.bank.config) if params.get('atomic') else entry.bank.config
+            results = apply_patch(cfg, ops)
+            failed = [{'index': i, 'error': err} for i, _op, err in results if err is not None]
+            applied = len(results) - len(failed)
+            if params.get('atomic'):
+                if failed:
+                    applied = 0
+                else:
+                    entry.bank.config = cfg
+            if applied:
+                entry.bank.invalidate_columns()
+                entry.dirty = True
+            return {'applied': applied, 'failed': failed, 'dirty': entry.dirty}
+        return self._with_bank(params, patch)
+
+    def rpc_validate(self, params):
+        def validate(path, entry):
+            return [{'pointer': d.pointer, 'message': d.message, 'value': d.value, 'severity': d.severity}
+                    for d in db.validate(entry.bank)]
+        return self._with_bank(params, validate)
+
+    def rpc_save(self, params):
+        mode = params.get('mode', 'rewrite')
+        level = params.get('level', db.DEFAULT_COMPRESSLEVEL)
+        if mode not in ('rewrite', 'append') or not isinstance(level, int) or isinstance(level, bool) \
+                or not 0 <= level <= 9:
+            raise RPCError(RPC_INVALID_PARAMS, "mode must be 'rewrite' or 'append', level 0-9")
+
+        def save(path, entry):
+            if entry.stale and not params.get('force'):
+                raise RPCError(RPC_BANK_ERROR, f"{path} changed on disk since it was loaded "
+                                               "(reload it, or save with force to overwrite)")
+            t0 = time.perf_counter()
+            db.save_bank(entry.bank, backup=params.get('backup', True), compresslevel=level, mode=mode)
+            entry.signature = _file_signature(path)
+            entry.dirty = entry.stale = False
+            return {'saved': path, 'mode': mode, 'ms': round((time.perf_counter() - t0) * 1000, 3)}
+        return self._with_bank(params, save)
+
+    def rpc_shutdown(self, params):
+        if self._server is not None:
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+        return 'bye'
+
+    # Protocol ---------------------------------------------------------------
+    def handle(self, request: Any):
+        """One JSON-RPC request object -> response dict (None for a notification)."""
+        if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' \
+                or not isinstance(request.get('method'), str):
+            return _rpc_error(None, RPC_INVALID_REQUEST, "Invalid Request")
+        req_id = request.get('id')
+        method = self._methods.get(request['method'])
+        params = request.get('params', {})
+        try:
+            if method is None:
+                raise RPCError(RPC_METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+            if not isinstance(params, dict):
+                raise RPCError(RPC_INVALID_PARAMS, "params must be an object")
+            with profile.span(f"rpc {request['method']}"):
+                result = method(params)
+        except RPCError as e:
+            return _rpc_error(req_id, e.code, str(e)) if 'id' in request else None
+        except KeyError as e:
+            msg = e.args[0] if e.args else str(e)
+            return _rpc_error(req_id, RPC_BANK_ERROR, str(msg)) if 'id' in request else None
+        except Exception as e:
+            return _rpc_error(req_id, RPC_BANK_ERROR, str(e)) if 'id' in request else None
+        if 'id' not in request:
+            return None
+        return {'jsonrpc': '2.0', 'id': req_id, 'result': result}
+
+    def handle_line(self, line: bytes) -> Optional[bytes]:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return json.dumps(_rpc_error(None, RPC_PARSE_ERROR, f"Parse error: {e}")).encode()
+        if isinstance(request, list):
+            if not request:
+                return json.dumps(_rpc_error(None, RPC_INVALID_REQUEST, "Invalid Request")).encode()
+            replies = [r for r in map(self.handle, request) if r is not None]
+            return json.dumps(replies).encode() if replies else None
+        reply = self.handle(request)
+        return None if reply is None else json.dumps(reply).encode()
+
+    def serve_forever(self, preload=()):
+        import signal
+        import socket
+        import socketserver
+        if not hasattr(socket, 'AF_UNIX'):
+            raise db.BankError("serve needs Unix domain sockets, which this platform lacks")
+        path = self.socket_path
+        os.makedirs(os.path.dirname(path) or '.', mode=0o700, exist_ok=True)
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                raise db.BankError(f"A server is already listening on {path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(path)  # left behind by a server that died
+            finally:
+                probe.close()
+        bank_server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if line.strip():
+                        reply = bank_server.handle_line(line)
+                        if reply is not None:
+                            self.wfile.write(reply + b'\n')
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        for bank in preload:
+            self.rpc_open({'bank': bank})
+        old_umask = os.umask(0o177)  # socket file 0600: only this user may connect
+        try:
+            self._server = Server(path, Handler)
+        finally:
+            os.umask(old_umask)
+        watcher = threading.Thread(target=self.watch, name='bank-watcher', daemon=True)
+        watcher.start()
+        # Signal handlers can only be set from the main thread (not when embedded)
+        on_main = threading.current_thread() is threading.main_thread()
+        if on_main:
+            previous = signal.signal(signal.SIGTERM,
+                                     lambda *_: threading.Thread(target=self._server.shutdown).start())
+        self.log(f"serving on {path} (watching loaded banks every {self.poll:g} s)")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if on_main:
+                signal.signal(signal.SIGTERM, previous)
+            self._stop.set()
+            self._server.server_close()
+            if os.path.exists(path):
+                os.remove(path)
+            with self._lock:  # handler threads may still be finishing a request
+                dirty = [p for p, e in self._banks.items() if e.dirty]
+            if dirty:
+                self.log(f"discarded unsaved edits in {len(dirty)} bank(s): {', '.join(dirty)}")
+        return 0
+
+
+def _rpc_error(req_id, code: int, message: str) -> dict:
+    return {'jsonrpc': '2.0', 'id': req_id, 'error': {'code': code, 'message': message}}
+
+
+class BankClient:
+    """Connection to a "serve" process: client.call('get', bank='a.npb', pointer='/presets/0/name').
+
+    Relative bank paths are made absolute here, against the caller's working
+    directory. A failed call raises RPCError.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = None):
+        import socket
+        self.socket_path = socket_path or default_socket_path()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(self.socket_path)
+        except OSError as e:
+            self._sock.close()
+            raise ConnectionError(f"No server on {self.socket_path} ({e.strerror or e}); "
+                                  f"start one with: nam_config_tool.py serve") from None
+        self._reader = self._sock.makefile('rb')
+        self._id = 0
+
+    def call(self, method: str, **params) -> Any:
+        if isinstance(params.get('bank'), str):
+            params['bank'] = os.path.abspath(params['bank'])
+        self._id += 1
+        self._sock.sendall(json.dumps({'jsonrpc': '2.0', 'id': self._id, 'method': method,
+                                       'params': params}).encode() + b'\n')
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise RPCError(reply['error']['code'], reply['error']['message'])
+        return reply['result']
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+    def __enter__(self) -> "BankClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def cmd_serve(args):
+    server = BankServer(args.socket or default_socket_path(), args.poll, not args.no_cache)
+    return server.serve_forever(args.preload)
+
+
+def _call_params(items) -> dict:
+    """'key=value' arguments (value parsed as JSON when it is JSON) or one JSON object."""
+    if len(items) == 1 and items[0].lstrip().startswith('{'):
+        return json.loads(items[0])
+    params = {}
+    for item in items:
+        key, sep, raw = item.partition('=')
+        if not sep:
+            raise ValueError(f"Expected key=value, got '{item}'")
+        try:
+            params[key] = json.loads(raw)
+        except ValueError:
+            params[key] = raw
+    return params
+
+
+def cmd_call(args):
+    with BankClient(args.socket) as client:
+        result = client.call(args.method, **_call_params(args.params))
+    if isinstance(result, (dict, list)):
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print(result)
+    if args.method == 'validate' and result:
+        return 2
+    if args.method == 'patch' and result.get('failed'):
+        return 2
+    return 0
+
+
+def cmd_validate(args):
+    config, _raw, archive = db.read_config(args.bank, not args.no_cache)
+    diags = db.validate(config, archive.assets() if args.assets else None)
+    if args.json:
+        print(json.dumps([{'pointer': d.pointer, 'message': d.message, 'value': d.value,
+                           'severity': d.severity} for d in diags], indent=2))
+    else:
+        for d in diags:
+            print(f"{d}: {d.value!r}")
+        print(f"{len(diags)} problem(s) in {args.bank}", file=sys.stderr)
+    return 2 if diags else 0
+
+
+def cmd_store(args):
+    store = db.AssetStore(args.store_dir)
+    if args.store_op == 'add':
+        if args.output and len(args.banks) > 1:
+            raise ValueError("-o/--output needs exactly one bank")
+        for path in args.banks:
+            dest = args.output or os.path.splitext(path)[0] + db.MANIFEST_SUFFIX
+            st = db.store_bank(path, dest, store=store, compresslevel=args.level)
+            print(f"{path} -> {dest}: {st['members']} members, {st['objects_added']} new object(s), "
+                  f"{st['bytes_added']} bytes added")
+    elif args.store_op == 'export':
+        bank = db.load_bank(args.manifest, not args.no_cache)
+        db.save_bank_as(bank, args.output, compresslevel=args.level)
+        print(f"Exported {args.manifest} -> {args.output}")
+    elif args.store_op == 'stats':
+        st = store.stats()
+        print(f"{store.root}: {st['objects']} object(s), {st['bytes'] / 2**20:.1f} MiB, "
+              f"{st['manifests']} registered manifest(s)")
+    elif args.store_op == 'gc':
+        manifests = set()
+        for pattern in args.manifests:
+            matches = [p for p in glob.glob(pattern, recursive=True) if db.is_manifest(p) and os.path.isfile(p)]
+            if not matches:
+                raise FileNotFoundError(f"No manifests match {pattern}")
+            manifests.update(matches)
+        st = store.gc(sorted(manifests), dry_run=args.dry_run)
+        print(f"{'Would remove' if args.dry_run else 'Removed'} {st['objects']} unreferenced object(s), "
+              f"{st['bytes'] / 2**20:.1f} MiB (kept everything used by {st['manifests']} manifest(s))")
+
+
+def cmd_loudness(args):
+    bank = NPBBank(args.bank, not args.no_cache)
+    results = analysis.bank_loudness(args.bank, use_cache=not args.no_cache)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, r in sorted(results.items()):
+            if 'error' in r:
+                print(f"{name}: error: {r['error']}")
+            else:
+                print(f"{name}: {r['loudness_db']:.1f} dBFS RMS, peak {r['peak_db']:.1f} dBFS ({r['architecture']})")
+    if args.set_vol:
+        cfg = bank.read_config()
+        rows = analysis.normalize_volume(cfg, results, args.target, args.reference)
+        if rows:
+            bank.replace_config(cfg, args.level, args.append)
+        print(f"Set potiVol on {len(rows)} preset(s) for {args.target:.1f} dBFS", file=sys.stderr)
+    return 2 if any('error' in r for r in results.values()) else 0
+
+
+def cmd_ir(args):
+    bank = NPBBank(args.bank, not args.no_cache)
+    results = analysis.bank_ir_summaries(args.bank, use_cache=not args.no_cache)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, r in sorted(results.items()):
+            if 'error' in r:
+                print(f"{name}: error: {r['error']}")
+            else:
+                print(f"{name}: {r['samples']} samples @ {r['sample_rate']} Hz ({r['length_ms']:.1f} ms, "
+                      f"99% energy in {r['effective_ms']:.1f} ms), peak {r['peak_db']:.1f} dBFS, "
+                      f"{r['low_rolloff_hz']:.0f}-{r['high_rolloff_hz']:.0f} Hz, centroid {r['centroid_hz']:.0f} Hz")
+    if args.set_filters:
+        cfg = bank.read_config()
+        rows = analysis.set_filters_from_ir(cfg, results)
+        if rows:
+            bank.replace_config(cfg, args.level, args.append)
+        print(f"Set hpFreq/lpFreq on {len(rows)} preset(s)", file=sys.stderr)
+    return 2 if any('error' in r for r in results.values()) else 0
+
+
+def cmd_refs(args):
+    bank = db.load_bank(args.bank, not args.no_cache)
+    refs = bank.asset_refs()
+    names = bank.config.get('presets') or []
+
+    def label(row):
+        p = names[row]
+        return f"{row} {p.get('name', '')!r}" if isinstance(p, dict) else str(row)
+
+    missing, orphans, shared = refs.missing(), refs.orphans(), refs.shared()
+    if args.json:
+        print(json.dumps({'missing': {k: [{'preset': r, 'field': f} for r, f in u] for k, u in missing.items()},
+                          'orphans': [{'name': a.name, 'size': a.size} for a in orphans],
+                          'shared': shared}, indent=2))
+    else:
+        for name, users in missing.items():
+            print(f"missing {name}: " + ", ".join(f"{label(r)}.{f}" for r, f in users))
+        for a in orphans:
+            print(f"orphan {a.name} ({a.size} bytes)")
+        for name, rows in shared.items():
+            print(f"shared {name}: {len(rows)} presets ({', '.join(map(str, rows))})")
+        print(f"{len(refs.referenced())} referenced asset(s): {len(missing)} missing, "
+              f"{len(shared)} shared; {len(orphans)} orphan(s)", file=sys.stderr)
+    if args.prune and orphans:
+        pruned = db.save_bank(bank, compresslevel=args.level, prune_orphans=True)
+        print(f"Pruned {len(pruned)} orphan(s), {sum(a.size for a in orphans) / 2**20:.1f} MiB",
+              file=sys.stderr)
+    return 2 if missing else 0
+
+
+def _report_edit(path: str, stats: dict):
+    done = ", ".join(f"{stats[k]} {k}" for k in ('added', 'replaced', 'removed') if stats[k])
+    print(f"{path}: {done}; {stats['copied_bytes'] / 2**20:.1f} MiB copied as-is, "
+          f"{stats['streamed_bytes'] / 2**20:.1f} MiB re-streamed")
+
+
+def cmd_add_asset(args):
+    if args.name and len(args.files) > 1:
+        raise ValueError("--name needs exactly one file")
+    add = {args.name or os.path.basename(f): f for f in args.files}
+    _report_edit(args.bank, db.update_assets(args.bank, add=add, compresslevel=args.level))
+
+
+def cmd_replace_asset(args):
+    _report_edit(args.bank, db.update_assets(args.bank, replace={args.name: args.file},
+                                             compresslevel=args.level))
+
+
+def cmd_remove_asset(args):
+    cfg = NPBBank(args.bank, not args.no_cache).read_config()
+    refs = db.AssetRefs.build(db.PresetColumns.from_presets(cfg.get('presets') or []))
+    _report_edit(args.bank, db.update_assets(args.bank, remove=args.names, compresslevel=args.level))
+    for name in args.names:
+        users = refs.users(name)
+        if users:
+            print(f"warning: {name} is still used by " + ", ".join(f"preset {r} ({f})" for r, f in users),
+                  file=sys.stderr)
+
+
+def cmd_compact(args):
+    if not os.path.isfile(args.bank):
+        raise FileNotFoundError(args.bank)
+    before = os.path.getsize(args.bank)
+    db.compact_bank(args.bank, compresslevel=args.level)
+    after = os.path.getsize(args.bank)
+    print(f"Compacted {args.bank} ({before} -> {after} bytes)")
+
+
+def cmd_recover(args):
+    if not os.path.isfile(args.bank):
+        raise FileNotFoundError(args.bank)
+    if db.recover_append(args.bank):
+        print(f"Rolled back an interrupted append save of {args.bank}")
+    else:
+        print(f"No interrupted append save of {args.bank}")
+
+
+def _positive_int(text: str) -> int:
+    n = int(text)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+
 def build_parser():
     p = argparse.ArgumentParser(description="NAM .npb config tool")
+    p.add_argument('--stats', action='store_true',
+                   help='print parsed-config cache hit/miss counters to stderr on exit')
+    p.add_argument('--no-cache', action='store_true', help='bypass the parsed-config cache')
+    p.add_argument('--timings', action='store_true',
+                   help='print per-phase timings of every bank write to stderr')
+    p.add_argument('--threads', type=int, metavar='N',
+                   help=f'compression threads for rewritten banks (default {db.compress_threads}, '
+                        'divided between batch workers; 1 = single-threaded)')
+    p.add_argument('--profile', action='store_true',
+                   help='print timing spans and byte counters of the command to stderr')
+    p.add_argument('--trace', metavar='FILE', help='write a Chrome trace JSON of the command (implies --profile)')
     sub = p.add_subparsers(dest='cmd', required=True)
 
+    # Shared by every command that rewrites the archive
+    write_opts = argparse.ArgumentParser(add_help=False)
+    write_opts.add_argument('--level', type=int, choices=range(10), default=db.DEFAULT_COMPRESSLEVEL,
+                            metavar='0-9',
+                            help=f'gzip level for the rewritten bank (default {db.DEFAULT_COMPRESSLEVEL}; '
+                                 f'{db.FAST_COMPRESSLEVEL} = fast, {db.STORE_COMPRESSLEVEL} = store)')
+    append_opt = argparse.ArgumentParser(add_help=False)
+    append_opt.add_argument('--append', action='store_true',
+                            help='append a config.json overlay instead of rewriting the bank '
+                                 '(run "compact" before copying it to the device)')
+
     s = sub.add_parser('show', help='Print config.json')
     s.add_argument('bank')
     s.set_defaults(func=cmd_show)
@@ -237,34 +1245,190 @@ def build_parser():
     s.add_argument('output')
     s.set_defaults(func=cmd_export)
 
-    s = sub.add_parser('update', help='Replace config.json from external JSON file')
+    s = sub.add_parser('update', help='Replace config.json from external JSON file',
+                       parents=[write_opts, append_opt])
     s.add_argument('bank')
     s.add_argument('input')
     s.set_defaults(func=cmd_update)
 
-    s = sub.add_parser('get', help='Get value at JSON pointer')
+    s = sub.add_parser('get', help='Get value(s) at JSON pointer(s); "*" fans out over a list')
     s.add_argument('bank')
-    s.add_argument('pointer')
+    s.add_argument('pointer', nargs='+')
     s.set_defaults(func=cmd_get)
 
-    s = sub.add_parser('set', help='Set value at JSON pointer')
+    s = sub.add_parser('set', help='Set value at JSON pointer', parents=[write_opts, append_opt])
     s.add_argument('bank')
     s.add_argument('pointer')
     s.add_argument('value')
     s.set_defaults(func=cmd_set)
 
+    s = sub.add_parser('patch', help='Apply many pointer edits / a JSON Patch with one archive rewrite',
+                       parents=[write_opts, append_opt])
+    s.add_argument('bank')
+    s.add_argument('ops', help='JSON file ("-" for stdin): {pointer: value, ...} or an RFC 6902 patch list')
+    s.add_argument('--atomic', action='store_true', help='write nothing if any operation fails')
+    s.add_argument('--dry-run', action='store_true', help='report results without writing the bank')
+    s.set_defaults(func=cmd_patch)
+
+    s = sub.add_parser('batch', help='Run get/set/patch/export/validate over many banks in parallel')
+    s.add_argument('-j', '--jobs', type=_positive_int, default=os.cpu_count() or 1,
+                   help='worker processes (default: CPU count; 1 = run inline)')
+    s.add_argument('-o', '--output', help='JSON Lines result file (default: stdout)')
+    bsub = s.add_subparsers(dest='op', required=True)
+    b = bsub.add_parser('get', help='Get value at JSON pointer')
+    b.add_argument('banks', nargs='+', metavar='bank-or-glob')
+    b.add_argument('pointer')
+    b = bsub.add_parser('set', help='Set value at JSON pointer', parents=[write_opts, append_opt])
+    b.add_argument('banks', nargs='+', metavar='bank-or-glob')
+    b.add_argument('pointer')
+    b.add_argument('value')
+    b = bsub.add_parser('patch', help='Apply a patch file to every bank', parents=[write_opts, append_opt])
+    b.add_argument('banks', nargs='+', metavar='bank-or-glob')
+    b.add_argument('ops', help='JSON file: {pointer: value, ...} or an RFC 6902 patch list')
+    b.add_argument('--atomic', action='store_true', help='leave a bank unchanged if any operation fails on it')
+    b = bsub.add_parser('export', help='Export each config.json into a directory')
+    b.add_argument('banks', nargs='+', metavar='bank-or-glob')
+    b.add_argument('--out-dir', required=True,
+                   help='where to write the JSON files, in the same directory layout as the banks')
+    b = bsub.add_parser('validate', help='Check every bank against the FORMAT_SPEC rules')
+    b.add_argument('banks', nargs='+', metavar='bank-or-glob')
+    s.set_defaults(func=cmd_batch)
+
+    s = sub.add_parser('validate', help='Check presets and global settings against the FORMAT_SPEC rules')
+    s.add_argument('bank')
+    s.add_argument('--json', action='store_true', help='print diagnostics as a JSON list')
+    s.add_argument('--assets', action='store_true',
+                   help='also warn about nam / ir / ... references to assets not in the bank')
+    s.set_defaults(func=cmd_validate)
+
+    s = sub.add_parser('store', help='Content-addressed asset store: keep banks as small manifests')
+    s.add_argument('--store-dir', help='asset store directory (default: $DIMEHEAD_STORE_DIR or the user data dir)')
+    ssub = s.add_subparsers(dest='store_op', required=True)
+    b = ssub.add_parser('add', help='Save banks into the store as .npbm manifests', parents=[write_opts])
+    b.add_argument('banks', nargs='+')
+    b.add_argument('-o', '--output', help='manifest path (single bank; default: <bank>.npbm)')
+    b = ssub.add_parser('export', help='Materialize a manifest into a real .npb', parents=[write_opts])
+    b.add_argument('manifest')
+    b.add_argument('output')
+    ssub.add_parser('stats', help='Object count and size of the store')
+    b = ssub.add_parser('gc', help='Delete objects no manifest of the store refers to')
+    b.add_argument('manifests', nargs='*', metavar='manifest-or-glob',
+                   help='manifests to keep besides the registered ones (written before the registry, or moved)')
+    b.add_argument('--dry-run', action='store_true', help='report what would be removed, delete nothing')
+    s.set_defaults(func=cmd_store)
+
+    s = sub.add_parser('loudness', help='Measure .nam model loudness; optionally normalize potiVol',
+                       parents=[write_opts, append_opt])
+    s.add_argument('bank')
+    s.add_argument('--json', action='store_true', help='print the per-model results as JSON')
+    s.add_argument('--set-vol', action='store_true', help='set potiVol of every preset from its model loudness')
+    s.add_argument('--target', type=float, default=analysis.LOUDNESS_TARGET_DB,
+                   help=f'target loudness in dBFS (default {analysis.LOUDNESS_TARGET_DB})')
+    s.add_argument('--reference', type=float, default=analysis.REFERENCE_VOL,
+                   help=f'potiVol for a model already at the target (default {analysis.REFERENCE_VOL})')
+    s.set_defaults(func=cmd_loudness)
+
+    s = sub.add_parser('ir', help='Summarize impulse responses; optionally set hpFreq/lpFreq from them',
+                       parents=[write_opts, append_opt])
+    s.add_argument('bank')
+    s.add_argument('--json', action='store_true', help='print the per-IR summaries as JSON')
+    s.add_argument('--set-filters', action='store_true',
+                   help="set hpFreq/lpFreq of every preset to its cab IR's rolloffs")
+    s.set_defaults(func=cmd_ir)
+
+    s = sub.add_parser('refs', help='Report missing, orphaned and shared assets; optionally prune orphans',
+                       parents=[write_opts])
+    s.add_argument('bank')
+    s.add_argument('--json', action='store_true', help='print the report as JSON')
+    s.add_argument('--prune', action='store_true',
+                   help='rewrite the bank without the orphaned models / IRs (original kept as .bak)')
+    s.set_defaults(func=cmd_refs)
+
+    s = sub.add_parser('add-asset', help='Add .nam / IR files to the bank', parents=[write_opts])
+    s.add_argument('bank')
+    s.add_argument('files', nargs='+')
+    s.add_argument('--name', help='member name for a single file (default: the file name)')
+    s.set_defaults(func=cmd_add_asset)
+
+    s = sub.add_parser('replace-asset', help="Replace a member's data with a file's contents",
+                       parents=[write_opts])
+    s.add_argument('bank')
+    s.add_argument('name')
+    s.add_argument('file')
+    s.set_defaults(func=cmd_replace_asset)
+
+    s = sub.add_parser('remove-asset', help='Remove members from the bank', parents=[write_opts])
+    s.add_argument('bank')
+    s.add_argument('names', nargs='+')
+    s.set_defaults(func=cmd_remove_asset)
+
+    s = sub.add_parser('serve', help='Keep banks parsed in memory and answer JSON-RPC requests on a Unix socket')
+    s.add_argument('--socket', help='socket path (default $DIMEHEAD_SOCKET or the user runtime directory)')
+    s.add_argument('--poll', type=float, default=1.0, metavar='SECONDS',
+                   help='how often to check loaded banks for external changes (default 1)')
+    s.add_argument('preload', nargs='*', metavar='bank', help='banks to load at startup')
+    s.set_defaults(func=cmd_serve)
+
+    s = sub.add_parser('call', help='Send one request to a running "serve" (thin client)')
+    s.add_argument('--socket', help='socket path (default as for serve)')
+    s.add_argument('method', help='ping, banks, open, reload, close, get, set, patch, validate, save, shutdown')
+    s.add_argument('params', nargs='*', metavar='key=value',
+                   help='request params (values parsed as JSON when valid), or one JSON object')
+    s.set_defaults(func=cmd_call)
+
+    s = sub.add_parser('compact', help='Fold appended config overlays into one clean archive',
+                       parents=[write_opts])
+    s.add_argument('bank')
+    s.set_defaults(func=cmd_compact)
+
+    s = sub.add_parser('recover', help='Roll back an append save that a crash interrupted')
+    s.add_argument('bank')
+    s.set_defaults(func=cmd_recover)
+
     return p
 
 
 def main(argv=None):
     parser = build_parser()
     args = parser.parse_args(argv)
+    if args.threads is not None:
+        db.compress_threads = max(1, args.threads)
+    if args.timings:
+        dimehead_txn.add_observer(print_write_timings)
+    if args.profile or args.trace:
+        profile.start()
     try:
-        args.func(args)
+        with profile.span(f'cmd {args.cmd}'):
+            rc = args.func(args)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         return 1
-    return 0
+    finally:
+        if args.stats:
+            print_cache_stats()
+        if args.timings:
+            dimehead_txn.remove_observer(print_write_timings)
+        if args.profile or args.trace:
+            report_profile(profile.stop(), args.trace)
+    return rc or 0
+
+
+def print_write_timings(timings: dimehead_txn.WriteTimings):
+    print(f"write {timings}", file=sys.stderr)
+
+
+def report_profile(prof: profile.Profile, trace_path: Optional[str] = None):
+    print(prof.summary(), file=sys.stderr)
+    if trace_path:
+        prof.write_chrome_trace(trace_path)
+        print(f"trace written to {trace_path}", file=sys.stderr)
+
+
+def print_cache_stats():
+    st = db.config_cache.stats()
+    print(f"cache: {st['hits']} hit(s), {st['misses']} miss(es), {st['evictions']} eviction(s); "
+          f"{st['entries']} entries, {st['bytes'] / 2**20:.1f} / {st['max_bytes'] / 2**20:.0f} MiB "
+          f"in {db.config_cache.directory}", file=sys.stderr)
 
 if __name__ == '__main__':
     sys.exit(main())
@@ -0,0 +1,47 @@
+import io
+import json
+import random
+import tarfile
+
+import pytest
+
+import dimehead_bank as db
+
+
+@pytest.fixture(autouse=True)
+def _isolated_dirs(tmp_path, monkeypatch):
+    # Keep the member index cache and the asset store out of the user's home
+    monkeypatch.setenv('DIMEHEAD_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setenv('DIMEHEAD_STORE_DIR', str(tmp_path / 'store'))
+
+
+def write_tar(path, members, format=tarfile.GNU_FORMAT):
+    """Write members ((name, data) pairs) as a .tar.gz the way the device does."""
+    with tarfile.open(path, 'w:gz', format=format) as tf:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1700000000
+            tf.addfile(info, io.BytesIO(data))
+
+
+def asset_data(size, seed=0):
+    """Half-compressible bytes, so deflate has real work to do."""
+    rng = random.Random(seed)
+    return bytes(rng.getrandbits(4) for _ in range(size))
+
+
+CONFIG = {'configVersion': 1, 'presets': [{'name': 'BRIT', 'nam': 'Synth/Amp 0000.nam'}]}
+
+
+@pytest.fixture
+def bank(tmp_path):
+    """An appendable bank (rewritten once, as after the first save)."""
+    path = str(tmp_path / 'bank.npb')
+    write_tar(path, [
+        ('./config.json', json.dumps(CONFIG).encode('utf-8')),
+        ('./Synth/Amp 0000.nam', asset_data(200 * 1024, 1)),
+        ('./Synth/Cab 0000.ir', asset_data(20 * 1024, 2)),
+    ])
+    db.compact_bank(path, backup=False)
+    return path
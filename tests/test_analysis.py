@@ -0,0 +1,192 @@
+import json
+import os
+import struct
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import dimehead_analysis as an
+import dimehead_bank as db
+from conftest import CONFIG, write_tar
+
+RATE = 44100
+
+
+def wav(samples, bits, tag=1, rate=RATE, extensible=False):
+    """RIFF/WAVE bytes for samples ((frames, channels) floats in [-1, 1))."""
+    samples = np.asarray(samples, dtype=np.float64)
+    frames, channels = samples.shape
+    if tag == 3:
+        body = samples.astype(f'<f{bits // 8}').tobytes()
+    elif bits == 8:
+        body = np.round(samples * 128 + 128).astype(np.uint8).tobytes()
+    elif bits == 24:
+        ints = np.round(samples * 2 ** 23).astype('<i4')
+        body = ints.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    else:
+        body = np.round(samples * 2 ** (bits - 1)).astype(f'<i{bits // 8}').tobytes()
+    align = channels * bits // 8
+    if extensible:
+        fmt = struct.pack('<HHIIHHHHIH14s', 0xFFFE, channels, rate, rate * align, align, bits,
+                          22, bits, 0, tag, b'\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x008\x9bq')
+    else:
+        fmt = struct.pack('<HHIIHH', tag, channels, rate, rate * align, align, bits)
+    chunks = (b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+              + b'LIST' + struct.pack('<I', 3) + b'abc\x00'  # odd-sized chunk before the data
+              + b'data' + struct.pack('<I', len(body)) + body)
+    return b'RIFF' + struct.pack('<I', 4 + len(chunks)) + b'WAVE' + chunks
+
+
+STEREO = np.array([[0.5, -0.25], [-0.5, 0.125], [0.0, 0.75], [0.25, -1.0]])
+
+
+@pytest.mark.parametrize('bits, tag, kind, tolerance', [
+    (8, 1, 'pcm8', 1 / 128),
+    (16, 1, 'pcm16', 2 ** -15),
+    (24, 1, 'pcm24', 2 ** -23),
+    (32, 1, 'pcm32', 2 ** -31),
+    (32, 3, 'float32', 0),
+    (64, 3, 'float64', 0),
+])
+@pytest.mark.parametrize('extensible', [False, True])
+def test_parse_wav(bits, tag, kind, tolerance, extensible):
+    ir = an.parse_ir(wav(STEREO, bits, tag, extensible=extensible))
+    assert (ir.format, ir.sample_rate, ir.frames, ir.channels) == (kind, RATE, 4, 2)
+    for c in range(2):
+        assert np.allclose(ir.channel(c), STEREO[:, c], atol=tolerance, rtol=0)
+
+
+def test_parse_wav_returns_a_view_of_the_bytes():
+    data = bytearray(wav(STEREO, 16))
+    ir = an.parse_ir(data)
+    data[-2:] = b'\x00\x40'  # last sample -> 0.5
+    assert ir.channel(1)[-1] == 0.5
+
+
+def test_raw_ir_is_float32_mono():
+    x = np.array([1.0, 0.5, -0.25], dtype='<f4')
+    ir = an.parse_ir(x.tobytes())
+    assert (ir.format, ir.sample_rate, ir.channels) == ('float32', an.IR_DEFAULT_SAMPLE_RATE, 1)
+    assert ir.channel(0).tolist() == [1.0, 0.5, -0.25]
+
+
+@pytest.mark.parametrize('data, message', [
+    (b'abc', 'not a WAV file'),
+    (wav(STEREO, 12), 'unsupported WAV encoding'),
+    (b'RIFF\x04\x00\x00\x00WAVE', 'without a data chunk'),
+])
+def test_parse_ir_errors(data, message):
+    with pytest.raises(an.AnalysisError, match=message):
+        an.parse_ir(data)
+
+
+def lowpassed_impulse(cutoff, n=4096, rate=48000):
+    """A linear-phase FIR low-pass at cutoff Hz, as raw float32."""
+    t = np.arange(n) - n // 2
+    h = np.sinc(2 * cutoff / rate * t) * np.blackman(n)
+    return (h / np.abs(h).max() * 0.5).astype('<f4')
+
+
+def test_ir_summary_finds_the_passband():
+    summary = an.ir_summary(lowpassed_impulse(4000).tobytes())
+    assert summary['samples'] == 4096 and summary['channels'] == 1
+    assert summary['length_ms'] == pytest.approx(1000 * 4096 / 48000)
+    assert summary['peak_ms'] == pytest.approx(1000 * 2048 / 48000)
+    assert summary['peak_db'] == pytest.approx(20 * np.log10(0.5), abs=1e-3)
+    assert summary['low_rolloff_hz'] == 20.0
+    assert 3000 < summary['high_rolloff_hz'] <= 4500
+    assert 500 < summary['centroid_hz'] < 4000
+    hp, lp = an.suggested_filters(summary)
+    assert hp == max(20.0, db.FREQ_MIN) and lp == round(summary['high_rolloff_hz'])
+
+
+def test_ir_summary_rejects_silence():
+    with pytest.raises(an.AnalysisError, match='silent'):
+        an.ir_summary(np.zeros(64, '<f4').tobytes())
+
+
+def reference_lstm(x, H, layers, head_w, head_b):
+    """The PyTorch LSTM recurrence, gate order i, f, g, o, step by step."""
+    sig = lambda z: 1 / (1 + np.exp(-z))
+    seq = [np.array([v]) for v in x.astype(np.float64)]
+    for w_ih, w_hh, b, h, c in layers:
+        out = []
+        for v in seq:
+            z = w_ih @ v + w_hh @ h + b
+            i, f, g, o = sig(z[:H]), sig(z[H:2 * H]), np.tanh(z[2 * H:3 * H]), sig(z[3 * H:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            out.append(h)
+        seq = out
+    return np.array([head_w @ h + head_b for h in seq])
+
+
+def test_lstm_matches_the_reference_recurrence():
+    H, n_layers = 3, 2
+    rng = np.random.default_rng(5)
+    weights, layers = [], []
+    for i in range(n_layers):
+        n_in = 1 if i == 0 else H
+        w = rng.standard_normal((4 * H, n_in + H)) * 0.5
+        b, h0, c0 = rng.standard_normal(4 * H) * 0.1, rng.standard_normal(H) * 0.1, rng.standard_normal(H) * 0.1
+        weights += [*w.ravel(), *b, *h0, *c0]
+        layers.append((w[:, :n_in], w[:, n_in:], b, h0, c0))
+    head_w, head_b = rng.standard_normal(H), 0.05
+    weights += [*head_w, head_b]
+    model = an.NamModel(json.dumps({
+        'version': '0.5.0', 'architecture': 'LSTM', 'weights': weights,
+        'config': {'hidden_size': H, 'input_size': 1, 'num_layers': n_layers},
+    }).encode('utf-8'))
+    x = an.probe_signal(seconds=0.002)
+    expected = reference_lstm(x, H, [tuple(np.asarray(a, np.float32).astype(np.float64) for a in l)
+                                     for l in layers], head_w.astype(np.float32), np.float32(head_b))
+    assert np.allclose(model.forward(x), expected, atol=1e-5)
+
+
+def test_probe_signal_is_deterministic_and_at_level():
+    x = an.probe_signal()
+    assert len(x) == an.DEFAULT_SAMPLE_RATE
+    assert np.array_equal(x, an.probe_signal())
+    assert 20 * np.log10(np.sqrt(np.mean(x.astype(np.float64) ** 2))) == pytest.approx(an.TEST_SIGNAL_DB, abs=0.01)
+
+
+def test_repeat_analysis_of_an_unchanged_bank_reads_no_members(tmp_path, monkeypatch):
+    path = str(tmp_path / 'bank.npb')
+    write_tar(path, [
+        ('./config.json', json.dumps(CONFIG).encode('utf-8')),
+        ('./Cab/A.ir', lowpassed_impulse(4000).tobytes()),
+        ('./Cab/B.ir', wav(STEREO, 16)),
+    ])
+    first = an.bank_ir_summaries(path)
+    assert first['Cab/A.ir']['digest'] == db.content_digest(lowpassed_impulse(4000).tobytes())
+
+    reads = []
+    real_read = db.BankArchive.read
+
+    def read(self, name):
+        reads.append(name)
+        return real_read(self, name)
+    monkeypatch.setattr(db.BankArchive, 'read', read)
+    assert an.bank_ir_summaries(path) == first
+    assert reads == []
+
+    # Any rewrite of the bank invalidates the remembered digests
+    db.compact_bank(path, backup=False)
+    assert an.bank_ir_summaries(path) == first
+    assert sorted(reads) == ['./Cab/A.ir', './Cab/B.ir']
+
+
+def test_uncached_analysis_writes_no_cache(tmp_path):
+    path = str(tmp_path / 'bank.npb')
+    write_tar(path, [
+        ('./config.json', json.dumps(CONFIG).encode('utf-8')),
+        ('./Cab/A.ir', lowpassed_impulse(4000).tobytes()),
+        ('./Synth/Broken.nam', b'not a model'),
+    ])
+    summaries = an.bank_ir_summaries(path, use_cache=False)
+    assert summaries['Cab/A.ir']['digest'] == db.content_digest(lowpassed_impulse(4000).tobytes())
+    loudness = an.bank_loudness(path, use_cache=False)
+    assert set(loudness) == {'Synth/Broken.nam'} and 'error' in loudness['Synth/Broken.nam']
+    directory = db.cache_dir('analysis')
+    assert not os.path.isdir(directory) or os.listdir(directory) == []
@@ -0,0 +1,137 @@
+import json
+import os
+import subprocess
+import sys
+import tarfile
+
+import pytest
+
+import dimehead_bank as db
+from conftest import CONFIG
+
+NEW_CONFIG = json.dumps({'configVersion': 1, 'presets': [{'name': 'NEW'}]}).encode('utf-8')
+
+# Appends NEW_CONFIG to argv[1] and dies (like a power cut) when the bank
+# itself is about to be fsynced, i.e. after the overlay bytes are written.
+CRASHING_APPEND = """
+import os, sys
+import dimehead_bank as db
+path = sys.argv[1]
+ino = os.stat(path).st_ino
+real_fsync = os.fsync
+def fsync(fd):
+    if os.fstat(fd).st_ino == ino:
+        os._exit(9)
+    real_fsync(fd)
+os.fsync = fsync
+db.append_config(path, sys.argv[2].encode('utf-8'))
+"""
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def crash_append(path):
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(db.__file__)))
+    proc = subprocess.run([sys.executable, '-c', CRASHING_APPEND, path, NEW_CONFIG.decode('utf-8')], env=env)
+    assert proc.returncode == 9
+
+
+def test_append_round_trip(bank):
+    assert db.append_config(bank, NEW_CONFIG)
+    assert not os.path.exists(bank + db.APPEND_JOURNAL_SUFFIX)
+    assert db.read_config(bank, use_cache=False)[0]['presets'][0]['name'] == 'NEW'
+
+
+def test_interrupted_append_is_rolled_back_byte_identical(bank):
+    before = read_bytes(bank)
+    crash_append(bank)
+    assert os.path.exists(bank + db.APPEND_JOURNAL_SUFFIX)
+    assert read_bytes(bank) != before  # the torn overlay is on disk
+
+    assert db.recover_append(bank)
+    assert read_bytes(bank) == before
+    assert not os.path.exists(bank + db.APPEND_JOURNAL_SUFFIX)
+    assert not db.recover_append(bank)
+
+
+def test_readers_skip_the_torn_tail_without_writing(bank):
+    crash_append(bank)
+    torn = read_bytes(bank)
+
+    config, _, archive = db.read_config(bank)
+    assert config == CONFIG
+    assert [a.name for a in archive.assets()] == [a.name for a in db.BankArchive(bank, use_cache=False).assets()]
+    bank_obj, _ = db.open_bank_fast(bank)
+    assert bank_obj.config == CONFIG
+    assert json.loads(db.scan_bank(bank, lambda asset: None)) == CONFIG
+
+    assert read_bytes(bank) == torn
+    assert os.path.exists(bank + db.APPEND_JOURNAL_SUFFIX)
+
+
+def test_next_write_rolls_back_before_the_backup(bank):
+    before = read_bytes(bank)
+    crash_append(bank)
+
+    b = db.load_bank(bank)
+    b.config['presets'][0]['name'] = 'SAVED'
+    db.save_bank(b, backup=True)
+
+    assert read_bytes(bank + db.BACKUP_SUFFIX) == before
+    assert not os.path.exists(bank + db.APPEND_JOURNAL_SUFFIX)
+    assert db.read_config(bank, use_cache=False)[0]['presets'][0]['name'] == 'SAVED'
+
+
+def test_failed_append_rolls_back_inline(bank, monkeypatch):
+    before = read_bytes(bank)
+    ino = os.stat(bank).st_ino
+    real_fsync = os.fsync
+    failed = []
+
+    def fsync(fd):
+        if not failed and os.fstat(fd).st_ino == ino:
+            failed.append(fd)
+            raise OSError(5, 'Input/output error')
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, 'fsync', fsync)
+    with pytest.raises(OSError):
+        db.append_config(bank, NEW_CONFIG)
+    assert read_bytes(bank) == before
+    assert not os.path.exists(bank + db.APPEND_JOURNAL_SUFFIX)
+
+
+def test_stale_journal_is_ignored(bank):
+    before = read_bytes(bank)
+    with open(bank + db.APPEND_JOURNAL_SUFFIX, 'w') as f:
+        json.dump({'offset': 10, 'ino': os.stat(bank).st_ino + 1}, f)
+
+    assert db.read_config(bank, use_cache=False)[0] == CONFIG
+    assert db.recover_append(bank)  # drops the journal, leaves the bank alone
+    assert read_bytes(bank) == before
+    assert not os.path.exists(bank + db.APPEND_JOURNAL_SUFFIX)
+
+
+def test_repeated_appends_then_compact(bank):
+    original = os.path.getsize(bank)
+    before = db.BankArchive(bank, use_cache=False)
+    assets = [(a.name, before.read(a.name)) for a in before.assets()]
+    for i in range(5):
+        config = dict(CONFIG, presets=[dict(CONFIG['presets'][0], name=f'V{i}')])
+        db.save_bank(db.Bank(path=bank, config=config), backup=False, mode='append')
+        # the newest overlay wins, with and without the member index
+        for use_cache in (True, False):
+            assert db.read_config(bank, use_cache)[0]['presets'][0]['name'] == f'V{i}'
+    grown = os.path.getsize(bank)
+    assert grown > original
+
+    db.compact_bank(bank, backup=False)
+    assert os.path.getsize(bank) < grown
+    config, _raw, archive = db.read_config(bank, use_cache=False)
+    assert config['presets'][0]['name'] == 'V4'
+    with tarfile.open(bank, 'r:gz') as tar:  # the overlays are gone, not just shadowed
+        assert [n for n in tar.getnames() if n.endswith(db.CONFIG_NAME)] == [f'./{db.CONFIG_NAME}']
+    assert [(a.name, archive.read(a.name)) for a in archive.assets()] == assets
@@ -0,0 +1,134 @@
+import gzip
+import io
+import json
+import struct
+import tarfile
+import zlib
+
+import pytest
+
+import dimehead_bank as db
+from conftest import CONFIG, asset_data, write_tar
+
+
+def tar_contents(path):
+    with tarfile.open(path, 'r:gz') as tf:
+        return [(m.name, m.size, tf.extractfile(m).read() if m.isfile() else None) for m in tf.getmembers()]
+
+
+@pytest.fixture
+def big_bank(tmp_path):
+    # The model spans several parallel deflate blocks and gets a gzip member of its own
+    path = str(tmp_path / 'big.npb')
+    write_tar(path, [
+        ('./config.json', json.dumps(CONFIG).encode('utf-8')),
+        ('./Synth/Amp 0000.nam', asset_data(db._SEPARATE_MEMBER_SIZE + 3 * db._PARALLEL_BLOCK + 123, 1)),
+        ('./Synth/Cab 0000.ir', asset_data(40 * 1024, 2)),
+    ])
+    return path
+
+
+@pytest.mark.parametrize('threads', [1, 4])
+def test_rewrite_round_trips_through_gzip_and_tarfile(big_bank, tmp_path, threads):
+    dest = str(tmp_path / f'out{threads}.npb')
+    db.rewrite_archive(big_bank, dest, threads=threads)
+
+    with gzip.open(big_bank, 'rb') as f:
+        src_tar = f.read()
+    with gzip.open(dest, 'rb') as f:
+        out_tar = f.read()
+    assert len(out_tar) % db._BLOCK == 0
+    assert tar_contents(dest) == tar_contents(big_bank)
+    assert db.BankArchive(dest, use_cache=False).read('Synth/Amp 0000.nam') == \
+        tarfile.open(fileobj=io.BytesIO(src_tar)).extractfile('./Synth/Amp 0000.nam').read()
+
+
+def test_threaded_output_inflates_to_the_same_tar(big_bank, tmp_path, monkeypatch):
+    # The rewritten config.json is stamped with the current time; pin it so
+    # the two runs cannot straddle a second boundary.
+    monkeypatch.setattr(db.time, 'time', lambda: 1_700_000_000.0)
+    outs = []
+    for threads in (1, 4):
+        dest = str(tmp_path / f'out{threads}.npb')
+        db.rewrite_archive(big_bank, dest, threads=threads)
+        with gzip.open(dest, 'rb') as f:
+            outs.append(f.read())
+    assert outs[0] == outs[1]
+
+
+LONG_DIR = 'Synth/' + 'Very Long Folder Name ' * 5
+LONG_NAMES = [
+    './config.json',
+    f'./{LONG_DIR}/{"Model " * 20}.nam',   # > 100 chars: GNU long name / pax path
+    './Synth/Amp 0000.nam',
+    f'./{LONG_DIR}/Amp üß.nam',     # non-ASCII: pax path even when short enough
+]
+
+
+@pytest.mark.parametrize('format', [tarfile.GNU_FORMAT, tarfile.PAX_FORMAT])
+def test_tar_stream_long_names_match_tarfile(tmp_path, format):
+    path = str(tmp_path / 'long.npb')
+    members = [(name, asset_data(1000 + 517 * i, i)) for i, name in enumerate(LONG_NAMES)]
+    write_tar(path, members, format=format)
+
+    with gzip.open(path, 'rb') as f:
+        raw = f.read()
+    got = []
+    stream = db._TarStream(io.BytesIO(raw))
+    for m in stream:
+        got.append((m.name, m.size, m.offset_data, stream.read_data()))
+    with tarfile.open(fileobj=io.BytesIO(raw)) as tf:
+        want = [(m.name, m.size, m.offset_data, tf.extractfile(m).read()) for m in tf.getmembers()]
+    assert got == want
+    assert [g[0] for g in got] == LONG_NAMES
+
+    archive = db.BankArchive(path, use_cache=False)
+    for name, data in members:
+        assert archive.read(name) == data
+
+
+@pytest.mark.parametrize('format', [tarfile.GNU_FORMAT, tarfile.PAX_FORMAT])
+def test_rewrite_keeps_long_names(tmp_path, format):
+    src = str(tmp_path / 'long.npb')
+    write_tar(src, [(name, asset_data(700, i)) for i, name in enumerate(LONG_NAMES)], format=format)
+    dest = str(tmp_path / 'out.npb')
+    db.rewrite_archive(src, dest, threads=4)
+    assert tar_contents(dest) == tar_contents(src)
+
+
+def gzip_members(data):
+    """Split concatenated gzip members: [(member bytes, inflated bytes)]."""
+    members = []
+    while data:
+        d = zlib.decompressobj(31)
+        out = d.decompress(data)
+        assert d.eof  # a complete member, trailer included
+        end = len(data) - len(d.unused_data)
+        members.append((data[:end], out))
+        data = d.unused_data
+    return members
+
+
+@pytest.mark.parametrize('level', [1, 9])
+@pytest.mark.parametrize('threads', [1, 4])
+def test_member_trailers_hold_crc_and_size(level, threads):
+    parts = [asset_data(3 * db._PARALLEL_BLOCK + 777, 4), b'', asset_data(db._PARALLEL_BLOCK, 5), b'tail']
+    buf = io.BytesIO()
+    with db._GzipMemberWriter(buf, level, threads) as w:
+        for part in parts:
+            w.write(part)
+            w.close()
+    members = gzip_members(buf.getvalue())
+    assert [out for _m, out in members] == parts  # an empty write is an empty member
+    for member, out in members:
+        assert member[:3] == b'\x1f\x8b\x08'
+        assert struct.unpack('<II', member[-8:]) == (zlib.crc32(out), len(out))
+        assert member[8] == db._XFL[level]
+
+
+def test_malformed_env_setting_warns(monkeypatch):
+    monkeypatch.setenv('DIMEHEAD_TEST_INT', 'lots')
+    with pytest.warns(RuntimeWarning, match="ignoring DIMEHEAD_TEST_INT='lots'"):
+        assert db._env_int('DIMEHEAD_TEST_INT', 3) == 3
+    monkeypatch.setenv('DIMEHEAD_TEST_INT', '-2')
+    assert db._env_int('DIMEHEAD_TEST_INT', 3, minimum=1) == 1
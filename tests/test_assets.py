@@ -0,0 +1,143 @@
+import functools
+import json
+import os
+import shutil
+import tarfile
+
+import pytest
+
+import dimehead_bank as db
+from conftest import CONFIG, asset_data, write_tar
+
+asset_data = functools.lru_cache()(asset_data)  # the 1 MiB payloads are slow to generate
+
+AMP = 'Synth/Amp 0000.nam'
+CAB = 'Synth/Cab 0000.ir'
+BIG = db._SEPARATE_MEMBER_SIZE + 100  # gets a gzip member of its own after a rewrite
+
+
+@pytest.fixture(params=['npb', 'npbm'])
+def edited_bank(request, tmp_path):
+    """A seekable bank (or a manifest of it) whose members each have their own gzip member."""
+    src = str(tmp_path / 'src.npb')
+    write_tar(src, [
+        ('./config.json', json.dumps(CONFIG).encode('utf-8')),
+        (f'./{AMP}', asset_data(BIG, 1)),
+        (f'./{CAB}', asset_data(BIG, 2)),
+    ])
+    path = str(tmp_path / 'bank.npb')
+    db.rewrite_archive(src, path)
+    if request.param == 'npbm':
+        manifest = str(tmp_path / ('bank' + db.MANIFEST_SUFFIX))
+        db.store_bank(path, manifest)
+        return manifest
+    return path
+
+
+def contents(path):
+    if db.is_manifest(path):
+        out = str(path) + '.npb'
+        db.materialize_manifest(path, out)
+        path = out
+    with tarfile.open(path, 'r:gz') as tf:
+        return {m.name.lstrip('./'): tf.extractfile(m).read() for m in tf.getmembers()}
+
+
+def gzip_member_of(path, name):
+    """Compressed bytes of the gzip member holding name's data."""
+    archive = db.BankArchive(path, use_cache=False)
+    e = archive.get(name)
+    cps = archive._checkpoints
+    for (c0, u0), (c1, u1) in zip(cps, cps[1:]):
+        if u0 <= e.offset < u1:
+            with open(path, 'rb') as f:
+                f.seek(c0)
+                return f.read(c1 - c0)
+    raise AssertionError(f"{name} not found")
+
+
+def unchanged(before, after, path, name):
+    """name kept its data, and its compressed bytes (or store object) were reused."""
+    assert after[name] == before[name]
+    if db.is_manifest(path):
+        objects = {m['name'].lstrip('./'): m['object'] for m in db.BankManifest(path).members if m.get('object')}
+        return objects[name]
+    return gzip_member_of(path, name)
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_add_asset(edited_bank, tmp_path):
+    before = contents(edited_bank)
+    reused = {n: unchanged(before, before, edited_bank, n) for n in (AMP, CAB)}
+    new = write(str(tmp_path / 'new.ir'), asset_data(5000, 3))
+
+    stats = db.add_asset(edited_bank, new, name='Synth/New.ir', backup=False)
+    after = contents(edited_bank)
+    assert stats['added'] == 1
+    assert set(after) == {'config.json', AMP, CAB, 'Synth/New.ir'}
+    assert after['Synth/New.ir'] == asset_data(5000, 3)
+    assert after['config.json'] == before['config.json']
+    for n in (AMP, CAB):
+        assert unchanged(before, after, edited_bank, n) == reused[n]
+    if not db.is_manifest(edited_bank):
+        assert stats['copied_bytes'] >= sum(map(len, reused.values()))
+        assert stats['streamed_bytes'] <= 2 * db._BLOCK  # just the end-of-archive marker
+
+
+def test_replace_asset(edited_bank, tmp_path):
+    before = contents(edited_bank)
+    amp = unchanged(before, before, edited_bank, AMP)
+    new = write(str(tmp_path / 'new.ir'), asset_data(7000, 4))
+
+    stats = db.replace_asset(edited_bank, CAB, new, backup=False)
+    after = contents(edited_bank)
+    assert stats['replaced'] == 1
+    assert list(after) == ['config.json', AMP, CAB]  # the replacement keeps its slot
+    assert after[CAB] == asset_data(7000, 4)
+    assert after['config.json'] == before['config.json']
+    assert unchanged(before, after, edited_bank, AMP) == amp
+
+
+def test_remove_asset(edited_bank):
+    before = contents(edited_bank)
+    cab = unchanged(before, before, edited_bank, CAB)
+
+    stats = db.remove_asset(edited_bank, AMP, backup=False)
+    after = contents(edited_bank)
+    assert stats['removed'] == 1
+    assert set(after) == {'config.json', CAB}
+    assert after['config.json'] == before['config.json']
+    assert unchanged(before, after, edited_bank, CAB) == cab
+    if not db.is_manifest(edited_bank):
+        assert stats['streamed_bytes'] <= 2 * db._BLOCK
+
+
+def test_backup_keeps_the_original(edited_bank, tmp_path):
+    before = contents(edited_bank)
+    db.remove_asset(edited_bank, CAB)
+    assert CAB not in contents(edited_bank)
+    restored = str(tmp_path / ('restored' + os.path.splitext(edited_bank)[1]))
+    shutil.copy(edited_bank + db.BACKUP_SUFFIX, restored)
+    assert contents(restored) == before
+
+
+@pytest.mark.parametrize('edit, message', [
+    ({'add': {AMP: __file__}}, 'already in the bank'),
+    ({'replace': {'Synth/Nope.ir': __file__}}, 'not in the bank'),
+    ({'remove': ['config.json']}, 'Not an asset name'),
+    ({'replace': {CAB: __file__}, 'remove': [CAB]}, 'Cannot both replace and remove'),
+    ({'add': {'Synth/New.ir': '/no/such/file'}}, 'File not found'),
+])
+def test_bad_edits_leave_the_bank_alone(edited_bank, edit, message):
+    with open(edited_bank, 'rb') as f:
+        original = f.read()
+    with pytest.raises(db.BankError, match=message):
+        db.update_assets(edited_bank, backup=False, **edit)
+    with open(edited_bank, 'rb') as f:
+        assert f.read() == original
+    assert not os.path.exists(edited_bank + db.BACKUP_SUFFIX)
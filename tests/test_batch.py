@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import dimehead_bank as db
+import nam_config_tool as tool
+from conftest import CONFIG
+
+
+@pytest.fixture
+def banks(tmp_path, bank):
+    """Three copies of the conftest bank, one of them in a subdirectory."""
+    root = tmp_path / 'banks'
+    (root / 'live').mkdir(parents=True)
+    paths = [str(root / 'a.npb'), str(root / 'b.npb'), str(root / 'live' / 'c.npb')]
+    for path in paths:
+        shutil.copy(bank, path)
+    return paths
+
+
+def batch(tmp_path, *argv, jobs=1):
+    out = str(tmp_path / 'results.jsonl')
+    rc = tool.main(['batch', '-j', str(jobs), '-o', out, *argv])
+    with open(out, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    return rc, sorted(records, key=lambda r: r['bank'])
+
+
+def names(path):
+    return [p['name'] for p in db.read_config(path, use_cache=False)[0]['presets']]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_get_and_set(tmp_path, banks, jobs):
+    pattern = str(tmp_path / 'banks' / '**' / '*.npb')
+    rc, records = batch(tmp_path, 'set', pattern, '/presets/0/name', 'LIVE', '--level', '1', jobs=jobs)
+    assert rc == 0 and [r['bank'] for r in records] == sorted(banks)
+    assert all(r['ok'] and r['value'] == 'LIVE' for r in records)
+    assert all(names(p) == ['LIVE'] for p in banks)
+
+    rc, records = batch(tmp_path, 'get', pattern, '/presets/*/name', jobs=jobs)
+    assert rc == 0 and [r['value'] for r in records] == [['LIVE']] * 3
+    rc, records = batch(tmp_path, 'get', pattern, '/presets/3/name', jobs=jobs)
+    assert rc == 2 and {r['error'] for r in records} == {'Index 3 out of range'}
+
+
+@pytest.mark.parametrize('atomic', [False, True])
+def test_patch(tmp_path, banks, atomic):
+    ops = str(tmp_path / 'ops.json')
+    with open(ops, 'w', encoding='utf-8') as f:
+        json.dump([{'op': 'add', 'path': '/presets/-', 'value': {'name': 'TWO'}},
+                   {'op': 'remove', 'path': '/nope'}], f)
+    argv = ['patch', *banks[:2], ops] + (['--atomic'] if atomic else [])
+    rc, records = batch(tmp_path, *argv)
+    assert rc == 2
+    assert [(r['applied'], r['failed']) for r in records] == \
+        [(0 if atomic else 1, [{'index': 1, 'error': "Key 'nope' not found"}])] * 2
+    assert names(banks[0]) == (['BRIT'] if atomic else ['BRIT', 'TWO'])
+    assert names(banks[2]) == ['BRIT']  # not named, not touched
+
+
+def test_validate(tmp_path, banks):
+    config = dict(CONFIG, presets=[dict(CONFIG['presets'][0], potiGain=2.0)])
+    db.save_bank(db.Bank(path=banks[1], config=config), backup=False)
+    rc, records = batch(tmp_path, 'validate', *banks)
+    assert rc == 2
+    assert [r['ok'] for r in records] == [True, False, True]
+    assert records[1]['problems'] == [{'pointer': '/presets/0/potiGain', 'message': 'out of range 0..1',
+                                       'value': 2.0}]
+
+
+def test_export_mirrors_directories(tmp_path, banks):
+    out_dir = str(tmp_path / 'configs')
+    rc, records = batch(tmp_path, 'export', *banks, '--out-dir', out_dir)
+    assert rc == 0
+    outputs = [r['output'] for r in records]
+    assert outputs == [os.path.join(out_dir, 'a.json'), os.path.join(out_dir, 'b.json'),
+                       os.path.join(out_dir, 'live', 'c.json')]
+    for path in outputs:
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f) == CONFIG
+
+
+def test_export_refuses_colliding_outputs(tmp_path, banks):
+    other = os.path.splitext(banks[0])[0] + db.MANIFEST_SUFFIX
+    db.store_bank(banks[0], other)
+    out_dir = str(tmp_path / 'configs')
+    with pytest.raises(ValueError, match='would both be exported to'):
+        tool.cmd_batch(tool.build_parser().parse_args(['batch', 'export', banks[0], other, '--out-dir', out_dir]))
+    assert not os.path.exists(out_dir)
+
+
+def test_missing_bank_is_reported(tmp_path, banks, capsys):
+    typo = str(tmp_path / 'banks' / 'typo.npb')
+    rc, records = batch(tmp_path, 'validate', banks[0], typo, str(tmp_path / 'none' / '*.npb'))
+    assert rc == 2
+    assert records == [dict(records[0], ok=True),
+                       {'bank': typo, 'op': 'validate', 'ok': False, 'error': 'no such bank'}]
+    assert '1/2 banks OK' in capsys.readouterr().err
+    assert tool.main(['batch', 'validate', str(tmp_path / 'none' / '*.npb')]) == 1  # nothing to do at all
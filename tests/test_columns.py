@@ -0,0 +1,95 @@
+import copy
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import dimehead_bank as db
+
+PRESETS = [
+    {'name': 'A', 'potiGain': 0.5, 'ledColor': 255, 'on': True, 'mix': 1, 'eq': [1, 2]},
+    {'potiGain': 1.0, 'name': 'B', 'mix': 0.5, 'big': 2 ** 70},      # other key order, mixed mix
+    'not a preset',
+    {'name': 'C', 'on': False, 'ledColor': 0, 'extra': {'k': None}},  # no potiGain
+    None,
+    {},
+]
+
+
+def columns(presets=None):
+    presets = copy.deepcopy(PRESETS if presets is None else presets)
+    return presets, db.PresetColumns.from_presets(presets)
+
+
+def dumped(presets):
+    return json.dumps(presets)  # key order and int/float/bool types all show here
+
+
+def test_round_trip_is_lossless():
+    presets, cols = columns()
+    assert dumped(cols.to_presets()) == dumped(PRESETS)
+    assert [cols.kind(f) for f in ('name', 'potiGain', 'ledColor', 'on', 'mix', 'big', 'eq')] == \
+        ['str', 'float', 'int', 'bool', 'object', 'object', 'object']
+    assert cols.objects().tolist() == [True, True, False, True, False, True]
+    assert cols.present('potiGain').tolist() == [True, True, False, False, False, False]
+    assert cols.get(3, 'potiGain', 'absent') == 'absent'
+    assert type(cols.get(0, 'ledColor')) is int and type(cols.get(0, 'potiGain')) is float
+    assert db.PresetColumns.from_presets([]).to_presets() == []
+
+
+def test_set_and_unset_write_through():
+    presets, cols = columns()
+    cols.set(3, 'potiGain', 0.25)           # new key goes last, like dict assignment
+    cols.set(1, 'ledColor', 'red')          # a str in an int column promotes it to object
+    cols.unset(0, 'on')
+    cols.unset(0, 'missing')
+    assert cols.kind('ledColor') == 'object' and cols.get(0, 'ledColor') == 255
+    assert list(presets[3]) == ['name', 'on', 'ledColor', 'extra', 'potiGain']
+    assert presets[1]['ledColor'] == 'red' and 'on' not in presets[0]
+    assert dumped(cols.to_presets()) == dumped(presets)
+    with pytest.raises(db.BankError, match='not an object'):
+        cols.set(2, 'name', 'X')
+
+
+def test_set_column_is_vectorized_and_keeps_types():
+    presets, cols = columns()
+    rows = cols.objects().nonzero()[0]
+    cols.set_column('potiGain', np.linspace(0.0, 1.0, len(rows)), rows=rows)
+    assert cols.kind('potiGain') == 'float'
+    assert [presets[r]['potiGain'] for r in rows] == [0.0, 1 / 3, 2 / 3, 1.0]
+    assert all(type(presets[r]['potiGain']) is float for r in rows)
+
+    cols.set_column('ledColor', 7, rows=[0, 3])
+    assert cols.kind('ledColor') == 'int' and presets[0]['ledColor'] == presets[3]['ledColor'] == 7
+    cols.set_column('ledColor', [1, 2.5], rows=[0, 3])  # a float does not fit: promoted, not cast
+    assert cols.kind('ledColor') == 'object' and (presets[0]['ledColor'], presets[3]['ledColor']) == (1, 2.5)
+    assert dumped(cols.to_presets()) == dumped(presets)
+
+    with pytest.raises(db.BankError, match='not an object'):
+        cols.set_column('name', 'X')  # every row, including the non-objects
+    with pytest.raises(ValueError, match='differ in length'):
+        cols.set_column('name', ['X', 'Y'], rows=[0])
+    assert presets[0]['name'] == 'A'
+
+
+@pytest.mark.parametrize('src, dst', [(0, 5), (5, 0), (1, 3), (3, 2), (4, 4)])
+def test_move_row_matches_list_semantics(src, dst):
+    presets, cols = columns()
+    expected = copy.deepcopy(PRESETS)
+    expected.insert(dst, expected.pop(src))
+    cols.move_row(src, dst)
+    assert dumped(presets) == dumped(expected)
+    assert dumped(cols.to_presets()) == dumped(expected)
+    assert cols.objects().tolist() == [isinstance(p, dict) for p in expected]
+    assert cols.present('potiGain').tolist() == [isinstance(p, dict) and 'potiGain' in p for p in expected]
+
+
+def test_bank_columns_follow_the_preset_list():
+    bank = db.Bank(path='x.npb', config={'presets': copy.deepcopy(PRESETS)})
+    cols = bank.preset_columns()
+    assert bank.preset_columns() is cols
+    cols.set(0, 'name', 'Z')
+    assert bank.config['presets'][0]['name'] == 'Z'
+    bank.config['presets'] = [{'name': 'new'}]  # a replaced list is picked up
+    assert bank.preset_columns().to_presets() == [{'name': 'new'}]
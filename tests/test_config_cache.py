@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+
+import dimehead_bank as db
+from conftest import CONFIG, asset_data, write_tar
+
+
+class ReadTracker:
+    """Records the furthest offset read from each file opened through _open_bank."""
+
+    def __init__(self, monkeypatch):
+        self.furthest = 0
+        real = db._open_bank
+
+        def open_bank(path):
+            f = real(path)
+            read = f.read
+
+            def tracked(*args):
+                data = read(*args)
+                self.furthest = max(self.furthest, f.tell())
+                return data
+            f.read = tracked
+            return f
+        monkeypatch.setattr(db, '_open_bank', open_bank)
+
+
+def device_bank(path, config=CONFIG):
+    # One gzip stream, config.json first, as the device writes it
+    write_tar(path, [
+        ('./config.json', json.dumps(config).encode('utf-8')),
+        ('./Synth/Amp 0000.nam', asset_data(1024 * 1024, 1)),
+    ])
+    return path
+
+
+def test_cache_hit_reads_only_up_to_config(tmp_path, monkeypatch):
+    path = device_bank(str(tmp_path / 'device.npb'))
+    cache = db.ConfigCache()
+    monkeypatch.setattr(db, 'config_cache', cache)
+    config, _raw, _archive = db.read_config(path)
+    assert cache.misses == 1
+
+    tracker = ReadTracker(monkeypatch)
+    assert db.read_config(path)[0] == config == CONFIG
+    assert cache.hits == 1
+    assert 0 < tracker.furthest <= 128 * 1024 < os.path.getsize(path) // 2
+
+
+def test_cache_misses_when_config_changes(tmp_path, monkeypatch):
+    path = device_bank(str(tmp_path / 'device.npb'))
+    cache = db.ConfigCache()
+    monkeypatch.setattr(db, 'config_cache', cache)
+    db.read_config(path)
+    st = os.stat(path)
+
+    changed = dict(CONFIG, configVersion=2)
+    device_bank(path, changed)  # same size and, below, the same mtime
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert os.path.getsize(path) == st.st_size
+    assert db.read_config(path, use_cache=True)[0] == changed
+    assert cache.hits == 0 and cache.misses == 2
+
+
+def cache_files(*parts):
+    directory = db.cache_dir(*parts)
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+def test_every_cache_write_gets_its_own_temp_file(tmp_path, monkeypatch):
+    path = device_bank(str(tmp_path / 'device.npb'))
+    archive = db.BankArchive(path, use_cache=False)
+    config, raw = json.loads(archive.read_config_text()), archive.read_config_text()
+    cache = db.ConfigCache()
+    sources = []
+    real_replace = os.replace
+
+    def replace(src, dst):
+        sources.append(src)
+        return real_replace(src, dst)
+    monkeypatch.setattr(os, 'replace', replace)
+    for _ in range(2):
+        cache.put(archive, config, raw)
+        db._store_index(path, os.stat(path), archive.entries, archive._checkpoints)
+    assert len(sources) == 4 and len(set(sources)) == 4
+    assert cache.get(archive) == (config, raw)
+
+
+def test_failed_cache_writes_leave_no_temp_files(tmp_path, monkeypatch):
+    path = device_bank(str(tmp_path / 'device.npb'))
+    archive = db.BankArchive(path, use_cache=False)
+
+    def replace(src, dst):
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr(os, 'replace', replace)
+    db.ConfigCache().put(archive, CONFIG, archive.read_config_text())
+    db.BankArchive(path)
+    assert cache_files('configs') == [] and cache_files('index') == []
+
+
+def test_concurrent_cache_writers(tmp_path):
+    path = device_bank(str(tmp_path / 'device.npb'))
+    archive = db.BankArchive(path, use_cache=False)
+    raw = archive.read_config_text()
+    cache = db.ConfigCache()
+
+    def work():
+        for _ in range(20):
+            cache.put(archive, CONFIG, raw)
+            db._store_index(path, os.stat(path), archive.entries, archive._checkpoints)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.get(archive) == (CONFIG, raw)
+    assert [n for n in cache_files('configs') + cache_files('index') if n.endswith('.tmp')] == []
+    assert [a.name for a in db.BankArchive(path).assets()] == ['./Synth/Amp 0000.nam']
@@ -0,0 +1,100 @@
+import copy
+import json
+
+import dimehead_bank as db
+
+
+def preset(name, **fields):
+    return dict({'name': name, 'nam': f'Synth/{name}.nam', 'potiGain': 0.5}, **fields)
+
+
+def config(*presets, **top):
+    return dict({'configVersion': 1, 'presets': list(presets)}, **top)
+
+
+A, B, C, D, E = (preset(n) for n in 'ABCDE')
+EMPTY = {'changed': {}, 'added': {}, 'removed': {}, 'moved': {}}
+
+
+def diff(old, new, **expected):
+    result = db.diff_configs(old, new)
+    assert result == dict(EMPTY, **expected)
+    # A prebuilt snapshot gives the same answer
+    assert db.diff_configs(old, new, db.ConfigSnapshot(json.dumps(old))) == result
+    return result
+
+
+def test_identical_configs():
+    old = config(A, B, C)
+    diff(old, copy.deepcopy(old))
+
+
+def test_pure_reorder_is_moves_only():
+    diff(config(A, B, C, D, E), config(A, C, D, B, E), moved={'/presets/1': '/presets/3'})
+    diff(config(A, B, C, D, E), config(E, A, B, C, D), moved={'/presets/4': '/presets/0'})
+    result = db.diff_configs(config(A, B, C, D), config(D, C, B, A))
+    assert not any(result[k] for k in ('changed', 'added', 'removed'))
+    assert len(result['moved']) == 3  # one of the four keeps its relative order
+
+
+def test_insert_and_delete():
+    x = preset('X')
+    # A goes, X arrives in a slot whose original is still in use: no moves
+    diff(config(A, B, C, D), config(B, C, x, D),
+         removed={'/presets/0': A}, added={'/presets/2': x})
+    diff(config(A, B), config(A, B, x), added={'/presets/2': x})
+    diff(config(A, B, C), config(A, C), removed={'/presets/1': B})
+
+
+def test_replacing_a_slot_is_an_edit_in_place():
+    x = preset('X')
+    diff(config(A, B, C), config(A, x, C), changed={
+        '/presets/1/name': ('B', 'X'),
+        '/presets/1/nam': ('Synth/B.nam', 'Synth/X.nam'),
+    })
+
+
+def test_duplicated_preset_names_pair_with_the_unused_one():
+    a2 = preset('A', potiGain=0.7)
+    edited = dict(a2, potiGain=0.9)
+    diff(config(A, B, a2), config(A, B, edited), changed={'/presets/2/potiGain': (0.7, 0.9)})
+    # The edited duplicate swapped places with B: paired by name, not by
+    # slot, and one move (of either) accounts for the reorder
+    diff(config(A, a2, B), config(A, B, edited),
+         moved={'/presets/2': '/presets/1'}, changed={'/presets/2/potiGain': (0.7, 0.9)})
+
+
+def test_identical_duplicates_are_only_moved():
+    old, new = config(A, A, B), config(B, A, A)
+    result = db.diff_configs(old, new)
+    assert not any(result[k] for k in ('changed', 'added', 'removed'))
+    for src, dst in result['moved'].items():
+        assert old['presets'][int(src.rsplit('/', 1)[1])] == new['presets'][int(dst.rsplit('/', 1)[1])]
+
+
+def test_moved_and_edited():
+    edited = dict(B, potiGain=0.8, ledColor=255)
+    diff(config(A, B, C, D), config(A, C, D, edited),
+         moved={'/presets/1': '/presets/3'},
+         changed={'/presets/3/potiGain': (0.5, 0.8)},
+         added={'/presets/3/ledColor': 255})
+
+
+def test_values_keep_their_json_types():
+    old = config(A, globalVol=1, flag=True, ratio=1.0, gone='x')
+    new = config(A, globalVol=1.0, flag=1, ratio=1.0, new={'a~/b': [1]})
+    diff(old, new,
+         changed={'/globalVol': (1, 1.0), '/flag': (True, 1)},
+         removed={'/gone': 'x'}, added={'/new': {'a~/b': [1]}})
+    diff(config(preset('A', eq=[1, 2, 3])), config(preset('A', eq=[1, 5])),
+         changed={'/presets/0/eq/1': (2, 5)}, removed={'/presets/0/eq/2': 3})
+
+
+def test_bank_diff_config_reuses_its_snapshot():
+    raw = json.dumps(config(A, B, C))
+    bank = db.Bank(path='x.npb', config=json.loads(raw), original_config_json=raw)
+    assert bank.diff_config() == EMPTY
+    snapshot = bank._snapshot
+    bank.config['presets'].insert(0, bank.config['presets'].pop(2))
+    assert bank.diff_config() == dict(EMPTY, moved={'/presets/2': '/presets/0'})
+    assert bank._snapshot is snapshot
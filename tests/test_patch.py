@@ -0,0 +1,84 @@
+import pytest
+
+import nam_config_tool as tool
+
+
+def errors(results):
+    return [(i, err) for i, _op, err in results if err is not None]
+
+
+def test_failing_op_is_reported_and_the_rest_apply():
+    doc = {'a': 1, 'b': 2}
+    results = tool.apply_patch(doc, [
+        {'op': 'replace', 'path': 5, 'value': 2},
+        {'op': 'replace', 'path': '/a', 'value': 3},
+        {'op': 'replace', 'path': '/missing', 'value': 4},
+        {'op': 'copy', 'from': None, 'path': '/c'},
+        'not an op',
+        {'op': 'frobnicate', 'path': '/a'},
+        {'op': 'remove', 'path': '/b'},
+    ])
+    assert doc == {'a': 3}
+    assert [i for i, _ in errors(results)] == [0, 2, 3, 4, 5]
+    assert errors(results)[1] == (2, "Key 'missing' not found")
+
+
+@pytest.mark.parametrize('value, ok', [
+    (1, True), (1.0, True), (True, False), ('1', False), ([1], False),
+])
+def test_test_op_respects_json_types(value, ok):
+    doc = {'x': 1, 'y': 0}
+    results = tool.apply_patch(doc, [
+        {'op': 'test', 'path': '/x', 'value': value},
+        {'op': 'replace', 'path': '/y', 'value': 1},
+    ])
+    assert (results[0][2] is None) == ok
+    assert doc['y'] == 1
+
+
+def test_test_op_compares_containers_deeply():
+    doc = {'p': [{'v': 1, 'on': True}]}
+    good, bad = tool.apply_patch(doc, [
+        {'op': 'test', 'path': '/p', 'value': [{'on': True, 'v': 1.0}]},
+        {'op': 'test', 'path': '/p', 'value': [{'on': 1, 'v': 1}]},
+    ])
+    assert good[2] is None
+    assert bad[2].startswith('test failed')
+
+
+def test_move_into_own_child_is_rejected():
+    doc = {'a': {'b': {}}, 'ab': 1}
+    results = tool.apply_patch(doc, [
+        {'op': 'move', 'from': '/a', 'path': '/a/b/c'},
+        {'op': 'move', 'from': '/a', 'path': '/ab'},  # a sibling sharing the prefix is fine
+    ])
+    assert results[0][2] == "Cannot move a value into one of its children"
+    assert results[1][2] is None
+    assert doc == {'ab': {'b': {}}}
+
+
+def test_failed_move_puts_the_value_back():
+    doc = {'a': 1, 'l': []}
+    results = tool.apply_patch(doc, [{'op': 'move', 'from': '/a', 'path': '/l/5'}])
+    assert results[0][2] == "Index 5 out of range"
+    assert doc == {'a': 1, 'l': []}
+
+
+def test_dash_appends_to_a_list():
+    doc = {'presets': [{'name': 'A'}]}
+    results = tool.apply_patch(doc, [
+        {'op': 'add', 'path': '/presets/-', 'value': {'name': 'B'}},
+        {'op': 'copy', 'from': '/presets/0', 'path': '/presets/-'},
+        {'op': 'replace', 'path': '/presets/-', 'value': {}},
+    ])
+    assert [n['name'] for n in doc['presets']] == ['A', 'B', 'A']
+    assert [e is None for _i, _op, e in results] == [True, True, False]
+
+
+def test_mapping_spec_becomes_replace_ops():
+    doc = {'a': 1, 'b': {'c': 2}}
+    results = tool.apply_patch(doc, tool.normalize_ops({'/a': 5, '/b/c': 6}))
+    assert not errors(results)
+    assert doc == {'a': 5, 'b': {'c': 6}}
+    with pytest.raises(ValueError):
+        tool.normalize_ops('nope')
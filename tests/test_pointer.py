@@ -0,0 +1,58 @@
+import pytest
+
+import nam_config_tool as tool
+
+DOC = {
+    'configVersion': 1,
+    'a/b': {'m~n': 'escaped'},
+    'presets': [
+        {'name': 'A', 'potiGain': 0.1},
+        {'name': 'B'},
+        {'name': 'C', 'potiGain': 0.3},
+    ],
+}
+
+
+@pytest.mark.parametrize('pointer', ['', '/', '#', '#/'])
+def test_root_pointers(pointer):
+    assert tool.compile_pointer(pointer).tokens == ()
+    assert tool.json_pointer_get(DOC, pointer) is DOC
+    with pytest.raises(ValueError):
+        tool.json_pointer_set({}, pointer, 1)
+
+
+def test_escapes_and_fragment_prefix():
+    assert tool.compile_pointer('/a~1b/m~0n').tokens == ('a/b', 'm~n')
+    assert tool.json_pointer_get(DOC, '#/a~1b/m~0n') == 'escaped'
+    assert tool.compile_pointer('/~01').tokens == ('~1',)  # ~0 is undone last
+    with pytest.raises(ValueError, match="must start with '/'"):
+        tool.compile_pointer('presets')
+
+
+def test_compiled_pointers_are_memoized():
+    assert tool.compile_pointer('/presets/0/name') is tool.compile_pointer('/presets/0/name')
+    ptr = tool.compile_pointer('/presets/-1/007')
+    assert ptr.indexes == (None, -1, 7) and not ptr.has_wildcard
+
+
+def test_get_many_shares_one_walk():
+    assert tool.json_pointer_get_many(DOC, ['/configVersion', '/presets/1/name', '/a~1b/m~0n', '#']) == {
+        '/configVersion': 1, '/presets/1/name': 'B', '/a~1b/m~0n': 'escaped', '#': DOC,
+    }
+
+
+def test_wildcard_columns_stay_aligned():
+    out = tool.json_pointer_get_many(DOC, ['/presets/*/name', '/presets/*/potiGain'])
+    assert out == {'/presets/*/name': ['A', 'B', 'C'], '/presets/*/potiGain': [0.1, None, 0.3]}
+    out = tool.json_pointer_get_many(DOC, ['/presets/*/potiGain'], default=0.0)
+    assert out == {'/presets/*/potiGain': [0.1, 0.0, 0.3]}
+    assert tool.json_pointer_get_many(DOC, ['/a~1b/*']) == {'/a~1b/*': ['escaped']}
+
+
+def test_get_many_missing_keys():
+    with pytest.raises(KeyError, match="/presets/5/name: Index 5 out of range"):
+        tool.json_pointer_get_many(DOC, ['/configVersion', '/presets/5/name'])
+    with pytest.raises(KeyError, match="/nope/\\*: Key 'nope' not found"):
+        tool.json_pointer_get_many(DOC, ['/nope/*'])
+    assert tool.json_pointer_get_many(DOC, ['/nope', '/nope/*', '/configVersion'], default=None) == \
+        {'/nope': None, '/nope/*': None, '/configVersion': 1}
@@ -0,0 +1,110 @@
+import io
+import json
+import threading
+
+import pytest
+
+import dimehead_profile as profile
+import nam_config_tool as tool
+
+
+@pytest.fixture(autouse=True)
+def _stopped():
+    profile.stop()
+    yield
+    profile.stop()
+
+
+class Clock:
+    """perf_counter stand-in that advances only when told to."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(profile.time, 'perf_counter', c)
+    return c
+
+
+def test_span_is_a_shared_noop_while_stopped():
+    assert profile.active() is None
+    assert profile.span('a') is profile.span('b', 10, x=1)
+    with profile.span('a') as s:
+        s.add_bytes(5)
+        s.note(x=1)
+    profile.count('c')
+    f = io.BytesIO(b'data')
+    assert profile.reader(f) is f and profile.writer(f) is f
+
+    p = profile.start()
+    assert profile.span('a') is not profile.span('a')
+    assert profile.stop() is p and profile.active() is None
+    assert profile.span('a') is profile.span('b')
+
+
+def test_nested_spans_split_self_and_total_time(clock):
+    p = profile.start(min_event=0)
+    with profile.span('outer', 10):
+        clock.advance(1.0)
+        with profile.span('inner') as s:
+            clock.advance(2.0)
+            s.add_bytes(4)
+        with profile.span('inner'):
+            clock.advance(0.5)
+        clock.advance(0.25)
+    profile.count('hit')
+    profile.count('hit', 2)
+    profile.stop()
+
+    outer, inner = p.stats['outer'], p.stats['inner']
+    assert (outer.calls, outer.total, outer.self_time, outer.bytes) == (1, 3.75, 1.25, 10)
+    assert (inner.calls, inner.total, inner.self_time, inner.bytes) == (2, 2.5, 2.5, 4)
+    assert p.counters == {'hit': 3}
+    assert [e[0] for e in p.events] == ['inner', 'inner', 'outer']
+    assert 'outer' in p.summary() and 'hit' in p.summary()
+
+
+def test_spans_on_other_threads_do_not_nest(clock):
+    p = profile.start(min_event=0)
+    with profile.span('main'):
+        clock.advance(1.0)
+        worker = threading.Thread(target=lambda: profile.record('deflate', 100.0, 100.5), name='gzip_0')
+        worker.start()
+        worker.join()
+    profile.stop()
+    assert p.stats['main'].self_time == 1.0 and p.stats['deflate'].total == 0.5
+    assert 'gzip_0' in p._threads.values()
+
+
+def test_short_spans_only_reach_the_totals(clock):
+    p = profile.start(min_event=0.1)
+    with profile.span('short'):
+        clock.advance(0.01)
+    profile.stop()
+    assert p.stats['short'].calls == 1 and p.events == []
+
+
+def test_trace_option_writes_trace_events(tmp_path, bank, capsys):
+    path = str(tmp_path / 'trace.json')
+    assert tool.main(['--trace', path, 'get', bank, '/presets/0/name']) == 0
+    assert profile.active() is None
+    with open(path, encoding='utf-8') as f:
+        trace = json.load(f)
+    events = trace['traceEvents']
+    assert {e['ph'] for e in events} <= {'M', 'X', 'C'}
+    spans = [e for e in events if e['ph'] == 'X']
+    assert 'cmd get' in {e['name'] for e in spans}
+    for e in spans:
+        assert {'name', 'pid', 'tid', 'ts', 'dur'} <= set(e) and e['dur'] >= 0 and e['ts'] >= 0
+    assert any(e['ph'] == 'M' and e['name'] == 'thread_name' for e in events)
+    err = capsys.readouterr().err
+    assert f'trace written to {path}' in err and 'cmd get' in err
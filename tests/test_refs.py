@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip('numpy')
+
+import dimehead_bank as db
+import nam_config_tool as tool
+from conftest import CONFIG
+
+
+def with_presets(path, presets):
+    db.save_bank(db.Bank(path=path, config=dict(CONFIG, presets=presets)), backup=False)
+
+
+def test_device_assets_are_not_missing(bank, capsys):
+    # The conftest bank holds Synth/Amp 0000.nam and an unused Synth/Cab 0000.ir
+    with_presets(bank, [dict(CONFIG['presets'][0], ir='Factory/4x12.ir', boostNam='./Factory/Boost.nam')])
+    assert tool.main(['refs', bank]) == 0
+    assert db.load_bank(bank).asset_refs().missing() == {}
+    assert tool.main(['validate', '--assets', bank]) == 0
+
+    with_presets(bank, [dict(CONFIG['presets'][0], ir='Synth/Gone.ir')])
+    assert tool.main(['refs', bank]) == 2
+    assert 'missing Synth/Gone.ir: 0 ' in capsys.readouterr().out
+    assert tool.main(['validate', '--assets', bank]) == 2
+
+
+def test_prune_drops_orphans_only(bank, capsys):
+    with_presets(bank, [dict(CONFIG['presets'][0], ir='Factory/4x12.ir')])
+    before = db.BankArchive(bank, use_cache=False)
+    amp = before.read('Synth/Amp 0000.nam')
+
+    assert tool.main(['refs', '--json', bank]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report['missing'] == {} and [o['name'] for o in report['orphans']] == ['./Synth/Cab 0000.ir']
+
+    assert tool.main(['refs', '--prune', '--level', '1', bank]) == 0
+    assert 'Pruned 1 orphan(s)' in capsys.readouterr().err
+    after = db.BankArchive(bank, use_cache=False)
+    assert [a.name for a in after.assets()] == ['./Synth/Amp 0000.nam']
+    assert after.read('Synth/Amp 0000.nam') == amp
+    assert db.read_config(bank, use_cache=False)[0]['presets'][0]['ir'] == 'Factory/4x12.ir'
+    assert os.path.exists(bank + db.BACKUP_SUFFIX)
+    assert tool.main(['refs', bank]) == 0  # nothing left to prune, nothing missing
+
+
+def index(refs, n_rows):
+    return ({r: refs.refs(r) for r in range(n_rows)},
+            {name: refs.users(name) for name in refs.referenced()})
+
+
+def test_refs_follow_column_edits():
+    presets = [{'name': f'P{i}', 'nam': f'Synth/{i % 3}.nam', 'ir': f'Cab/{i}.ir'} for i in range(6)]
+    presets.insert(2, 'not a preset')
+    bank = db.Bank(path='x.npb', config={'presets': presets},
+                   assets=[db.Asset(name='./Synth/0.nam', size=1, type='file')])
+    cols, refs = bank.preset_columns(), bank.asset_refs()
+    n = len(presets)
+
+    def check():
+        assert index(refs, n) == index(db.AssetRefs.build(db.PresetColumns.from_presets(presets)), n)
+
+    cols.move_row(0, 5)
+    check()
+    cols.move_row(6, 1)
+    check()
+    cols.set(3, 'ir', 'Cab/new.ir')
+    cols.set(3, 'boostNam', './Synth/boost.nam')
+    check()
+    cols.unset(4, 'nam')
+    check()
+    cols.set_column('ir', ['Cab/a.ir', None, 'Cab/a.ir'], rows=[0, 1, 3])
+    check()
+    cols.set_column('nam', 'Synth/0.nam', rows=[r for r in range(n) if r != 2])
+    check()
+    assert refs.rows('Cab/a.ir') == [0, 3]
+    assert refs.shared()['Synth/0.nam'] == [0, 1, 3, 4, 5, 6]
+    assert 'Synth/0.nam' not in refs.missing() and 'Synth/boost.nam' in refs.missing()
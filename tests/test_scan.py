@@ -0,0 +1,75 @@
+import json
+import tracemalloc
+
+import pytest
+
+import dimehead_bank as db
+from conftest import CONFIG, asset_data, write_tar
+
+HEADER = {'version': '0.5.4', 'metadata': {'name': 'Big', 'tags': ['a', 'b']}, 'architecture': 'WaveNet',
+          'config': {'layers': [{'dilations': [1, 2, 4]}]}}
+
+
+def nam(n_weights, **after):
+    # Fields written after the weights, as some exporters do, must survive too
+    doc = json.dumps(dict(HEADER, weights=[0.123456789] * n_weights, **after))
+    return doc.encode('utf-8')
+
+
+@pytest.fixture
+def models():
+    return {
+        'Synth/Small.nam': nam(10, sample_rate=44100),
+        'Synth/Big.nam': nam(300_000, sample_rate=48000),
+        'Synth/Cab.ir': asset_data(5000, 3),
+    }
+
+
+def bank_with(path, models):
+    write_tar(path, [('./config.json', json.dumps(CONFIG).encode('utf-8'))]
+              + [(f'./{name}', data) for name, data in models.items()])
+    return path
+
+
+def scan(path):
+    found = {}
+    raw = db.scan_bank(path, lambda a: found.__setitem__(a.name.lstrip('./'), a))
+    return raw, found
+
+
+@pytest.mark.parametrize('manifest', [False, True])
+def test_scan_reports_digests_and_model_headers(tmp_path, models, manifest):
+    path = bank_with(str(tmp_path / 'bank.npb'), models)
+    if manifest:
+        db.store_bank(path, str(tmp_path / ('bank' + db.MANIFEST_SUFFIX)))
+        path = str(tmp_path / ('bank' + db.MANIFEST_SUFFIX))
+    raw, found = scan(path)
+    assert json.loads(raw) == CONFIG
+    assert set(found) == set(models)
+    for name, data in models.items():
+        assert found[name].size == len(data)
+        assert found[name].digest == db.content_digest(data)
+    assert found['Synth/Small.nam'].info == dict(HEADER, sample_rate=44100)
+    assert found['Synth/Big.nam'].info == dict(HEADER, sample_rate=48000)
+    assert found['Synth/Cab.ir'].info is None
+
+
+def test_scan_does_not_hold_a_whole_model(tmp_path):
+    models = {'Synth/Huge.nam': nam(1_200_000, sample_rate=48000)}
+    path = bank_with(str(tmp_path / 'bank.npb'), models)
+    big = len(models.pop('Synth/Huge.nam'))
+    tracemalloc.start()
+    try:
+        scan(path)
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert big > 12 * db._COPY_CHUNK
+    assert peak < big // 3  # a few copy chunks, not the model
+
+
+def test_nam_model_info_needs_a_flat_weights_list():
+    assert db.nam_model_info(nam(3)) == HEADER
+    nested = json.dumps(dict(HEADER, weights=[[1, 2], [3]])).encode('utf-8')
+    assert db.nam_model_info(nested) == {}
+    assert db.nam_model_info(b'not json') == {}
@@ -0,0 +1,160 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+import dimehead_bank as db
+import nam_config_tool as tool
+from conftest import CONFIG
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="needs Unix domain sockets")
+
+
+@pytest.fixture
+def server():
+    # Unix socket paths are short (~100 bytes): keep it out of the long tmp_path
+    sock_dir = tempfile.mkdtemp(prefix='dh-')
+    path = os.path.join(sock_dir, 's.sock')
+    srv = tool.BankServer(path, poll=0.05, log=lambda msg: None)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not os.path.exists(path):
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.01)
+    yield srv
+    with tool.BankClient(path) as client:
+        client.call('shutdown')
+    thread.join(5)
+    assert not thread.is_alive()
+    os.rmdir(sock_dir)
+
+
+def client(srv):
+    return tool.BankClient(srv.socket_path, timeout=10)
+
+
+def raw_call(srv, line: bytes):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(10)
+        s.connect(srv.socket_path)
+        s.sendall(line + b'\n')
+        return json.loads(s.makefile('rb').readline())
+
+
+def test_open_get_patch_save(server, bank):
+    with client(server) as c:
+        assert c.call('ping') == 'pong'
+        assert c.call('open', bank=bank) == {'bank': bank, 'presets': 1, 'assets': 2, 'dirty': False,
+                                             'stale': False}
+        assert c.call('get', bank=bank, pointer='/presets/0/name') == 'BRIT'
+        assert c.call('get', bank=bank, pointer='/presets/*/name') == ['BRIT']
+        assert c.call('get', bank=bank, pointers=['/configVersion', '/presets/0/nam']) == \
+            {'/configVersion': 1, '/presets/0/nam': 'Synth/Amp 0000.nam'}
+
+        result = c.call('patch', bank=bank, ops=[
+            {'op': 'replace', 'path': '/presets/0/name', 'value': 'NEW'},
+            {'op': 'replace', 'path': '/nope/0', 'value': 1},
+            {'op': 'add', 'path': '/presets/-', 'value': {'name': 'TWO'}},
+        ])
+        assert result == {'applied': 2, 'failed': [{'index': 1, 'error': "Key 'nope' not found"}], 'dirty': True}
+        # nothing reaches the disk before a save
+        assert db.read_config(bank, use_cache=False)[0] == CONFIG
+
+        saved = c.call('save', bank=bank, mode='append', backup=False)
+        assert saved['saved'] == bank and saved['mode'] == 'append'
+        assert [p['name'] for p in db.read_config(bank, use_cache=False)[0]['presets']] == ['NEW', 'TWO']
+        assert c.call('banks') == [{'bank': bank, 'presets': 2, 'assets': 2, 'dirty': False, 'stale': False}]
+
+
+def test_atomic_patch_applies_all_or_nothing(server, bank):
+    with client(server) as c:
+        result = c.call('patch', bank=bank, atomic=True, ops={'/presets/0/name': 'X', '/missing': 1})
+        assert result['applied'] == 0 and result['dirty'] is False
+        assert c.call('get', bank=bank, pointer='/presets/0/name') == 'BRIT'
+
+
+def test_concurrent_clients(server, bank):
+    n_clients, n_ops = 8, 25
+    errors = []
+
+    def work(k):
+        try:
+            with client(server) as c:
+                for i in range(n_ops):
+                    c.call('patch', bank=bank, ops=[{'op': 'add', 'path': '/presets/-', 'value': {'name': f'{k}-{i}'}}])
+                    c.call('get', bank=bank, pointer='/presets/*/name')
+        except Exception as e:  # surfaced below; a thread cannot fail the test itself
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(k,)) for k in range(n_clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    assert not errors
+    with client(server) as c:
+        names = c.call('get', bank=bank, pointer='/presets/*/name')
+        c.call('save', bank=bank, backup=False)
+    assert len(names) == 1 + n_clients * n_ops
+    for k in range(n_clients):  # each client's own edits stay in order
+        assert [n for n in names if n.startswith(f'{k}-')] == [f'{k}-{i}' for i in range(n_ops)]
+    assert len(db.read_config(bank, use_cache=False)[0]['presets']) == len(names)
+
+
+def test_reload_after_an_external_change(server, bank):
+    with client(server) as c:
+        c.call('open', bank=bank)
+        db.save_bank(db.Bank(path=bank, config=dict(CONFIG, configVersion=2)), backup=False)
+        assert c.call('get', bank=bank, pointer='/configVersion') == 2
+
+        c.call('set', bank=bank, pointer='/configVersion', value=3)
+        db.save_bank(db.Bank(path=bank, config=dict(CONFIG, configVersion=4)), backup=False)
+        with pytest.raises(tool.RPCError) as err:
+            c.call('save', bank=bank)
+        assert err.value.code == tool.RPC_BANK_ERROR and 'changed on disk' in str(err.value)
+        assert c.call('get', bank=bank, pointer='/configVersion') == 3  # unsaved edits kept
+        c.call('save', bank=bank, force=True, backup=False)
+        assert db.read_config(bank, use_cache=False)[0]['configVersion'] == 3
+
+
+@pytest.mark.parametrize('method, params, code', [
+    ('nope', {}, tool.RPC_METHOD_NOT_FOUND),
+    ('get', {'pointer': '/a'}, tool.RPC_INVALID_PARAMS),
+    ('get', {'bank': '{bank}'}, tool.RPC_INVALID_PARAMS),
+    ('set', {'bank': '{bank}', 'pointer': '/a'}, tool.RPC_INVALID_PARAMS),
+    ('patch', {'bank': '{bank}', 'ops': 'x'}, tool.RPC_INVALID_PARAMS),
+    ('save', {'bank': '{bank}', 'mode': 'fast'}, tool.RPC_INVALID_PARAMS),
+    ('save', {'bank': '{bank}', 'level': 9.0}, tool.RPC_INVALID_PARAMS),
+    ('save', {'bank': '{bank}', 'level': True}, tool.RPC_INVALID_PARAMS),
+    ('save', {'bank': '{bank}', 'level': 10}, tool.RPC_INVALID_PARAMS),
+    ('open', {'bank': '/no/such/bank.npb'}, tool.RPC_BANK_ERROR),
+    ('get', {'bank': '{bank}', 'pointer': '/presets/5'}, tool.RPC_BANK_ERROR),
+    ('close', {'bank': '{bank}'}, None),
+])
+def test_error_codes(server, bank, method, params, code):
+    params = {k: bank if v == '{bank}' else v for k, v in params.items()}
+    with client(server) as c:
+        if code is None:
+            c.call('set', bank=bank, pointer='/configVersion', value=7)
+            code = tool.RPC_BANK_ERROR  # close refuses to drop unsaved edits
+        with pytest.raises(tool.RPCError) as err:
+            c.call(method, **params)
+        assert err.value.code == code
+        assert c.call('ping') == 'pong'  # the connection survives an error
+
+
+def test_protocol_errors(server):
+    assert raw_call(server, b'{not json')['error']['code'] == tool.RPC_PARSE_ERROR
+    assert raw_call(server, b'{"method": "ping"}')['error']['code'] == tool.RPC_INVALID_REQUEST
+    assert raw_call(server, b'[]')['error']['code'] == tool.RPC_INVALID_REQUEST
+    batch = raw_call(server, b'[{"jsonrpc": "2.0", "id": 1, "method": "ping"},'
+                             b' {"jsonrpc": "2.0", "method": "ping"},'
+                             b' {"jsonrpc": "2.0", "id": 2, "method": "ping", "params": []}]')
+    assert batch[0] == {'jsonrpc': '2.0', 'id': 1, 'result': 'pong'}
+    assert batch[1]['id'] == 2 and batch[1]['error']['code'] == tool.RPC_INVALID_PARAMS
+    assert len(batch) == 2  # no reply to the notification
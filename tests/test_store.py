@@ -0,0 +1,60 @@
+import os
+
+import dimehead_bank as db
+from conftest import asset_data
+
+
+def stored_objects(store):
+    base = os.path.join(store.root, 'objects')
+    return {os.path.basename(d) + n[:-len('.gz')] for d, _dirs, files in os.walk(base) for n in files}
+
+
+def manifest_objects(path):
+    return {m['object'] for m in db.BankManifest(path).members if m.get('object')}
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_gc_after_editing_a_stored_bank(bank, tmp_path):
+    store = db.AssetStore()
+    manifest = str(tmp_path / ('bank' + db.MANIFEST_SUFFIX))
+    db.store_bank(bank, manifest, store=store)
+    old = manifest_objects(manifest)
+
+    new_amp = str(tmp_path / 'new.nam')
+    write(new_amp, asset_data(30 * 1024, 7))
+    extra = str(tmp_path / 'extra.ir')
+    write(extra, asset_data(10 * 1024, 8))
+    db.update_assets(manifest, replace={'Synth/Amp 0000.nam': new_amp}, add={'Synth/Extra.ir': extra},
+                     backup=False)
+
+    # Only the real manifest path is registered, never the temp file
+    assert store.manifests() == [os.path.abspath(manifest)]
+    live = manifest_objects(manifest)
+    assert db.content_digest(asset_data(30 * 1024, 7)) in live
+    assert stored_objects(store) == old | live
+
+    stats = store.gc()
+    assert stats['objects'] == 1
+    assert stored_objects(store) == live
+    assert db.read_config(manifest)[0] == db.read_config(bank)[0]
+
+
+def test_gc_keeps_the_backup_of_an_edited_manifest(bank, tmp_path):
+    store = db.AssetStore()
+    manifest = str(tmp_path / ('bank' + db.MANIFEST_SUFFIX))
+    db.store_bank(bank, manifest, store=store)
+    old = manifest_objects(manifest)
+
+    db.remove_asset(manifest, 'Synth/Amp 0000.nam')  # backup=True by default
+    assert os.path.exists(manifest + db.BACKUP_SUFFIX)
+    assert [m['name'] for m in db.BankManifest(manifest).members] == ['./config.json', './Synth/Cab 0000.ir']
+
+    assert store.gc()['objects'] == 0
+    assert stored_objects(store) == old
+    os.remove(manifest + db.BACKUP_SUFFIX)
+    assert store.gc()['objects'] == 1
+    assert stored_objects(store) == manifest_objects(manifest)
@@ -0,0 +1,60 @@
+import os
+import stat
+
+import pytest
+
+from dimehead_txn import BACKUP_SUFFIX, FileTransaction
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_commit_replaces_and_backs_up(tmp_path):
+    path = str(tmp_path / 'bank.npb')
+    write(path, b'old')
+    os.chmod(path, 0o640)
+    with FileTransaction(path, backup=True) as txn:
+        write(txn.tmp_path, b'new')
+        assert read(path) == b'old'
+    assert read(path) == b'new'
+    assert read(path + BACKUP_SUFFIX) == b'old'
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert sorted(os.listdir(tmp_path)) == ['bank.npb', 'bank.npb' + BACKUP_SUFFIX]
+
+
+def test_exception_leaves_the_original(tmp_path):
+    path = str(tmp_path / 'bank.npb')
+    write(path, b'old')
+    with pytest.raises(RuntimeError):
+        with FileTransaction(path, backup=True) as txn:
+            write(txn.tmp_path, b'half')
+            raise RuntimeError('cancelled')
+    assert read(path) == b'old'
+    assert os.listdir(tmp_path) == ['bank.npb']
+
+
+def test_first_backup_is_kept(tmp_path):
+    path = str(tmp_path / 'bank.npb')
+    write(path, b'v1')
+    for data in (b'v2', b'v3'):
+        with FileTransaction(path, backup=True) as txn:
+            write(txn.tmp_path, data)
+    assert read(path) == b'v3'
+    assert read(path + BACKUP_SUFFIX) == b'v1'
+
+
+def test_discard_commits_nothing(tmp_path):
+    path = str(tmp_path / 'bank.npb')
+    write(path, b'old')
+    with FileTransaction(path) as txn:
+        write(txn.tmp_path, b'new')
+        txn.discard()
+    assert read(path) == b'old'
+    assert os.listdir(tmp_path) == ['bank.npb']
@@ -0,0 +1,105 @@
+import copy
+import os
+
+import pytest
+
+pytest.importorskip('numpy')
+
+import dimehead_bank as db
+import nam_config_tool as tool
+
+FACTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'namplayer-factory-defaults.npb')
+
+GOOD_PRESET = {
+    'name': 'CRUNCH', 'nam': 'Synth/Amp 0000.nam', 'ir': 'Synth/Cab 0000.ir',
+    'potiGain': 0.72, 'potiVol': 1.0, 'potiBoostGain': 0,
+    'eqBassFreq': 90.0, 'eqTrebleFreq': 20000, 'roomDelayHP': 20.0, 'roomDelayLP': 12000.0,
+    'hpFreq': 0.0, 'lpFreq': 11200.0, 'ngThreshold': -1000.0, 'ledColor': 0xFFAA00,
+}
+GOOD = {'configVersion': 1, 'lcdBrightness': 10, 'ledBrightness': 0, 'midiChannelIndex': 16,
+        'tunerReferencePitch': 440.0, 'presets': [GOOD_PRESET, dict(GOOD_PRESET, name='TWO')]}
+ASSETS = [db.Asset(name='./Synth/Amp 0000.nam', size=1, type='file'),
+          db.Asset(name='./Synth/Cab 0000.ir', size=1, type='file')]
+
+
+def problems(config, assets=None):
+    return [(d.pointer, d.message, d.severity) for d in db.validate(config, assets)]
+
+
+def test_a_valid_config_passes():
+    assert problems(GOOD, ASSETS) == []
+    assert db.validate(db.Bank(path='x.npb', config=copy.deepcopy(GOOD), assets=ASSETS)) == []
+
+
+def test_the_factory_bank_passes():
+    config, _raw, _archive = db.read_config(FACTORY, use_cache=False)
+    assert db.validate(config) == []
+
+
+@pytest.mark.parametrize('key, value, message', [
+    ('lcdBrightness', 11, 'out of range 0..10'),
+    ('ledBrightness', -1, 'out of range 0..10'),
+    ('ledBrightness', 5.0, 'expected an integer'),
+    ('midiChannelIndex', 17, 'out of range 0..16'),
+    ('midiChannelIndex', True, 'expected an integer'),
+    ('tunerReferencePitch', 429.9, 'out of range 430..450'),
+    ('tunerReferencePitch', '440', 'expected a number'),
+])
+def test_global_rules(key, value, message):
+    assert problems(dict(GOOD, **{key: value})) == [(f'/{key}', message, 'error')]
+
+
+@pytest.mark.parametrize('field, value, message', [
+    ('potiGain', 1.01, 'out of range 0..1'),
+    ('potiBoostGain', -0.1, 'out of range 0..1'),
+    ('potiVol', 'loud', 'expected a number'),
+    ('eqBassFreq', 19.0, 'out of range 20..20000'),
+    ('roomDelayLP', 20001.0, 'out of range 20..20000'),
+    ('hpFreq', 10.0, 'out of range 20..20000 (or 0 = off)'),
+    ('lpFreq', float('nan'), 'out of range 20..20000 (or 0 = off)'),
+    ('ngThreshold', 5.0, 'out of range -1000..0'),
+    ('ngThreshold', -1000.5, 'out of range -1000..0'),
+    ('ledColor', 0x1000000, 'out of range 0..0xFFFFFF'),
+    ('ledColor', 255.0, 'expected an integer'),
+])
+def test_preset_rules(field, value, message):
+    config = copy.deepcopy(GOOD)
+    config['presets'][1][field] = value
+    assert problems(config) == [(f'/presets/1/{field}', message, 'error')]
+
+
+def test_only_the_bad_rows_of_a_column_are_reported():
+    config = copy.deepcopy(GOOD)
+    config['presets'] += [dict(GOOD_PRESET, potiGain=g) for g in (0.1, 2.0, 0.3, -1.0)]
+    assert [p for p, _m, _s in problems(config)] == ['/presets/3/potiGain', '/presets/5/potiGain']
+
+
+def test_structural_problems():
+    assert problems({'presets': {}}) == [('/presets', 'presets must be a list', 'error')]
+    assert problems([]) == [('', 'config must be a JSON object', 'error')]
+    config = copy.deepcopy(GOOD)
+    config['presets'].insert(1, 'not a preset')
+    assert problems(config) == [('/presets/1', 'preset must be an object', 'error')]
+
+
+def test_missing_asset_reference_is_a_warning():
+    config = copy.deepcopy(GOOD)
+    config['presets'][1]['ir'] = 'Synth/Gone.ir'
+    config['presets'][1]['boostNam'] = './Synth/Amp 0000.nam'  # the './' prefix is optional
+    config['presets'][0]['potiGain'] = 2.0
+    assert problems(config, ASSETS) == [
+        ('/presets/0/potiGain', 'out of range 0..1', 'error'),
+        ('/presets/1/ir', 'asset not in bank', 'warning'),
+    ]
+    assert problems(config) == [('/presets/0/potiGain', 'out of range 0..1', 'error')]  # not checked
+
+
+def test_validate_command(bank, capsys):
+    assert tool.main(['validate', bank]) == 0
+    config, _raw, _archive = db.read_config(bank)
+    config['presets'][0]['ir'] = 'Synth/Gone.ir'
+    db.save_bank(db.Bank(path=bank, config=config), backup=False)
+    assert tool.main(['validate', bank]) == 0
+    assert tool.main(['validate', '--assets', bank]) == 2
+    assert 'warning: /presets/0/ir: asset not in bank' in capsys.readouterr().out